@@ -1,14 +1,44 @@
 # advanced_config_editor.py
 from PySide6.QtWidgets import (QWidget, QFormLayout, QLineEdit, QPushButton, QVBoxLayout, 
-                             QFileDialog, QHBoxLayout, QMessageBox, QListWidget, QInputDialog)
-from PySide6.QtCore import Qt, QDir
+                             QFileDialog, QHBoxLayout, QMessageBox, QListWidget, QInputDialog, QLabel)
+from PySide6.QtCore import Qt, QDir, QTimer
 import ast
 import os
 from config_loader import _load_config_file
-from constants import ADVANCED_CONFIG_FILE, TECHNOLOGY_PATH, OPENRAM_PATH, TECHNOLOGY_FILE
-import shutil
-import subprocess
+from constants import ADVANCED_CONFIG_FILE, OPENRAM_PATH
 import paramiko
+from background_task import BackgroundTask
+from remote import parse_openram_path
+from tech_list import get_tech_list, cached_tech_list
+from pdk_index import indexed_pdks, find_pdk
+from pdk_store import hash_pdk, upload_pdk
+from sftp_transfer import format_size
+
+# Pause in typing (ms) before the tech list is fetched for an edited OpenRAM path
+TECH_LIST_DEBOUNCE_MS = 500
+
+# Fetches and uploads still running; kept here so they outlive an editor closed mid-task
+_tech_list_tasks = set()
+
+
+def _forget_task(editor_tasks, task):
+    editor_tasks.discard(task)
+    _tech_list_tasks.discard(task)
+
+
+def _detach_tasks(editor_tasks):
+    """
+    Cuts the running tasks of a destroyed editor off from its widgets. Tech
+    list fetches are cancelled; uploads run to the end unobserved.
+    """
+    for task in list(editor_tasks):
+        if getattr(task, "is_tech_list_fetch", False):
+            task.requestInterruption()
+        for signal in (task.message, task.succeeded, task.failed):
+            try:
+                signal.disconnect()
+            except (RuntimeError, TypeError):
+                pass
 
 
 class AdvancedConfigEditor(QWidget):
@@ -18,6 +48,16 @@ class AdvancedConfigEditor(QWidget):
         self.initial_config_dict = _load_config_file(config_path) # Store initial for clear
         self.config_dict = self.initial_config_dict.copy()
         self.fields = {}
+        self.tech_list_timer = QTimer(self)
+        self.tech_list_timer.setSingleShot(True)
+        self.tech_list_timer.setInterval(TECH_LIST_DEBOUNCE_MS)
+        self.tech_list_timer.timeout.connect(self.refresh_tech_list)
+        self.tech_list_request = 0
+        self.tech_list_task = None
+        # Tasks this editor started, cut off from it when it is destroyed
+        self.tasks = set()
+        tasks = self.tasks
+        self.destroyed.connect(lambda: _detach_tasks(tasks))
         self.build_ui()
         self.is_modified = False
         self.update_save_button_state()
@@ -40,20 +80,23 @@ class AdvancedConfigEditor(QWidget):
                 self.fields[key] = field
                 self.form.addRow(key, path_layout)
                 field.textChanged.connect(self.set_modified)
-                field.textChanged.connect(self.refresh_tech_list)
+                field.textChanged.connect(self.on_openram_path_edited)
             elif key == "tech_name":
                 tech_layout = QVBoxLayout()
                 list_widget = QListWidget()
                 list_widget.setSelectionMode(QListWidget.NoSelection)
                 self.fields[key] = list_widget 
+                self.tech_status_label = QLabel()
+                self.tech_status_label.hide()
 
                 self.populate_tech_list(list_widget)
 
-                upload_button = QPushButton("Upload New Technology")
-                upload_button.clicked.connect(lambda: self.upload_pdk_folder(list_widget))
+                self.upload_button = QPushButton("Upload New Technology")
+                self.upload_button.clicked.connect(lambda: self.upload_pdk_folder(list_widget))
 
                 tech_layout.addWidget(list_widget)
-                tech_layout.addWidget(upload_button)
+                tech_layout.addWidget(self.tech_status_label)
+                tech_layout.addWidget(self.upload_button)
                 self.form.addRow(key, tech_layout)
             
             elif key in ["ssh_host", "ssh_user", "ssh_password"]:
@@ -116,55 +159,80 @@ class AdvancedConfigEditor(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Connection Failed", f"Failed to connect: {e}")
 
-    def populate_tech_list(self, list_widget: QListWidget):
-        list_widget.clear()
+    def on_openram_path_edited(self):
+        # Drop any fetch for the old path, and wait for typing to pause before fetching for the new one
+        self.tech_list_request += 1
+        self._cancel_tech_list_fetch()
+        self.tech_list_timer.start()
+
+    def _cancel_tech_list_fetch(self):
+        if self.tech_list_task:
+            self.tech_list_task.requestInterruption()
+            self.tech_list_task = None
+
+    def _start_task(self, task):
+        """Starts a background task, keeping it referenced until it finishes."""
+        tasks = self.tasks
+        tasks.add(task)
+        _tech_list_tasks.add(task)
+        task.finished.connect(lambda: _forget_task(tasks, task))
+        task.start()
+
+    def populate_tech_list(self, list_widget: QListWidget, refresh=False):
+        """
+        Fills the tech list for the current OpenRAM path: at once from the
+        cache, otherwise from a background fetch. A result that arrives after
+        the path has changed again is dropped, and a fetch still waiting to
+        scan when a new one is requested is cancelled.
+        """
+        self.tech_list_request += 1
+        request = self.tech_list_request
+        self._cancel_tech_list_fetch()
 
         openram_path_field = self.fields.get(OPENRAM_PATH)
         openram_path = openram_path_field.text() if openram_path_field else ""
-        is_remote = '@' in openram_path and ':' in openram_path
+        try:
+            parse_openram_path(openram_path)
+        except ValueError:
+            list_widget.clear()
+            self._show_tech_status("Invalid remote path format. Use user@host:/path/to/openram")
+            return
 
-        techs = []
-        if is_remote:
-            try:
-                user_host, remote_openram_path = openram_path.split(':', 1)
-                user, host = user_host.split('@', 1)
-                remote_tech_file = os.path.join(remote_openram_path, os.path.basename(TECHNOLOGY_FILE))
-
-                ssh_key_path = os.path.join(os.path.dirname(__file__), "openram_key")
-                if not os.path.exists(ssh_key_path):
-                    QMessageBox.critical(self, "Error", f"SSH key file not found: {ssh_key_path}")
-                    return
-
-                key = paramiko.RSAKey.from_private_key_file(ssh_key_path)
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                client.connect(host, username=user, pkey=key, timeout=5)
-                
-                stdin, stdout, stderr = client.exec_command(f'cat {remote_tech_file}')
-                
-                exit_status = stdout.channel.recv_exit_status()
-                if exit_status == 0:
-                    techs = [line.strip() for line in stdout.read().decode().strip().split('\n') if line.strip()]
-                else:
-                    error_message = stderr.read().decode().strip()
-                    if not error_message:
-                        error_message = f"File not found or permission issue on remote server. Exit code: {exit_status}"
-                    QMessageBox.warning(self, "Warning", f"Could not read remote technology file.\nError: {error_message}")
-
-                client.close()
-
-            except Exception as e:
-                QMessageBox.warning(self, "Warning", f"An error occurred while fetching remote technologies: {e}")
-        else:
-            try:
-                with open(TECHNOLOGY_FILE, "r") as f:
-                    techs = [line.strip() for line in f if line.strip()]
-            except FileNotFoundError:
-                # This is not an error, the file might not be created yet.
-                pass
-        
-        if techs:
-            list_widget.addItems(techs)
+        techs = None if refresh else cached_tech_list(openram_path)
+        if techs is not None:
+            self._fill_tech_list(list_widget, techs)
+            return
+
+        self._show_tech_status("Loading technologies...")
+        task = BackgroundTask(lambda log, cancelled: get_tech_list(openram_path, refresh, cancelled))
+        task.is_tech_list_fetch = True
+        task.succeeded.connect(lambda techs: self._on_tech_list(request, list_widget, techs))
+        task.failed.connect(lambda error: self._on_tech_list_failed(request, list_widget, error))
+        self.tech_list_task = task
+        self._start_task(task)
+
+    def _on_tech_list(self, request, list_widget, techs):
+        if request == self.tech_list_request:
+            self.tech_list_task = None
+            self._fill_tech_list(list_widget, techs)
+
+    def _on_tech_list_failed(self, request, list_widget, error):
+        if request == self.tech_list_request:
+            self.tech_list_task = None
+            list_widget.clear()
+            self._show_tech_status(f"Could not read the remote technology list: {error}")
+
+    def _fill_tech_list(self, list_widget, techs):
+        list_widget.clear()
+        for tech in techs or []:
+            list_widget.addItem(tech["name"])
+            list_widget.item(list_widget.count() - 1).setToolTip(
+                f"{format_size(tech['size'])}, {tech['file_count']} files, hash {tech['content_hash'][:12]}")
+        self.tech_status_label.hide()
+
+    def _show_tech_status(self, message):
+        self.tech_status_label.setText(message)
+        self.tech_status_label.show()
 
     def set_modified(self):
         self.is_modified = True
@@ -214,10 +282,10 @@ class AdvancedConfigEditor(QWidget):
         self.is_modified = False
         self.update_save_button_state()
 
-    def refresh_tech_list(self):
+    def refresh_tech_list(self, refresh=False):
         tech_list_widget = self.fields.get("tech_name")
         if isinstance(tech_list_widget, QListWidget):
-            self.populate_tech_list(tech_list_widget)
+            self.populate_tech_list(tech_list_widget, refresh)
 
     def browse_openram_path(self, field_widget):
         directory = QFileDialog.getExistingDirectory(self, "Select OpenRAM Directory")
@@ -225,21 +293,24 @@ class AdvancedConfigEditor(QWidget):
             field_widget.setText(directory)
             self.set_modified()
             
-    def _sftp_mkdir_recursive(self, sftp, remote_path):
-        """Creates a remote directory recursively."""
-        current_path = ""
-        # Handle absolute paths by preserving the leading slash
-        if remote_path.startswith('/'):
-            current_path = '/'
-        
-        for part in remote_path.strip('/').split('/'):
-            if not part:
-                continue
-            current_path = os.path.join(current_path, part).replace("\\", "/")
-            try:
-                sftp.stat(current_path)
-            except FileNotFoundError:
-                sftp.mkdir(current_path)
+    def _confirm_pdk_upload(self, openram_path, summary):
+        """
+        Compares the hashed folder with the PDKs indexed at the last scan: an
+        identical PDK under the same name is not uploaded again, and one
+        under another name is only uploaded after asking.
+        """
+        matches = find_pdk(indexed_pdks(openram_path), summary["content_hash"])
+        if any(tech["name"] == summary["name"] for tech in matches):
+            QMessageBox.information(self, "Up to Date",
+                                    f"The technology '{summary['name']}' is already installed with identical contents.")
+            return False
+        if matches:
+            names = ", ".join(tech["name"] for tech in matches)
+            reply = QMessageBox.question(self, "Duplicate Technology",
+                                         f"The same files are already installed as '{names}'. Upload anyway?",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            return reply == QMessageBox.Yes
+        return True
 
     def upload_pdk_folder(self, list_widget: QListWidget):
         folder_path = QFileDialog.getExistingDirectory(
@@ -259,130 +330,55 @@ class AdvancedConfigEditor(QWidget):
             return
         
         openram_path = openram_path_field.text()
-        is_remote = '@' in openram_path and ':' in openram_path
-
-        if is_remote:
-            client = None  # Initialize client to None
-            try:
-                user_host, remote_openram_path_raw = openram_path.split(':', 1)
-                user, host = user_host.split('@', 1)
-
-                ssh_key_path = os.path.join(os.path.dirname(__file__), "openram_key")
-                if not os.path.exists(ssh_key_path):
-                    QMessageBox.critical(self, "Error", f"SSH key file not found: {ssh_key_path}")
-                    return
-
-                key = paramiko.RSAKey.from_private_key_file(ssh_key_path)
-                client = paramiko.SSHClient()
-                client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-                client.connect(host, username=user, pkey=key, timeout=5)
-                sftp = client.open_sftp()
-
-                # Resolve remote home directory
-                stdin, stdout, stderr = client.exec_command("echo $HOME")
-                remote_home = stdout.read().decode().strip()
-                
-                if remote_openram_path_raw.startswith('~/'):
-                    remote_openram_path = os.path.join(remote_home, remote_openram_path_raw[2:]).replace("\\", "/")
-                else:
-                    remote_openram_path = remote_openram_path_raw.replace("\\", "/")
-
-                remote_tech_base_path = os.path.join(remote_openram_path, TECHNOLOGY_PATH).replace("\\", "/")
-                remote_target_path = os.path.join(remote_tech_base_path, folder_name).replace("\\", "/")
-
-                # 1. Check if the folder exists and ask to overwrite
-                try:
-                    sftp.stat(remote_target_path)
-                    reply = QMessageBox.question(self, "Folder Exists",
-                                                   f"The remote technology '{folder_name}' already exists. Overwrite?",
-                                                   QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                    if reply == QMessageBox.No:
-                        return
-                    stdin, stdout, stderr = client.exec_command(f'rm -rf "{remote_target_path}"')
-                    exit_status = stdout.channel.recv_exit_status()
-                    if exit_status != 0:
-                        raise Exception(f"Failed to remove remote directory: {stderr.read().decode()}")
-                except FileNotFoundError:
-                    pass # Good, it doesn't exist
-
-                # 2. Recursively create directory structure and upload
-                QMessageBox.information(self, "Uploading", f"Uploading folder to {user_host}:{remote_target_path}")
-                
-                self._sftp_mkdir_recursive(sftp, remote_target_path)
-
-                for dirpath, _, filenames in os.walk(folder_path):
-                    rel_dir = os.path.relpath(dirpath, folder_path)
-                    if rel_dir == '.':
-                        remote_dir = remote_target_path
-                    else:
-                        remote_dir = os.path.join(remote_target_path, rel_dir).replace("\\", "/")
-                    
-                    self._sftp_mkdir_recursive(sftp, remote_dir)
-
-                    for filename in filenames:
-                        local_file = os.path.join(dirpath, filename)
-                        remote_file = os.path.join(remote_dir, filename).replace("\\", "/")
-                        sftp.put(local_file, remote_file)
-
-                # 3. Update the remote technology.txt
-                remote_tech_file = os.path.join(remote_openram_path, os.path.basename(TECHNOLOGY_FILE))
-                append_command = f"grep -qxF '{folder_name}' '{remote_tech_file}' || echo '{folder_name}' >> '{remote_tech_file}'"
-                stdin, stdout, stderr = client.exec_command(append_command)
-                exit_status = stdout.channel.recv_exit_status()
-                if exit_status != 0:
-                     if "No such file" in stderr.read().decode():
-                         stdin, stdout, stderr = client.exec_command(f"echo '{folder_name}' > '{remote_tech_file}'")
-                         exit_status = stdout.channel.recv_exit_status()
-                         if exit_status != 0:
-                             raise Exception(f"Failed to create remote technology.txt: {stderr.read().decode()}")
-                     else:
-                        raise Exception(f"Failed to update remote technology.txt: {stderr.read().decode()}")
-
-                QMessageBox.information(self, "Success", f"Folder uploaded to:\n{user_host}:{remote_target_path}")
-                self.populate_tech_list(list_widget)
-                self.set_modified()
-
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"An error occurred during the remote operation:\n{e}")
-            finally:
-                if client and client.get_transport() and client.get_transport().is_active():
-                    client.close()
-                return
-
-        else: # Local upload logic
-            if not os.path.isdir(openram_path):
-                QMessageBox.critical(self, "Error", "Local OpenRAM path is not a valid directory.")
-                return
-
-            tech_base_path = os.path.join(openram_path, TECHNOLOGY_PATH)
-            os.makedirs(tech_base_path, exist_ok=True)
-            target_path = os.path.join(tech_base_path, folder_name)
-
-            if os.path.exists(target_path):
-                reply = QMessageBox.question(self, "Folder Exists", 
-                                               f"The technology '{folder_name}' already exists. Overwrite?",
-                                               QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
-                if reply == QMessageBox.No:
-                    return
-                try:
-                    shutil.rmtree(target_path)
-                except Exception as e:
-                    QMessageBox.critical(self, "Error", f"Failed to remove existing folder: {e}")
-                    return
-
-            try:
-                shutil.copytree(folder_path, target_path)
-                
-                with open(TECHNOLOGY_FILE, "a+") as f:
-                    f.seek(0)
-                    techs = [line.strip() for line in f]
-                    if folder_name not in techs:
-                        f.write(f"\n{folder_name}")
+        try:
+            user, _, _ = parse_openram_path(openram_path)
+        except ValueError:
+            QMessageBox.critical(self, "Error", "Invalid remote path format. Use user@host:/path/to/openram")
+            return
+        if not user and not os.path.isdir(openram_path):
+            QMessageBox.critical(self, "Error", "Local OpenRAM path is not a valid directory.")
+            return
 
-                QMessageBox.information(self, "Success", f"Folder uploaded to:\n{target_path}")
+        # The folder is hashed off the GUI thread, and the hashes serve both the duplicate check and the upload
+        self.upload_button.setEnabled(False)
+        self._show_tech_status(f"Hashing {folder_name}...")
+        task = BackgroundTask(lambda log, cancelled: hash_pdk(folder_path))
+        task.succeeded.connect(lambda hashed: self._on_pdk_hashed(list_widget, openram_path, folder_path, hashed))
+        task.failed.connect(self._on_pdk_upload_failed)
+        self._start_task(task)
 
-                self.populate_tech_list(list_widget)
-                self.set_modified()
+    def _on_pdk_hashed(self, list_widget, openram_path, folder_path, hashed):
+        folder_name = os.path.basename(folder_path)
+        proceed = self._confirm_pdk_upload(openram_path, hashed["summary"])
+        if proceed and list_widget.findItems(folder_name, Qt.MatchExactly):
+            reply = QMessageBox.question(self, "Folder Exists",
+                                         f"The technology '{folder_name}' already exists. Overwrite?",
+                                         QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+            proceed = reply == QMessageBox.Yes
+        if not proceed:
+            self.upload_button.setEnabled(True)
+            self.tech_status_label.hide()
+            return
 
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to upload folder:\n{e}")
\ No newline at end of file
+        # Only files the server's PDK store lacks are sent; the technology folder is then rebuilt from links
+        self._show_tech_status(f"Uploading {folder_name}...")
+        task = BackgroundTask(lambda log, cancelled: upload_pdk(folder_path, openram_path, log, cancelled, hashed))
+        task.message.connect(self._show_tech_status)
+        task.succeeded.connect(lambda result: self._on_pdk_uploaded(list_widget, openram_path, result))
+        task.failed.connect(self._on_pdk_upload_failed)
+        self._start_task(task)
+
+    def _on_pdk_uploaded(self, list_widget, openram_path, result):
+        self.upload_button.setEnabled(True)
+        self.tech_status_label.hide()
+        QMessageBox.information(self, "Success",
+                                f"Technology '{result['name']}' installed in {openram_path}.\n"
+                                f"Sent {result['sent']} of {result['files']} files ({format_size(result['bytes'])}); "
+                                f"the rest were already stored.")
+        self.populate_tech_list(list_widget, refresh=True)
+        self.set_modified()
+
+    def _on_pdk_upload_failed(self, error):
+        self.upload_button.setEnabled(True)
+        self.tech_status_label.hide()
+        QMessageBox.critical(self, "Error", f"Failed to upload folder:\n{error}")
@@ -0,0 +1,227 @@
+# archiver.py
+"""
+Archives output folders off the GUI thread, using several cores:
+
+- zip: each file is deflated in blocks on a thread pool (pigz style: every
+  block is primed with the previous 32 KB and sync-flushed, so the blocks
+  join into one valid deflate stream) while zipfile writes the container.
+- zip (store only): no compression, for folders of already-compressed files.
+- tar.gz: the tar stream is cut into blocks gzipped in parallel; concatenated
+  gzip members are a valid .gz file.
+- tar.zst: multi-threaded Zstandard through the optional `zstandard` package,
+  or the `zstd` tool when the package is not installed.
+"""
+import gzip
+import os
+import shutil
+import subprocess
+import tarfile
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from sftp_transfer import TransferProgress
+
+ARCHIVE_FORMATS = {
+    "zip": ".zip",
+    "zip-store": ".zip",
+    "tar.gz": ".tar.gz",
+    "tar.zst": ".tar.zst",
+}
+
+BLOCK_SIZE = 1024 * 1024
+# Deflate can refer back this far, so each block is primed with the previous one's tail
+WINDOW_SIZE = 32 * 1024
+COMPRESS_LEVEL = 6
+
+# Bytes between progress reports
+PROGRESS_STEP = 32 * 1024 * 1024
+
+
+class ArchiveError(Exception):
+    """An archive could not be created."""
+
+
+class ArchiveCancelled(Exception):
+    """Archiving was cancelled; the partial archive has been removed."""
+
+
+def archive_format_for(path):
+    """The archive format implied by a file name (zip when unknown)."""
+    for archive_format in ("tar.zst", "tar.gz"):
+        if path.endswith(ARCHIVE_FORMATS[archive_format]):
+            return archive_format
+    return "zip"
+
+
+def _deflate_block(data, previous, last):
+    compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15, zdict=previous) if previous else \
+        zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+class _ParallelDeflate:
+    """
+    Stands in for zipfile's compressor object. compress() is handed large
+    pieces of a file and deflates them as blocks on the pool.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.previous = b""
+
+    def compress(self, data):
+        data = bytes(data)
+        blocks = [data[i:i + BLOCK_SIZE] for i in range(0, len(data), BLOCK_SIZE)]
+        futures = []
+        for block in blocks:
+            futures.append(self.pool.submit(_deflate_block, block, self.previous, False))
+            self.previous = (self.previous + block)[-WINDOW_SIZE:]
+        return b"".join(future.result() for future in futures)
+
+    def flush(self):
+        return _deflate_block(b"", self.previous, True)
+
+
+class _ParallelGzipWriter:
+    """File object that gzips what is written to it in parallel blocks, one gzip member per block."""
+
+    def __init__(self, out, pool, threads):
+        self.out = out
+        self.pool = pool
+        self.batch_size = BLOCK_SIZE * 4 * threads
+        self.buffer = bytearray()
+
+    def write(self, data):
+        self.buffer += data
+        if len(self.buffer) >= self.batch_size:
+            self._flush_blocks()
+        return len(data)
+
+    def _flush_blocks(self):
+        data = bytes(self.buffer)
+        self.buffer.clear()
+        blocks = [data[i:i + BLOCK_SIZE * 4] for i in range(0, len(data), BLOCK_SIZE * 4)]
+        for compressed in self.pool.map(lambda block: gzip.compress(block, COMPRESS_LEVEL, mtime=0), blocks):
+            self.out.write(compressed)
+
+    def close(self):
+        if self.buffer:
+            self._flush_blocks()
+
+
+class _ProgressReader:
+    """Wraps a source file, counting bytes read and stopping when cancelled."""
+
+    def __init__(self, f, archiver):
+        self.f = f
+        self.archiver = archiver
+
+    def read(self, size=-1):
+        data = self.f.read(size)
+        self.archiver.advance(len(data))
+        return data
+
+
+class Archiver:
+    def __init__(self, source_dir, destination, archive_format="zip", log=None, cancelled=None, threads=None):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ArchiveError(f"Unknown archive format '{archive_format}'")
+        self.source_dir = source_dir
+        self.destination = destination
+        self.archive_format = archive_format
+        self.log = log or (lambda message: None)
+        self.cancelled = cancelled
+        self.threads = threads or os.cpu_count() or 1
+        self.files = []
+        for dirpath, dirnames, filenames in os.walk(source_dir):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                if os.path.isfile(path):
+                    self.files.append((path, os.path.relpath(path, source_dir)))
+        self.progress = TransferProgress(sum(os.path.getsize(path) for path, _ in self.files))
+        self._next_report = PROGRESS_STEP
+
+    def advance(self, size):
+        if self.cancelled and self.cancelled():
+            raise ArchiveCancelled(f"Archiving of {self.source_dir} cancelled")
+        self.progress.add(size)
+        if self.progress.done >= self._next_report:
+            self.log(f"Archiving: {self.progress.describe()}")
+            self._next_report = self.progress.done + PROGRESS_STEP
+
+    def run(self):
+        """Writes the archive and returns its path. Raises ArchiveError or ArchiveCancelled."""
+        if not os.path.isdir(self.source_dir):
+            raise ArchiveError(f"Output directory not found: {self.source_dir}")
+        self.log(f"Archiving {len(self.files)} files from {self.source_dir} as {self.archive_format} "
+                 f"using {self.threads} threads...")
+        try:
+            with ThreadPoolExecutor(self.threads) as pool:
+                if self.archive_format.startswith("zip"):
+                    self._write_zip(pool)
+                elif self.archive_format == "tar.gz":
+                    with open(self.destination, "wb") as out:
+                        writer = _ParallelGzipWriter(out, pool, self.threads)
+                        self._write_tar(writer)
+                        writer.close()
+                else:
+                    self._write_tar_zst()
+        except BaseException:
+            if os.path.exists(self.destination):
+                os.unlink(self.destination)
+            raise
+        self.log(f"Archive written to {self.destination}: {self.progress.describe()}, "
+                 f"{os.path.getsize(self.destination) / 1024 ** 2:.1f} MB on disk.")
+        return self.destination
+
+    def _write_zip(self, pool):
+        store = self.archive_format == "zip-store"
+        with zipfile.ZipFile(self.destination, "w", zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED) as archive:
+            for path, name in self.files:
+                info = zipfile.ZipInfo.from_file(path, name)
+                info.compress_type = zipfile.ZIP_STORED if store else zipfile.ZIP_DEFLATED
+                with open(path, "rb") as source, archive.open(info, "w") as target:
+                    if not store:
+                        target._compressor = _ParallelDeflate(pool)
+                    for piece in iter(lambda: source.read(BLOCK_SIZE * self.threads), b""):
+                        target.write(piece)
+                        self.advance(len(piece))
+
+    def _write_tar(self, fileobj):
+        with tarfile.open(fileobj=fileobj, mode="w|") as archive:
+            for path, name in self.files:
+                info = archive.gettarinfo(path, name)
+                with open(path, "rb") as source:
+                    archive.addfile(info, _ProgressReader(source, self))
+
+    def _write_tar_zst(self):
+        if zstandard is not None:
+            with open(self.destination, "wb") as out:
+                compressor = zstandard.ZstdCompressor(level=3, threads=self.threads)
+                with compressor.stream_writer(out) as writer:
+                    self._write_tar(writer)
+            return
+        if not shutil.which("zstd"):
+            raise ArchiveError("tar.zst needs the 'zstandard' Python package or the zstd tool.")
+        process = subprocess.Popen(["zstd", f"-T{self.threads}", "-q", "-f", "-o", self.destination],
+                                   stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        try:
+            self._write_tar(process.stdin)
+        finally:
+            process.stdin.close()
+            error = process.stderr.read().decode(errors='replace')
+            process.wait()
+        if process.returncode != 0:
+            raise ArchiveError(f"zstd failed: {error.strip()}")
+
+
+def create_archive(source_dir, destination, archive_format="zip", log=None, cancelled=None, threads=None):
+    """Archives the contents of source_dir into destination. See Archiver."""
+    return Archiver(source_dir, destination, archive_format, log, cancelled, threads).run()
@@ -0,0 +1,99 @@
+# artifact_cache.py
+"""
+Local cache of files downloaded from the OpenRAM server (configs, GDS).
+Entries are keyed by host, remote path, size and mtime, so one remote stat
+tells whether the cached copy is still current. The cache is capped in size
+and evicts the least recently used files first.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from constants import ARTIFACT_CACHE_DIR, ARTIFACT_CACHE_MB
+from remote import remote_batch, RemoteError
+from sftp_transfer import download_file
+
+INDEX_FILE = "index.json"
+
+_lock = threading.Lock()
+
+
+def _load_index():
+    try:
+        with open(os.path.join(ARTIFACT_CACHE_DIR, INDEX_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index):
+    path = os.path.join(ARTIFACT_CACHE_DIR, INDEX_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(path + ".tmp", path)
+
+
+def remote_stat(user, host, remote_path):
+    """(size, mtime) of a remote file. Raises RemoteError."""
+    stat = remote_batch(user, host, [{"op": "stat", "path": remote_path}], timeout=60)[0]
+    if stat is None:
+        raise RemoteError(f"{remote_path} not found on {host}")
+    return stat["size"], int(stat["mtime"])
+
+
+def _remove(index, key):
+    path = os.path.join(ARTIFACT_CACHE_DIR, index.pop(key)["file"])
+    if os.path.exists(path):
+        os.unlink(path)
+
+
+def _evict(index, max_bytes, keep):
+    """Drops least recently used entries (never `keep`) until the cache fits in max_bytes."""
+    total = sum(entry["size"] for entry in index.values())
+    for key, entry in sorted(index.items(), key=lambda item: item[1]["last_used"]):
+        if total <= max_bytes:
+            break
+        if key == keep:
+            continue
+        total -= entry["size"]
+        _remove(index, key)
+
+
+def cached_download(user, host, remote_path, log=None, cancelled=None, max_mb=None):
+    """
+    Local path of a remote file, downloaded into the cache unless a copy of
+    the same size and mtime is already there. max_mb caps the cache size
+    (ARTIFACT_CACHE_MB by default). Raises RemoteError or TransferCancelled.
+    """
+    log = log or (lambda message: None)
+    size, mtime = remote_stat(user, host, remote_path)
+    key = hashlib.sha256(f"{host}\0{remote_path}\0{size}\0{mtime}".encode()).hexdigest()
+    file_name = f"{key[:16]}_{os.path.basename(remote_path)}"
+    local_path = os.path.join(ARTIFACT_CACHE_DIR, file_name)
+
+    with _lock:
+        index = _load_index()
+        entry = index.get(key)
+        if entry and os.path.exists(local_path) and os.path.getsize(local_path) == size:
+            entry["last_used"] = time.time()
+            _save_index(index)
+            log(f"Using cached copy of {os.path.basename(remote_path)}.")
+            return local_path
+
+    os.makedirs(ARTIFACT_CACHE_DIR, exist_ok=True)
+    # A stable path per version, so an interrupted download resumes on the next try
+    download_file(user, host, remote_path, local_path, log=log, cancelled=cancelled)
+
+    with _lock:
+        index = _load_index()
+        # Older versions of the same file will not be asked for again
+        for old_key in [k for k, e in index.items() if k != key and e["host"] == host and e["path"] == remote_path]:
+            _remove(index, old_key)
+        index[key] = {"host": host, "path": remote_path, "size": size, "mtime": mtime,
+                      "file": file_name, "last_used": time.time()}
+        _evict(index, (max_mb or ARTIFACT_CACHE_MB) * 1024 * 1024, keep=key)
+        _save_index(index)
+    return local_path
+
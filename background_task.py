@@ -0,0 +1,30 @@
+# background_task.py
+from PySide6.QtCore import QThread, Signal
+
+from archiver import ArchiveError, ArchiveCancelled
+from remote import RemoteError
+from run_service import RunError
+from sftp_transfer import TransferCancelled
+
+
+class BackgroundTask(QThread):
+    """
+    Runs a blocking job (download, archive, remote listing) off the GUI
+    thread. The task is called with a log callback and a cancelled()
+    callback and returns its result.
+    """
+    message = Signal(str)
+    succeeded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, task):
+        super().__init__()
+        self.task = task
+
+    def run(self):
+        try:
+            result = self.task(self.message.emit, self.isInterruptionRequested)
+        except (RemoteError, RunError, TransferCancelled, ArchiveError, ArchiveCancelled, OSError, ValueError) as e:
+            self.failed.emit(str(e))
+        else:
+            self.succeeded.emit(result)
@@ -0,0 +1,179 @@
+# batch_queue.py
+"""
+Runs OpenRAM jobs through a SLURM-style batch queue instead of starting them
+directly. A set of job configs becomes one job-array submission; each array
+task runs one config and leaves run.log and exit_code in its own folder.
+Status and new log output of every task are collected in a single call per
+poll. The submit and status commands are configurable, so a stand-in
+`sbatch`/`squeue` can be used for testing.
+"""
+import inspect
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+
+from run_jobs import remote_run_command, write_job_configs
+from remote import run_ssh, scp_to, RemoteError
+
+# Sub-directory of the OpenRAM install holding the submitted arrays
+BATCH_DIR = "batch_jobs"
+SUBMIT_COMMAND = "sbatch"
+STATUS_COMMAND = "squeue"
+# Seconds between status queries
+POLL_INTERVAL = 10
+# Most log output read per task and poll
+MAX_LOG_CHUNK = 1024 * 1024
+
+
+def array_script(openram_path, config_paths, job_name, resources, options=()):
+    """
+    The sbatch script for a job array running one config per task. Paths are
+    relative to the submit folder; `resources` holds the request shared by
+    all tasks ('cpus', 'memory_mb', 'minutes', each optional).
+    """
+    lines = ["#!/bin/bash", f"#SBATCH --job-name={job_name}", f"#SBATCH --array=0-{len(config_paths) - 1}",
+             "#SBATCH --output=%a/slurm.out"]
+    if resources.get("cpus"):
+        lines.append(f"#SBATCH --cpus-per-task={resources['cpus']}")
+    if resources.get("memory_mb"):
+        lines.append(f"#SBATCH --mem={resources['memory_mb']}M")
+    if resources.get("minutes"):
+        lines.append(f"#SBATCH --time={resources['minutes']}")
+    lines += [f"#SBATCH {option}" for option in options]
+    lines += [
+        "TASK_DIR=${SLURM_SUBMIT_DIR:-$(pwd)}/$SLURM_ARRAY_TASK_ID",
+        "CONFIGS=(" + " ".join(shlex.quote(path) for path in config_paths) + ")",
+        "CONFIG=${SLURM_SUBMIT_DIR:-$(pwd)}/${CONFIGS[$SLURM_ARRAY_TASK_ID]}",
+        f"( {remote_run_command(openram_path, '$CONFIG')} ) > $TASK_DIR/run.log 2>&1",
+        "echo $? > $TASK_DIR/exit_code",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def array_resources(jobs, job_configs):
+    """One request covering every task: the most threads, memory and time any of them is predicted to need."""
+    threads = [job_config.get("num_threads") for job_config in job_configs if job_config.get("num_threads")]
+    memory = [job["peak_memory"] for job in jobs if job.get("peak_memory")]
+    durations = [job["duration"] for job in jobs if job.get("duration")]
+    return {
+        "cpus": max(threads) if threads else None,
+        # Predictions are rough, so leave headroom
+        "memory_mb": int(max(memory) * 1.5 / 1024 ** 2) + 1 if memory else None,
+        "minutes": max(int(max(durations) * 2 / 60) + 10, 30) if durations else None,
+    }
+
+
+def _run(user, host, command):
+    """Runs a shell command on the OpenRAM host, which may be this machine."""
+    if user:
+        return run_ssh(user, host, command, timeout=60)
+    process = subprocess.run(["bash", "-c", command], capture_output=True, text=True, timeout=60)
+    if process.returncode != 0:
+        raise RemoteError(process.stderr.strip() or f"'{command}' failed with exit code {process.returncode}")
+    return process
+
+
+def submit_array(user, host, openram_path, name, jobs, job_configs, options=(), submit_command=SUBMIT_COMMAND):
+    """
+    Writes the task configs and array script into a new folder under
+    <openram_path>/batch_jobs (copied over in one scp when remote), submits
+    it and returns (array id, task folder). `job_configs` are the
+    (corner, config) pairs of `jobs`. Raises RemoteError.
+    """
+    array_name = f"{name}_{int(time.time() * 1000)}"
+    task_dir = os.path.join(openram_path, BATCH_DIR, array_name)
+    local_dir = tempfile.mkdtemp(prefix="openram_batch_")
+    try:
+        config_paths = []
+        for task, job_config in enumerate(job_configs):
+            os.makedirs(os.path.join(local_dir, str(task)))
+            path = write_job_configs(os.path.join(local_dir, str(task)), name, [job_config])[0]
+            config_paths.append(os.path.relpath(path, local_dir))
+        script = array_script(openram_path, config_paths, name, array_resources(jobs, [c for _, c in job_configs]),
+                              options)
+        with open(os.path.join(local_dir, "array.sh"), "w") as f:
+            f.write(script)
+        if user:
+            run_ssh(user, host, f"mkdir -p {task_dir}")
+            scp_to(user, host, [os.path.join(local_dir, entry) for entry in os.listdir(local_dir)], f"{task_dir}/",
+                   recursive=True)
+        else:
+            shutil.copytree(local_dir, task_dir)
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+    process = _run(user, host, f"cd {task_dir} && {submit_command} --parsable array.sh")
+    array_id = process.stdout.strip().split(";")[0]
+    if not array_id:
+        raise RemoteError(f"{submit_command} did not return a job id")
+    return array_id, task_dir
+
+
+def _array_status(root, array_id, offsets, status_command, max_chunk):
+    """
+    State, exit code and log output after `offsets` ({task: byte}) of every
+    task of an array, from one status query. A task that is neither queued
+    nor finished has died and gets exit code -1. Returns None when the status
+    query fails. Also runs on the server, so standard library only.
+    """
+    import os
+    import subprocess
+
+    queued = {}
+    status = subprocess.run(f"{status_command} -h -r -j {array_id} -o '%K %T'", shell=True,
+                            capture_output=True, text=True)
+    if status.returncode != 0:
+        return None
+    for line in status.stdout.splitlines():
+        parts = line.split()
+        if len(parts) == 2:
+            queued[parts[0]] = parts[1]
+
+    tasks = {}
+    for task, offset in offsets.items():
+        task_dir = os.path.join(root, task)
+        exit_code = None
+        try:
+            with open(os.path.join(task_dir, "exit_code")) as f:
+                exit_code = int(f.read().strip() or -1)
+        except (OSError, ValueError):
+            if task not in queued:
+                exit_code = -1
+        data = b""
+        try:
+            with open(os.path.join(task_dir, "run.log"), "rb") as f:
+                f.seek(offset)
+                data = f.read(max_chunk)
+        except OSError:
+            pass
+        # A finished task's log is only complete once all of it has been read
+        if exit_code is not None and len(data) == max_chunk:
+            exit_code = None
+        tasks[task] = {"state": queued.get(task, "COMPLETED" if exit_code is not None else "PENDING"),
+                       "exit_code": exit_code, "log": data.decode("utf-8", "replace"), "size": len(data)}
+    return tasks
+
+
+STATUS_SCRIPT = inspect.getsource(_array_status) + \
+    "\nimport json, sys\nargs = json.load(sys.stdin)\njson.dump(_array_status('.', *args), sys.stdout)\n"
+
+
+def poll_array(user, host, task_dir, array_id, offsets, status_command=STATUS_COMMAND):
+    """Status of the given tasks ({task: log offset}) of one array, as {task: {'state', 'exit_code', 'log', 'size'}}."""
+    offsets = {str(task): offset for task, offset in offsets.items()}
+    if user:
+        process = run_ssh(user, host, f"cd {task_dir} && python3 -c {shlex.quote(STATUS_SCRIPT)}", timeout=60,
+                          input=json.dumps([array_id, offsets, status_command, MAX_LOG_CHUNK]))
+        try:
+            tasks = json.loads(process.stdout)
+        except ValueError:
+            raise RemoteError(f"Unreadable batch status from {host}: {process.stdout[:200]}")
+    else:
+        tasks = _array_status(task_dir, array_id, offsets, status_command, MAX_LOG_CHUNK)
+    if tasks is None:
+        raise RemoteError(f"'{status_command}' failed for job {array_id}")
+    return tasks
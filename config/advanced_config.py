@@ -1,2 +1,10 @@
 openram_path = 'mazhar@192.168.0.102:~/code/python_code/open_ram/openram'
-tech_name = 'sky130'
\ No newline at end of file
+tech_name = 'sky130'
+split_corners = False
+max_parallel_jobs = 4
+auto_threads = True
+artifact_cache_mb = 2048
+host_pool = []
+warm_worker = False
+env_snapshot = True
+sample_interval = 5
@@ -1,13 +1,57 @@
 # config_editor.py
 from PySide6.QtWidgets import QWidget, QFormLayout, QLineEdit, QPushButton, QVBoxLayout, QHBoxLayout, QMessageBox, QLabel
 from PySide6.QtCore import Qt
-import ast
 import os
-import tempfile
-import subprocess
-from config_loader import _load_config_file
-from constants import DEFAULT_CONFIG_FILE, ADVANCED_CONFIG_FILE, MANDATORY_CONFIG_KEYS, USERS_CONFIG_DIR
+from config_loader import _load_config_file, config_to_text
+from config_schema import get_schema, parse_field_text, format_errors
+from run_history import get_history, location_for
+from run_predictor import get_predictor, format_estimate, PREDICTOR_KEYS
+from constants import DEFAULT_CONFIG_FILE, ADVANCED_CONFIG_FILE, USERS_CONFIG_DIR
 from dialogs import SaveConfigDialog
+from background_task import BackgroundTask
+from config_mirror import mirror_config_names, write_config, discard_local_save
+from remote import openram_target
+from run_service import sync_configs
+
+# Background syncs of the config mirror, kept referenced until they finish
+_sync_tasks = set()
+
+
+def sync_configs_in_background(on_names=None, force=()):
+    """
+    Syncs the local mirror of the server's configs off the GUI thread, which
+    also writes pending saves through. `on_names` gets the synced list of
+    config names. Asks what to do about saves the server's copy changed under.
+    """
+    task = BackgroundTask(lambda log, cancelled: sync_configs(force=force, log=log))
+    task.succeeded.connect(lambda result: _on_configs_synced(result, on_names))
+    task.failed.connect(lambda error: QMessageBox.warning(
+        None, "Sync Error", f"Could not sync configs with the OpenRAM Server: {error}\n\n"
+        "Saved configs are kept locally and written to the server at the next sync."))
+    task.finished.connect(lambda: _sync_tasks.discard(task))
+    _sync_tasks.add(task)
+    task.start()
+
+
+def _on_configs_synced(result, on_names):
+    if on_names:
+        on_names(result["names"])
+    force = []
+    for config_name in result["conflicts"]:
+        reply = QMessageBox.question(
+            None,
+            "Save Conflict",
+            f"'{config_name}' was changed on the OpenRAM Server since it was last synced. "
+            "Overwrite the server's copy with your version?\n\nNo discards your version and keeps the server's.",
+            QMessageBox.Yes | QMessageBox.No,
+            QMessageBox.No
+        )
+        if reply == QMessageBox.Yes:
+            force.append(config_name)
+        else:
+            discard_local_save(*openram_target(), config_name)
+    if result["conflicts"]:
+        sync_configs_in_background(on_names, force)
 from pathlib import Path
 
 
@@ -21,8 +65,11 @@ class ConfigEditor(QWidget):
         self.initial_personal_config = _load_config_file(personal_config_path) # Store initial for clear
         self.personal_config = self.initial_personal_config.copy()
         self.merged_config = {**self.default_config, **self.personal_config}
+        self.schema = get_schema(default_config_path)
         self.fields = {}
         self.build_ui()
+        self.validate_all_fields()
+        self.update_estimate()
         self.is_modified = False
         self.update_save_button_state()
 
@@ -36,12 +83,18 @@ class ConfigEditor(QWidget):
             config_name = self.display_name if self.display_name else Path(self.personal_config_path).stem
             config_label = QLabel(f"Current Config:   <b>{config_name}</b>")
             self.layout.addWidget(config_label)
+
+        self.estimate_label = QLabel()
+        self.layout.addWidget(self.estimate_label)
+
+        if self.personal_config_path:
             # Display personal config fields first
             for key, value in self.personal_config.items():
                 field = QLineEdit(str(value))
                 self.fields[key] = field
                 self.form.addRow(key, field)
                 field.textChanged.connect(self.set_modified)
+                field.textChanged.connect(lambda _, k=key: self.validate_field(k))
 
         # Display default config fields if not in personal config
         for key, value in self.default_config.items():
@@ -50,6 +103,7 @@ class ConfigEditor(QWidget):
                 self.fields[key] = field
                 self.form.addRow(key, field)
                 field.textChanged.connect(self.set_modified)
+                field.textChanged.connect(lambda _, k=key: self.validate_field(k))
 
         self.layout.addLayout(self.form)
        
@@ -92,13 +146,39 @@ class ConfigEditor(QWidget):
     def get_config(self):
         config = {}
         for key, widget in self.fields.items():
-            val = widget.text()
-            try:
-                config[key] = ast.literal_eval(val)
-            except Exception:
-                config[key] = val
+            config[key] = parse_field_text(widget.text())
         return config
 
+    def _mark_field(self, key, message):
+        field = self.fields.get(key)
+        if field is None:
+            return
+        if message:
+            field.setStyleSheet("QLineEdit { border: 1px solid red; }")
+            field.setToolTip(message)
+        else:
+            field.setStyleSheet("")
+            field.setToolTip("")
+
+    def validate_field(self, key):
+        """Re-checks one field (and any cross-field rules it is part of) as the user types."""
+        results = self.schema.validate_with_dependents(key, self.get_config())
+        for field_key, message in results.items():
+            self._mark_field(field_key, message)
+        if key in PREDICTOR_KEYS:
+            self.update_estimate()
+
+    def update_estimate(self):
+        """Shows the predicted runtime and peak memory of the config, learned from past runs."""
+        estimate = get_predictor().estimate({**self.default_config, **self.get_config()})
+        self.estimate_label.setText(format_estimate(estimate))
+
+    def validate_all_fields(self):
+        errors, warnings = self.schema.validate(self.get_config())
+        for key in self.fields:
+            self._mark_field(key, errors.get(key) or warnings.get(key))
+        return errors
+
     def _get_remote_user_host(self):
         advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
         openram_path = advanced_config.get("openram_path", "")
@@ -113,13 +193,13 @@ class ConfigEditor(QWidget):
 
     def _save_config_to_file(self, update_personal_config=False):
         current_config = self.get_config()
-        missing_fields = [field for field in MANDATORY_CONFIG_KEYS if not current_config.get(field)]
+        errors = self.validate_all_fields()
 
-        if missing_fields:
+        if errors:
             reply = QMessageBox.warning(
                 self,
-                "Missing Mandatory Fields",
-                f"The following mandatory fields are empty: {', '.join(missing_fields)}.\n\nDo you want to save anyway?",
+                "Invalid Configuration",
+                f"The configuration has the following problems:\n{format_errors(errors)}\n\nDo you want to save anyway?",
                 QMessageBox.Save | QMessageBox.Cancel,
                 QMessageBox.Cancel
             )
@@ -155,14 +235,8 @@ class ConfigEditor(QWidget):
         user, host, remote_path = self._get_remote_user_host()
 
         if user and host:
-            remote_users_config_dir = os.path.join(remote_path, USERS_CONFIG_DIR)
-            remote_config_path = os.path.join(remote_users_config_dir, f"{config_name}.py")
-
-            # Check if file exists on remote
-            check_exists_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", f"test -f {remote_config_path}"]
-            process = subprocess.run(check_exists_command)
-            
-            if process.returncode == 0: # File exists
+            # Saved into the local mirror of the server's configs and written through in the background
+            if showSaveAsDialog and config_name in mirror_config_names(user, host, remote_path):
                 reply = QMessageBox.question(
                     self,
                     "File Exists",
@@ -172,29 +246,15 @@ class ConfigEditor(QWidget):
                 )
                 if reply == QMessageBox.No:
                     return
-            
+
             try:
-                with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.py') as tmp:
-                    for k, v in modified_config.items():
-                        tmp.write(f'{k} = {repr(v)}\n')
-                    tmp.flush()
-
-                    # Upload config file
-                    scp_command = [
-                        "scp",
-                        "-i", os.path.join(os.path.dirname(__file__), "openram_key"),
-                        tmp.name,
-                        f"{user}@{host}:{remote_config_path}"
-                    ]
-                    process = subprocess.run(scp_command, check=True, capture_output=True, text=True)
-                    QMessageBox.information(self, "Save Complete", f"Configuration saved as {config_name} on the OpenRAM Server.")
-
-            except subprocess.CalledProcessError as e:
-                QMessageBox.critical(self, "SFTP Error", f"Failed to upload config file: {e.stderr}")
-                return
-            except Exception as e:
+                write_config(user, host, remote_path, config_name, config_to_text(modified_config))
+            except OSError as e:
                 QMessageBox.critical(self, "Error", f"An error occurred: {e}")
                 return
+            get_history().record_config_saved(config_name, location_for(user, host, remote_path), config_to_text(modified_config))
+            sync_configs_in_background()
+            QMessageBox.information(self, "Save Complete", f"Configuration saved as {config_name}; it is being written to the OpenRAM Server.")
 
         else:
             path = os.path.join(USERS_CONFIG_DIR, f"{config_name}.py")
@@ -212,8 +272,8 @@ class ConfigEditor(QWidget):
                     return
 
             with open(path, "w") as f:
-                for k, v in modified_config.items():
-                    f.write(f'{k} = {repr(v)}\n')
+                f.write(config_to_text(modified_config))
+            get_history().record_config_saved(config_name, location_for(user, host, remote_path), config_to_text(modified_config))
             QMessageBox.information(self, "Save Complete", f"Configuration saved as {config_name}")
 
         self.is_modified = False
@@ -228,4 +288,4 @@ class ConfigEditor(QWidget):
             else:
                 field.setText("") # Clear fields that were added and are not in default/initial personal
         self.is_modified = False
-        self.update_save_button_state()
\ No newline at end of file
+        self.update_save_button_state()
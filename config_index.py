@@ -0,0 +1,107 @@
+# config_index.py
+"""
+Search over the parameters of the saved configs, local and mirrored from
+the server (see config_mirror.py). Configs are parsed, not executed: every
+top-level `key = <literal>` assignment goes into an inverted index in the
+history database, which is brought up to date from file mtimes and sizes
+before each search, so only new or changed files are parsed again.
+
+A query is a list of terms such as `tech_name=sky130 word_size>=32`. The
+operators are =, !=, <, <=, >, >= and ~ (contains); a term without one
+matches config names. List values match if any element does.
+"""
+import ast
+import os
+import re
+
+from run_history import get_history
+
+TERM_PATTERN = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*)\s*(!=|<=|>=|=|<|>|~)\s*(.*)$")
+
+
+def _index_value(value):
+    """(text_value, num_value) rows of one parameter value; lists give a row per element."""
+    if isinstance(value, (list, tuple)):
+        return [row for element in value for row in _index_value(element)]
+    if isinstance(value, bool):
+        return [(str(value).lower(), int(value))]
+    if isinstance(value, (int, float)):
+        return [(None, value)]
+    return [(str(value).lower(), None)]
+
+
+def config_params(text):
+    """The (key, text_value, num_value) rows of a config's literal top-level assignments."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    params = []
+    for node in tree.body:
+        if not (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)):
+            continue
+        try:
+            value = ast.literal_eval(node.value)
+        except (ValueError, SyntaxError, TypeError):
+            continue
+        params += [(node.targets[0].id, text_value, num_value) for text_value, num_value in _index_value(value)]
+    return params
+
+
+def refresh_index(folder, location, history=None):
+    """Re-indexes the configs in `folder` that changed since they were indexed and drops deleted ones."""
+    history = history or get_history()
+    indexed = history.indexed_config_files(location)
+    changed = {}
+    seen = set()
+    if os.path.isdir(folder):
+        for entry in os.scandir(folder):
+            if not entry.name.endswith(".py") or not entry.is_file():
+                continue
+            name = entry.name[:-3]
+            seen.add(name)
+            stat = entry.stat()
+            if indexed.get(name) == (stat.st_mtime, stat.st_size):
+                continue
+            with open(entry.path, errors="replace") as f:
+                changed[name] = (stat.st_mtime, stat.st_size, config_params(f.read()))
+    removed = [name for name in indexed if name not in seen]
+    if changed or removed:
+        history.update_config_index(location, changed, removed)
+
+
+def parse_query(query):
+    """
+    Parses a search query into (key, operator, value) terms, with a key of
+    None for plain words. Values that read as numbers or booleans compare
+    numerically, anything else as lower-case text. Raises ValueError.
+    """
+    terms = []
+    for word in query.split():
+        match = TERM_PATTERN.match(word)
+        if not match:
+            if any(operator in word for operator in "=<>~"):
+                raise ValueError(f"Cannot read search term '{word}'")
+            terms.append((None, "~", word))
+            continue
+        key, operator, text = match.groups()
+        if not text:
+            raise ValueError(f"Search term '{word}' has no value")
+        try:
+            value = ast.literal_eval(text)
+        except (ValueError, SyntaxError):
+            value = text
+        if isinstance(value, bool):
+            value = int(value)
+        elif not isinstance(value, (int, float)):
+            value = str(value).lower()
+        terms.append((key, operator, value))
+    return terms
+
+
+def search_index(folder, location, query, history=None):
+    """Names of the configs in `folder` matching a query. Raises ValueError for an unreadable query."""
+    history = history or get_history()
+    terms = parse_query(query)
+    refresh_index(folder, location, history)
+    return history.search_config_index(location, terms)
@@ -31,4 +31,8 @@ def load_config(personal_config_path=None, default_config_path="config/default.p
     # Merge the two configurations
     merged_config = {**default_config, **personal_config}
     
-    return merged_config
\ No newline at end of file
+    return merged_config
+
+def config_to_text(config):
+    """Serialises a config dictionary back to the `key = value` Python format it is loaded from."""
+    return "".join(f'{k} = {repr(v)}\n' for k, v in config.items())
@@ -0,0 +1,219 @@
+# config_mirror.py
+"""
+Local mirror of a remote OpenRAM install's users_configs folder, so listing
+and opening configs need no ssh round trip. The mirror's manifest records
+the server's copy of every config (mtime, size, sha256) as of the last sync
+and the configs saved locally but not yet on the server.
+
+A sync is a single ssh call: pending local saves are written on the server
+unless its copy changed since the last sync (a conflict), then every
+config whose hash differs from the manifest is sent back. Hashes are only
+recomputed on the server for files whose mtime or size changed.
+"""
+import inspect
+import json
+import os
+import re
+import shlex
+import threading
+
+from constants import CONFIG_MIRROR_DIR, USERS_CONFIG_DIR
+from remote import run_ssh, RemoteError
+
+MANIFEST_FILE = ".manifest.json"
+
+_lock = threading.Lock()
+
+
+def _sync_configs(root, known, pushes):
+    """
+    Writes `pushes` ([{'name', 'text', 'base', 'force'}]) into root unless the
+    file's hash is no longer `base`, then returns the manifest of root's
+    configs, the text of those whose hash is not the one in `known` and the
+    names of the pushes that conflicted. Also runs on the server, so
+    standard library only.
+    """
+    import hashlib
+    import os
+
+    def file_hash(path):
+        try:
+            with open(path, "rb") as f:
+                return hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return None
+
+    os.makedirs(root, exist_ok=True)
+    conflicts = []
+    for push in pushes:
+        path = os.path.join(root, push["name"])
+        if not push["force"] and file_hash(path) != push["base"]:
+            conflicts.append(push["name"])
+            continue
+        temp_path = os.path.join(root, f".{push['name']}.tmp")
+        with open(temp_path, "w") as f:
+            f.write(push["text"])
+        os.replace(temp_path, path)
+
+    files = {}
+    texts = {}
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if not name.endswith(".py") or not os.path.isfile(path):
+            continue
+        stat = os.stat(path)
+        entry = {"mtime": stat.st_mtime, "size": stat.st_size}
+        previous = known.get(name)
+        if previous and previous["mtime"] == entry["mtime"] and previous["size"] == entry["size"]:
+            entry["hash"] = previous["hash"]
+        else:
+            entry["hash"] = file_hash(path)
+        files[name] = entry
+        if not previous or previous["hash"] != entry["hash"]:
+            with open(path) as f:
+                texts[name] = f.read()
+    return {"files": files, "texts": texts, "conflicts": conflicts}
+
+
+SYNC_SCRIPT = inspect.getsource(_sync_configs) + \
+    "\nimport json, sys\njson.dump(_sync_configs('.', *json.load(sys.stdin)), sys.stdout)\n"
+
+
+def mirror_dir(user, host, openram_path):
+    """Local folder mirroring <openram_path>/users_configs on user@host."""
+    name = re.sub(r"[^A-Za-z0-9._-]+", "_", f"{user}@{host}_{openram_path}").strip("_")
+    return os.path.join(CONFIG_MIRROR_DIR, name)
+
+
+def _load_manifest(mirror):
+    try:
+        with open(os.path.join(mirror, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    manifest.setdefault("files", {})
+    manifest.setdefault("pending", [])
+    return manifest
+
+
+def _save_manifest(mirror, manifest):
+    temp_path = os.path.join(mirror, MANIFEST_FILE + ".tmp")
+    with open(temp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, os.path.join(mirror, MANIFEST_FILE))
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def mirror_config_names(user, host, openram_path):
+    """Names of the configs in the mirror, without contacting the server."""
+    mirror = mirror_dir(user, host, openram_path)
+    if not os.path.isdir(mirror):
+        return []
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(mirror) if f.endswith(".py"))
+
+
+def mirror_config_path(user, host, openram_path, config_name):
+    return os.path.join(mirror_dir(user, host, openram_path), f"{config_name}.py")
+
+
+def is_pending(user, host, openram_path, config_name):
+    """Whether a config was saved locally but is not on the server yet."""
+    manifest = _load_manifest(mirror_dir(user, host, openram_path))
+    return f"{config_name}.py" in manifest["pending"]
+
+
+def sync_mirror(user, host, openram_path, force=(), log=lambda message: None):
+    """
+    Pushes pending saves (overwriting the server's copy for the names in
+    `force`) and pulls every config that changed on the server. Returns
+    {'names': configs now mirrored, 'conflicts': pending saves the server's
+    copy changed under}. Raises RemoteError.
+    """
+    mirror = mirror_dir(user, host, openram_path)
+    remote_dir = os.path.join(openram_path, USERS_CONFIG_DIR)
+    with _lock:
+        os.makedirs(mirror, exist_ok=True)
+        manifest = _load_manifest(mirror)
+        known = manifest["files"]
+        pushes = []
+        for name in manifest["pending"]:
+            text = _read(os.path.join(mirror, name))
+            if text is not None:
+                pushes.append({"name": name, "text": text, "base": known.get(name, {}).get("hash"),
+                               "force": os.path.splitext(name)[0] in force})
+    if pushes:
+        log(f"Saving {', '.join(push['name'] for push in pushes)} on {host}...")
+
+    # The lock is not held over the ssh call, so saves are never kept waiting by a sync
+    process = run_ssh(user, host, f"mkdir -p {remote_dir} && cd {remote_dir} && python3 -c {shlex.quote(SYNC_SCRIPT)}",
+                      timeout=120, input=json.dumps([known, pushes]))
+    try:
+        result = json.loads(process.stdout)
+    except ValueError:
+        raise RemoteError(f"Unreadable config listing from {host}: {process.stdout[:200]}")
+
+    conflicts = result["conflicts"]
+    with _lock:
+        manifest = _load_manifest(mirror)
+        pushed = {push["name"]: push["text"] for push in pushes}
+        # Saved again while the sync was running, or not accepted by the server
+        pending = set(conflicts) | {name for name in manifest["pending"]
+                                    if name not in pushed or _read(os.path.join(mirror, name)) != pushed[name]}
+        for name, text in result["texts"].items():
+            if name not in pending:
+                with open(os.path.join(mirror, name), "w") as f:
+                    f.write(text)
+        for name in os.listdir(mirror):
+            if name.endswith(".py") and name not in result["files"] and name not in pending:
+                os.remove(os.path.join(mirror, name))
+        # A pending save must still be checked against the server copy it was based on
+        files = result["files"]
+        for name in pending - (set(pushed) - set(conflicts)):
+            if name in known:
+                files[name] = known[name]
+            else:
+                files.pop(name, None)
+        manifest["files"] = files
+        manifest["pending"] = sorted(pending)
+        _save_manifest(mirror, manifest)
+    return {"names": mirror_config_names(user, host, openram_path),
+            "conflicts": [os.path.splitext(name)[0] for name in conflicts]}
+
+
+def write_config(user, host, openram_path, config_name, text):
+    """
+    Saves a config into the mirror and marks it for the next sync, which
+    writes it through to the server. Returns the mirror path.
+    """
+    mirror = mirror_dir(user, host, openram_path)
+    name = f"{config_name}.py"
+    with _lock:
+        os.makedirs(mirror, exist_ok=True)
+        path = os.path.join(mirror, name)
+        with open(path, "w") as f:
+            f.write(text)
+        manifest = _load_manifest(mirror)
+        if name not in manifest["pending"]:
+            manifest["pending"].append(name)
+        _save_manifest(mirror, manifest)
+    return path
+
+
+def discard_local_save(user, host, openram_path, config_name):
+    """Drops a pending save, so the next sync brings the server's copy back."""
+    mirror = mirror_dir(user, host, openram_path)
+    name = f"{config_name}.py"
+    with _lock:
+        manifest = _load_manifest(mirror)
+        if name in manifest["pending"]:
+            manifest["pending"].remove(name)
+        # Forget the server's copy too, so it is sent again
+        manifest["files"].pop(name, None)
+        _save_manifest(mirror, manifest)
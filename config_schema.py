@@ -0,0 +1,233 @@
+# config_schema.py
+import ast
+import difflib
+from functools import lru_cache
+
+from config_loader import _load_config_file
+from constants import DEFAULT_CONFIG_FILE, MANDATORY_CONFIG_KEYS
+
+PROCESS_CORNERS = ("TT", "FF", "SS", "SF", "FS")
+
+# Options whose default in config/default.py does not tell us the real type
+# (e.g. "" or None placeholders that get filled in by the tech file).
+FIELD_OVERRIDES = {
+    "num_words": {"types": (int,), "min": 1, "power_of_two": True},
+    "word_size": {"types": (int,), "min": 1},
+    "words_per_row": {"types": (int,), "allow_none": True, "min": 1, "power_of_two": True},
+    "write_size": {"types": (int,), "allow_none": True, "min": 1},
+    "num_banks": {"types": (int,), "choices": (1, 2, 4)},
+    "num_spare_rows": {"types": (int,), "min": 0},
+    "num_spare_cols": {"types": (int,), "min": 0},
+    "num_rw_ports": {"types": (int,), "min": 0, "max": 2},
+    "num_r_ports": {"types": (int,), "min": 0, "max": 2},
+    "num_w_ports": {"types": (int,), "min": 0, "max": 2},
+    "local_array_size": {"types": (int,), "min": 0},
+    "num_threads": {"types": (int,), "min": 1},
+    "num_sim_threads": {"types": (int,), "min": 1},
+    "verbose_level": {"types": (int,), "min": 0},
+    "rbl_delay_percentage": {"types": (int, float), "min": 0, "max": 1},
+    "accuracy_requirement": {"types": (int, float), "min": 0, "max": 1},
+    "process_corners": {"types": (list, tuple), "allow_empty": True, "items": PROCESS_CORNERS},
+    "supply_voltages": {"types": (list, tuple), "allow_empty": True, "item_types": (int, float), "min": 0},
+    "temperatures": {"types": (list, tuple), "allow_empty": True, "item_types": (int, float)},
+    "load_scales": {"types": (list, tuple), "allow_empty": True, "item_types": (int, float)},
+    "slew_scales": {"types": (list, tuple), "allow_empty": True, "item_types": (int, float)},
+    "use_specified_corners": {"types": (list, tuple), "allow_none": True},
+    "tech_name": {"types": (str,)},
+    "output_path": {"types": (str,)},
+    "output_name": {"types": (str,)},
+}
+
+
+def parse_field_text(text):
+    """Converts the text of an editor field to a Python value, the same way the editors do."""
+    try:
+        return ast.literal_eval(text)
+    except Exception:
+        return text
+
+
+def _is_power_of_two(value):
+    return value > 0 and value & (value - 1) == 0
+
+
+def _type_name(types):
+    return " or ".join(t.__name__ for t in types)
+
+
+def _check_ports(config):
+    ports = [config.get(key, 0) or 0 for key in ("num_rw_ports", "num_r_ports", "num_w_ports")]
+    if not all(isinstance(p, int) for p in ports):
+        return None
+    total = sum(ports)
+    if total < 1 or total > 2:
+        return f"Total number of ports must be 1 or 2 (got {total})."
+    if ports[0] + ports[2] < 1:
+        return "At least one write port (rw or w) is required."
+    return None
+
+
+def _check_words_per_row(config):
+    num_words = config.get("num_words")
+    words_per_row = config.get("words_per_row")
+    if not isinstance(num_words, int) or not isinstance(words_per_row, int) or words_per_row < 1:
+        return None
+    if num_words % words_per_row:
+        return f"words_per_row ({words_per_row}) must divide num_words ({num_words})."
+    if words_per_row > 16:
+        return "words_per_row may be at most 16 (column mux size)."
+    return None
+
+
+def _check_write_size(config):
+    word_size = config.get("word_size")
+    write_size = config.get("write_size")
+    if not isinstance(word_size, int) or not isinstance(write_size, int) or write_size < 1:
+        return None
+    if write_size > word_size or word_size % write_size:
+        return f"write_size ({write_size}) must divide word_size ({word_size})."
+    return None
+
+
+# Cross-field rules: (fields the error is reported on, check function)
+CROSS_FIELD_RULES = [
+    (("num_rw_ports", "num_r_ports", "num_w_ports"), _check_ports),
+    (("words_per_row", "num_words"), _check_words_per_row),
+    (("write_size", "word_size"), _check_write_size),
+]
+
+
+class ConfigSchema:
+    def __init__(self, default_config):
+        self.defaults = default_config
+        self.fields = {}
+        for key, value in default_config.items():
+            if callable(value) or type(value).__name__ == "module":
+                continue
+            spec = {"types": self._infer_types(value), "allow_none": value is None}
+            spec.update(FIELD_OVERRIDES.get(key, {}))
+            self.fields[key] = spec
+        for key in MANDATORY_CONFIG_KEYS:
+            if key in self.fields:
+                self.fields[key]["required"] = True
+
+        # Which cross-field rules to re-check when a given field changes
+        self.rules_by_field = {}
+        for rule in CROSS_FIELD_RULES:
+            for key in rule[0]:
+                self.rules_by_field.setdefault(key, []).append(rule)
+
+    @staticmethod
+    def _infer_types(value):
+        if value is None:
+            return ()
+        if isinstance(value, bool):
+            return (bool,)
+        if isinstance(value, float):
+            return (int, float)
+        return (type(value),)
+
+    def validate_field(self, key, value):
+        """Checks a single value against its field spec. Returns an error message or None."""
+        spec = self.fields.get(key)
+        if spec is None:
+            return None
+
+        if spec.get("required") and not value:
+            return f"{key} is mandatory."
+        if value is None or value == "":
+            if value is None and (spec.get("allow_none") or not spec["types"]):
+                return None
+            if value == "" and (spec.get("allow_empty") or str in spec["types"]):
+                return None
+
+        types = spec["types"]
+        if types:
+            # bool is a subclass of int, don't let True pass for a number
+            if isinstance(value, bool) and bool not in types:
+                return f"{key} must be {_type_name(types)}, got bool."
+            if not isinstance(value, types):
+                return f"{key} must be {_type_name(types)}, got {type(value).__name__}."
+
+        if isinstance(value, (list, tuple)):
+            allowed = spec.get("items")
+            item_types = spec.get("item_types")
+            for item in value:
+                if allowed and item not in allowed:
+                    return f"{key}: '{item}' is not one of {', '.join(allowed)}."
+                if item_types and (isinstance(item, bool) or not isinstance(item, item_types)):
+                    return f"{key}: every entry must be {_type_name(item_types)}."
+                if "min" in spec and isinstance(item, (int, float)) and item < spec["min"]:
+                    return f"{key}: every entry must be at least {spec['min']}."
+            return None
+
+        if "choices" in spec and value not in spec["choices"]:
+            return f"{key} must be one of {', '.join(str(c) for c in spec['choices'])}."
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            if "min" in spec and value < spec["min"]:
+                return f"{key} must be at least {spec['min']}."
+            if "max" in spec and value > spec["max"]:
+                return f"{key} must be at most {spec['max']}."
+            if spec.get("power_of_two") and not _is_power_of_two(value):
+                return f"{key} must be a power of two."
+        return None
+
+    def validate_with_dependents(self, key, config):
+        """
+        Validates one field plus the cross-field rules it takes part in.
+        Returns a dict of field -> error message (None when the field is fine)
+        for every field whose state may have changed.
+        """
+        config = {**self.defaults, **config}
+        results = {key: self.validate_field(key, config.get(key))}
+        for fields, check in self.rules_by_field.get(key, []):
+            for other in fields:
+                results.setdefault(other, self.validate_field(other, config.get(other)))
+            if any(results[other] for other in fields):
+                continue
+            message = check(config)
+            if message:
+                for other in fields:
+                    results[other] = message
+        return results
+
+    def validate(self, config):
+        """
+        Validates a whole config. Options missing from the config are taken
+        from the defaults for the cross-field rules.
+        Returns (errors, warnings) as dicts of field -> message.
+        """
+        errors = {}
+        warnings = {}
+        merged = {**self.defaults, **config}
+        for key in list(config) + [k for k in MANDATORY_CONFIG_KEYS if k not in config]:
+            if key not in self.fields:
+                close = difflib.get_close_matches(key, self.fields.keys(), n=1)
+                hint = f" Did you mean '{close[0]}'?" if close else ""
+                warnings[key] = f"Unknown option '{key}'.{hint}"
+                continue
+            message = self.validate_field(key, merged.get(key))
+            if message:
+                errors[key] = message
+        for fields, check in CROSS_FIELD_RULES:
+            if any(f in errors for f in fields):
+                continue
+            message = check(merged)
+            if message:
+                errors[fields[0]] = message
+        return errors, warnings
+
+
+@lru_cache(maxsize=None)
+def get_schema(default_config_path=DEFAULT_CONFIG_FILE):
+    """Builds the schema from the default config once and caches it."""
+    return ConfigSchema(_load_config_file(default_config_path))
+
+
+def validate_config(config, default_config_path=DEFAULT_CONFIG_FILE):
+    """Convenience wrapper returning (errors, warnings) for a config dict."""
+    return get_schema(default_config_path).validate(config)
+
+
+def format_errors(errors):
+    return "\n".join(f"- {message}" for message in errors.values())
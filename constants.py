@@ -1,16 +1,24 @@
 DEFAULT_CONFIG_FILE= "config/default.py"
 ADVANCED_CONFIG_FILE = "config/advanced_config.py"
 # MANDATORY_CONFIG_FILE = "config/mandatory_config.py"
-TECHNOLOGY_FILE = "technology.txt"
+PDK_INDEX_FILE = "pdk_index.json"
+ENV_SNAPSHOT_FILE = "env_snapshots.json"
 USERS_CONFIG_DIR = "users_configs"
 
 HOME_SCREEN_FILE = "home_screen.csv"
+HISTORY_DB_FILE = "run_history.db"
+ARTIFACT_CACHE_DIR = "artifact_cache"
+CONFIG_MIRROR_DIR = "config_mirror"
+# Subfolder of a config's output_path that quick-look runs write to, next to the full run's outputs
+QUICK_LOOK_DIR = "quick_look"
+# Default size cap of the artifact cache; advanced setting artifact_cache_mb overrides it
+ARTIFACT_CACHE_MB = 2048
 
 MANDATORY_CONFIG_KEYS = ["num_words", 
                          "word_size", ]
                         #  "tech_name"]
 
-ADVANCED_CONFIG_KEYS = ["openram_path", "tech_name"]
+ADVANCED_CONFIG_KEYS = ["openram_path", "tech_name", "split_corners", "max_parallel_jobs", "auto_threads", "artifact_cache_mb", "host_pool", "warm_worker", "env_snapshot", "sample_interval"]
 
 HOME_SCREEN_MESSAGE = """A PySide6-based desktop application for loading, editing, and running OpenRAM configurations.<br><br>🚀 Features<br><br>- <b>Load & Edit:</b> Load any OpenRAM-compatible Python config file and edit parameters through a user-friendly UI.<br>- <b>Save:</b> Save modified configurations to new files.<br>- <b>Select PDK:</b> Select your own PDK.<br>- <b>Run OpenRAM:</b> Execute OpenRAM directly from the GUI and view the output logs.<br>- <b>View GDS:</b> Open generated GDS files in an external viewer like KLayout.<br>- <b>Modular Design:</b> The UI and application logic are separated for better maintainability.<br>"""
 
@@ -1,19 +1,40 @@
 import os
-import shutil
-import subprocess
-import glob
 import tempfile
-from PySide6.QtWidgets import QMessageBox, QTextEdit, QInputDialog, QFileDialog, QVBoxLayout, QLabel, QListWidget,     QPushButton, QWidget, QHBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem, QDialog, QHeaderView
-from PySide6.QtCore import QCoreApplication, QProcess, QObject, Signal, QThread
-
-from config_loader import _load_config_file
-from config_editor import ConfigEditor
+import time
+from PySide6.QtWidgets import QMessageBox, QTextEdit, QInputDialog, QFileDialog, QVBoxLayout, QLabel, QListWidget,     QPushButton, QWidget, QHBoxLayout, QLineEdit, QTableWidget, QTableWidgetItem, QDialog, QHeaderView, QCheckBox
+from PySide6.QtCore import Qt, QCoreApplication, QProcess, QProcessEnvironment, QObject, Signal, QThread, QTimer
+
+from config_loader import _load_config_file, config_to_text
+from config_mirror import write_config
+from config_schema import validate_config, format_errors
+from remote import openram_target, run_ssh, RemoteError
+from run_history import get_history, local_folder_size
+from run_predictor import format_seconds
+from run_progress import STAGE_GROUPS
+from run_jobs import parse_exit_marker
+from archiver import create_archive, ARCHIVE_FORMATS
+from background_task import BackgroundTask
+from sftp_transfer import format_size
+from batch_queue import POLL_INTERVAL
+from run_service import (RunError, list_configs, search_configs, fetch_config, plan_run, resume_run, next_jobs,
+                         launch_detached, tail_ssh_args, record_job_output, record_job_finished, is_complete,
+                         run_progress, finish_run, cleanup_run_files, list_gds_files, fetch_gds, output_location,
+                         download_remote_output, remote_zip_path, output_manifest, fetch_selected_outputs, submit_batch, poll_batch,
+                         sample_resources, compare_results)
+from config_editor import ConfigEditor, sync_configs_in_background
 from advanced_config_editor import AdvancedConfigEditor
-from constants import MANDATORY_CONFIG_KEYS, ADVANCED_CONFIG_FILE, HOME_SCREEN_MESSAGE, USERS_CONFIG_DIR, OUTPUT_PATH
+from constants import HOME_SCREEN_MESSAGE, USERS_CONFIG_DIR, QUICK_LOOK_DIR
 from dialogs import LoadConfigDialog, SaveConfigDialog
 
 from pathlib import Path
-import time
+
+# Save dialog filter -> archive format, for local output folders
+ARCHIVE_FILE_FILTERS = {
+    "Zip Files (*.zip)": "zip",
+    "Zip, store only (*.zip)": "zip-store",
+    "Tar + Zstandard (*.tar.zst)": "tar.zst",
+    "Tar + gzip (*.tar.gz)": "tar.gz",
+}
 
 
 class Controller:
@@ -21,96 +42,61 @@ class Controller:
         self.ui = ui
         self.config = {}
         self.config_path = None
-        self.process = None
-        self.temp_script_path = None
-        self.download_process = None
+        self.config_name = None
+        self.run_plan = None
+        # The run being planned off the GUI thread, as plan_run arguments, and its task
+        self.planning_run = None
+        self.plan_thread = None
+        # Runs waiting for the current one, as plan_run arguments; full runs queued by a quick look go last
+        self.run_queue = []
+        self.progress_timer = QTimer()
+        self.progress_timer.timeout.connect(self._update_run_progress)
+        self.download_thread = None
+        self.gds_thread = None
+        self.batch_timer = QTimer()
+        self.batch_timer.timeout.connect(self._poll_batch)
+        self.batch_thread = None
+        self.resource_timer = QTimer()
+        self.resource_timer.timeout.connect(self._sample_resources)
+        self.resource_thread = None
+
+        # Pick up remote runs that were still going when the app last closed
+        QTimer.singleShot(0, self.resume_detached_runs)
+        self.history = get_history()
+        self.config_id = None
+        self.download_id = None
 
     def _get_remote_user_host(self):
-        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-        openram_path = advanced_config.get("openram_path", "")
-        if '@' in openram_path and ':' in openram_path:
-            try:
-                user_host, remote_path = openram_path.split(':', 1)
-                user, host = user_host.split('@', 1)
-                return user, host, remote_path
-            except ValueError:
-                QMessageBox.critical(self.ui, "Error", "Invalid remote path format in advanced settings. Use user@host:/path/to/openram")
-                return None, None, None
-        return None, None, None
-
-    def _create_temp_script(self, command_to_run):
-        """Creates a temporary shell script to run a command in the OpenRAM environment."""
-        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-        openram_path = advanced_config.get("openram_path")
-
-        if not openram_path:
-            QMessageBox.critical(self.ui, "Error", "OpenRAM path not set in advanced settings.")
-            return None
-
-        openram_activate_script = os.path.join(openram_path, "openram_env", "bin", "activate")
-        miniconda_activate_script = os.path.join(openram_path, "miniconda", "bin", "activate")
-        setpaths_script = os.path.join(openram_path, "setpaths.sh")
-
         try:
-            with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.sh', encoding='utf-8') as f:
-                f.write("#!/bin/bash\n")
-                f.write(f"source {openram_activate_script}\n")
-                f.write(f"source {miniconda_activate_script}\n")
-                f.write(f"source {setpaths_script}\n")
-                f.write(f"{command_to_run}\n")
-                temp_script_path = f.name
-
-            os.chmod(temp_script_path, 0o755)
-            return temp_script_path
-        except Exception as e:
-            QMessageBox.critical(self.ui, "Error", f"Failed to create temporary script: {e}")
-            return None
+            return openram_target()
+        except ValueError:
+            QMessageBox.critical(self.ui, "Error", "Invalid remote path format in advanced settings. Use user@host:/path/to/openram")
+            return None, None, None
 
     def load_config(self):
         user, host, remote_path = self._get_remote_user_host()
-        dialog = LoadConfigDialog()
+        dialog = LoadConfigDialog(search=search_configs)
         display_name = None
 
+        try:
+            dialog.set_config_names(list_configs(sync=False))
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self.ui, "Error", f"Failed to list config files: {e}")
+            return
         if user and host:
-            remote_users_config_dir = os.path.join(remote_path, USERS_CONFIG_DIR)
-            # Ensure the remote directory exists
-            mkdir_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", f"mkdir -p {remote_users_config_dir}"]
-            try:
-                subprocess.run(mkdir_command, check=True, capture_output=True, text=True)
-            except subprocess.CalledProcessError as e:
-                QMessageBox.critical(self.ui, "SSH Error", f"Failed to create remote directory: {e.stderr}")
-                return
-
-            # List files in the remote directory
-            ls_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", f"ls {remote_users_config_dir}"]
-            try:
-                process = subprocess.run(ls_command, check=True, capture_output=True, text=True)
-                config_files = [f for f in process.stdout.strip().split('\n') if f.endswith(".py")]
-                dialog.list_widget.addItems([os.path.splitext(f)[0] for f in config_files])
-            except subprocess.CalledProcessError as e:
-                QMessageBox.critical(self.ui, "SSH Error", f"Failed to list remote config files: {e.stderr}")
-                return
-        else:
-            config_files = [f for f in os.listdir(USERS_CONFIG_DIR) if f.endswith(".py")]
-            dialog.list_widget.addItems([os.path.splitext(f)[0] for f in config_files])
+            # The list comes from the local mirror; bring it up to date while the dialog is open
+            sync_configs_in_background(lambda names: dialog.set_config_names(names))
 
         if dialog.exec():
             selected_config = dialog.get_selected_config()
             if user and host:
                 display_name = selected_config
-                remote_users_config_dir = os.path.join(remote_path, USERS_CONFIG_DIR)
-                remote_config_path = os.path.join(remote_users_config_dir, f"{selected_config}.py")
-                
-                try:
-                    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.py') as tmp:
-                        scp_command = ["scp", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}:{remote_config_path}", tmp.name]
-                        subprocess.run(scp_command, check=True)
-                        self.config_path = tmp.name
-                except subprocess.CalledProcessError as e:
-                    QMessageBox.critical(self.ui, "SFTP Error", f"Failed to download config file: {e.stderr}")
-                    return
-            else:
-                self.config_path = os.path.join(USERS_CONFIG_DIR, f"{selected_config}.py")
+            try:
+                self.config_path, self.config_id = fetch_config(selected_config, sync=False)
+            except (RemoteError, RunError) as e:
+                QMessageBox.critical(self.ui, "SFTP Error", f"Failed to download config file: {e}")
+                return
+            self.config_name = selected_config
 
             if self.ui.editor:
                 self.ui.scroll_area.takeWidget()
@@ -131,13 +117,13 @@ class Controller:
             return
 
         current_config = self.ui.editor.get_config()
-        missing_fields = [field for field in MANDATORY_CONFIG_KEYS if not current_config.get(field)]
+        errors, _ = validate_config(current_config)
 
-        if missing_fields:
+        if errors:
             reply = QMessageBox.warning(
                 None,
-                "Missing Mandatory Fields",
-                f"The following mandatory fields are empty: {', '.join(missing_fields)}.\n\nDo you want to save anyway?",
+                "Invalid Configuration",
+                f"The configuration has the following problems:\n{format_errors(errors)}\n\nDo you want to save anyway?",
                 QMessageBox.Save | QMessageBox.Cancel,
                 QMessageBox.Cancel
             )
@@ -150,23 +136,27 @@ class Controller:
             if config_name:
                 user, host, remote_path = self._get_remote_user_host()
                 if user and host:
-                    remote_users_config_dir = os.path.join(remote_path, USERS_CONFIG_DIR)
-                    remote_config_path = os.path.join(remote_users_config_dir, f"{config_name}.py")
-                    
                     try:
-                        with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.py') as tmp:
-                            self.ui.editor.save_config(tmp.name)
-                            scp_command = ["scp", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), tmp.name, f"{user}@{host}:{remote_config_path}"]
-                            subprocess.run(scp_command, check=True)
-                        QMessageBox.information(self.ui, "Save Complete", f"Configuration saved as {config_name} on the OpenRAM Server.")
-                    except subprocess.CalledProcessError as e:
-                        QMessageBox.critical(self.ui, "SFTP Error", f"Failed to upload config file: {e.stderr}")
+                        write_config(user, host, remote_path, config_name, config_to_text(current_config))
+                    except OSError as e:
+                        QMessageBox.critical(self.ui, "Error", f"Failed to save config file: {e}")
+                        return
+                    sync_configs_in_background()
+                    QMessageBox.information(self.ui, "Save Complete", f"Configuration saved as {config_name}; it is being written to the OpenRAM Server.")
                 else:
                     path = os.path.join(USERS_CONFIG_DIR, f"{config_name}.py")
                     self.ui.editor.save_config(path)
 
     def run_openram(self):
-        if self.process and self.process.state() != QProcess.NotRunning:
+        self._request_run("full")
+
+    def quick_look(self):
+        """Runs the config's quick look now and queues its full run behind it at background priority."""
+        self._request_run("quick")
+
+    def _request_run(self, profile):
+        if ((self.run_plan and not self.run_plan.background)
+                or (self.planning_run and not self.planning_run.get("background"))):
             QMessageBox.warning(self.ui, "Warning", "An OpenRAM process is already running.")
             return
 
@@ -174,85 +164,322 @@ class Controller:
             QMessageBox.warning(self.ui, "Warning", "Please load a config file first.")
             return
 
-        current_config = _load_config_file(self.config_path)
-        missing_fields = [field for field in MANDATORY_CONFIG_KEYS if not current_config.get(field)]
-        if missing_fields:
-            QMessageBox.critical(self.ui, "Error", f"Missing mandatory fields: {', '.join(missing_fields)}")
+        errors, _ = validate_config(_load_config_file(self.config_path))
+        if errors:
+            QMessageBox.critical(self.ui, "Error", f"Invalid configuration, not running OpenRAM:\n{format_errors(errors)}")
             return
 
-        self.ui.run_button.setEnabled(False)
-        self.ui.run_button.setText("Running...")
-        self.ui.log_output.clear()
-        self.ui.log_output.append("Running OpenRAM... please wait, this may take a while.")
-        QCoreApplication.processEvents()
+        run = {"config_path": self.config_path, "config_name": self.config_name, "config_id": self.config_id,
+               "profile": profile}
+        if self.run_plan or self.planning_run:
+            # Ahead of the queued background runs, behind runs asked for earlier
+            position = next((i for i, queued in enumerate(self.run_queue) if queued.get("background")),
+                            len(self.run_queue))
+            self.run_queue.insert(position, run)
+            current = self.run_plan.config_name if self.run_plan else self.planning_run["config_name"]
+            self.ui.log_output.append(f"Queued {'the quick look of ' if profile == 'quick' else ''}{self.config_name}; "
+                                      f"it starts when the background full run of {current} finishes.")
+            return
+        self._start_run(run)
 
-        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-        openram_path = advanced_config.get("openram_path", "")
+    def _start_run(self, run):
+        """
+        Plans a run given as plan_run arguments (see _request_run and
+        _queue_full_run) off the GUI thread, as planning can probe hosts and
+        upload configs, then starts it in _on_run_planned.
+        """
+        background = run.get("background", False)
+        if background:
+            self.ui.log_output.append(f"\nStarting the full run of {run['config_name']} in the background...")
+        else:
+            self.ui.run_button.setEnabled(False)
+            self.ui.quick_look_button.setEnabled(False)
+            self.ui.run_button.setText("Running...")
+            self.ui.log_output.clear()
+            self.ui.log_output.append("Running OpenRAM... please wait, this may take a while.")
+
+        self.planning_run = run
+        self.plan_thread = BackgroundTask(lambda log, cancelled: plan_run(
+            run["config_path"], run["config_name"], run["config_id"], log=log,
+            materialize=run.get("materialize", False), profile=run["profile"], background=background,
+            endpoint_path=run.get("endpoint_path"), linked_run_id=run.get("linked_run_id")))
+        self.plan_thread.message.connect(self._append_log)
+        self.plan_thread.succeeded.connect(lambda plan: self._on_run_planned(run, plan))
+        self.plan_thread.failed.connect(lambda error: self._on_run_plan_failed(run, error))
+        self.plan_thread.start()
+
+    def _end_planning(self, run):
+        self.planning_run = None
+        self.plan_thread = None
+        if run.get("frozen"):
+            os.unlink(run["config_path"])
+
+    def _on_run_plan_failed(self, run, error):
+        self._end_planning(run)
+        if run.get("background"):
+            self.ui.log_output.append(f"Could not start the full run of {run['config_name']}: {error}")
+        else:
+            QMessageBox.critical(self.ui, "Error", error)
+        self._reset_run_button()
+        QTimer.singleShot(0, self._start_next_run)
+
+    def _on_run_planned(self, run, plan):
+        self._end_planning(run)
+        self.run_plan = plan
+        if self.run_plan.profile == "quick":
+            self._queue_full_run(run, self.run_plan)
+
+        self.ui.run_progress.setValue(0)
+        self.ui.run_progress.show()
+        self.ui.run_status_label.show()
+        self.progress_timer.start(1000)
+        self._start_resource_sampling()
+        self._start_pending_jobs()
+
+    def _queue_full_run(self, run, quick_plan):
+        """
+        Queues the full run of a quick look: the config as it is now, on the
+        same install and output folder, linked to the quick look in the
+        history. It replaces a queued full run of the same config.
+        """
+        for queued in [queued for queued in self.run_queue
+                       if queued.get("background") and queued["config_name"] == run["config_name"]]:
+            self._drop_queued_run(queued)
+            self.ui.log_output.append(f"Dropped the queued full run of {run['config_name']} for this newer one.")
+        fd, frozen_path = tempfile.mkstemp(prefix="openram_full_", suffix=".py")
+        with os.fdopen(fd, "w") as f, open(run["config_path"]) as source:
+            f.write(source.read())
+        self.run_queue.append({
+            "config_path": frozen_path, "config_name": run["config_name"], "config_id": run["config_id"],
+            "profile": "full", "background": True, "materialize": True, "frozen": True,
+            "endpoint_path": quick_plan.endpoint, "linked_run_id": quick_plan.run_id,
+        })
+
+    def _drop_queued_run(self, queued):
+        """Takes a run off the queue, removing its frozen config."""
+        self.run_queue.remove(queued)
+        if queued.get("frozen") and os.path.exists(queued["config_path"]):
+            os.unlink(queued["config_path"])
+
+    def shutdown(self):
+        """Drops the runs still queued when the app closes, so their frozen configs don't outlive it."""
+        for queued in list(self.run_queue):
+            self._drop_queued_run(queued)
+
+    def _start_next_run(self):
+        if not self.run_plan and not self.planning_run and self.run_queue:
+            self._start_run(self.run_queue.pop(0))
+
+    def _reset_run_button(self):
+        self.ui.run_button.setEnabled(True)
+        self.ui.quick_look_button.setEnabled(True)
+        self.ui.run_button.setText("Run OpenRAM")
 
-        is_remote = '@' in openram_path and ':' in openram_path
+    def _start_pending_jobs(self):
+        if self.run_plan.batch:
+            self._submit_batch()
+            return
+        for job in next_jobs(self.run_plan):
+            self._start_job(job)
 
-        if is_remote:
-            self.ui.log_output.append("Remote OpenRAM path detected.")
-            
-            user, host, remote_path = self._get_remote_user_host()
-            if not user:
-                self.ui.run_button.setEnabled(True)
-                self.ui.run_button.setText("Run OpenRAM")
-                return
+    def _submit_batch(self):
+        """Submits the run's jobs to the batch queue as one array, then polls it on a timer."""
+        plan = self.run_plan
+        try:
+            submit_batch([plan], log=self._append_log)
+        except RunError as e:
+            self.ui.log_output.append(str(e))
+            for job in plan.jobs:
+                record_job_finished(plan, job, 1)
+            self._finish_run_jobs(QProcess.NormalExit)
+            return
+        for job in plan.jobs:
+            batch = job["batch"]
+            self.ui.log_output.append(f"{job['label'] or 'Run'}: task {batch['task']} of array {batch['array_id']}, "
+                                      f"log: {batch['task_dir']}/{batch['task']}/run.log")
+        self.batch_timer.start(POLL_INTERVAL * 1000)
+
+    def _start_resource_sampling(self):
+        self.ui.resource_label.clear()
+        if self.run_plan.sampler:
+            self.ui.resource_label.show()
+            self.resource_timer.start(int(self.run_plan.sampler.interval * 1000))
+
+    def _sample_resources(self):
+        """Samples the running jobs' CPU and memory off the GUI thread."""
+        if not self.run_plan or (self.resource_thread and self.resource_thread.isRunning()):
+            return
+        plan = self.run_plan
+        local_pids = [job["process"].processId() for job in plan.jobs
+                      if job["state"] == "running" and "remote" not in job and job.get("process")]
+        self.resource_thread = BackgroundTask(lambda log, cancelled: sample_resources(plan, local_pids))
+        self.resource_thread.succeeded.connect(lambda point: self._on_resource_sample(plan, point))
+        self.resource_thread.start()
+
+    def _on_resource_sample(self, plan, point):
+        if point is not None:
+            self.ui.resource_label.setText(plan.sampler.summary())
+
+    def _poll_batch(self):
+        if not self.run_plan or (self.batch_thread and self.batch_thread.isRunning()):
+            return
+        plan = self.run_plan
+        self.batch_thread = BackgroundTask(lambda log, cancelled: poll_batch([plan]))
+        self.batch_thread.succeeded.connect(lambda updates: self._on_batch_status(plan, updates))
+        self.batch_thread.failed.connect(
+            lambda error: self.ui.log_output.append(f"Batch status query failed ({error}); retrying."))
+        self.batch_thread.start()
+
+    def _on_batch_status(self, plan, updates):
+        if plan is not self.run_plan:
+            return
+        for job, data, exit_code in updates:
+            self._show_job_output(job, data)
+            if exit_code is not None:
+                self._on_job_finished(job, exit_code, QProcess.NormalExit)
 
-            remote_users_config_dir = os.path.join(remote_path, USERS_CONFIG_DIR)
-            remote_config_filename = os.path.basename(self.config_path)
-            remote_config_path = os.path.join(remote_users_config_dir, remote_config_filename)
-
-            user_host, remote_openram_path = openram_path.split(':', 1)
-            sram_compiler_script = os.path.join(remote_openram_path, "sram_compiler.py")
-            remote_openram_activate_script = os.path.join(remote_openram_path, "openram_env", "bin", "activate")
-            remote_miniconda_activate_script = os.path.join(remote_openram_path, "miniconda", "bin", "activate")
-            remote_setpaths_script = os.path.join(remote_openram_path, "setpaths.sh")
-
-            remote_command = f"""
-                cd {remote_openram_path} && \
-                source {remote_openram_activate_script} && \
-                source {remote_miniconda_activate_script} && \
-                source {remote_setpaths_script} && \
-                python3 -u {sram_compiler_script} {remote_config_path}                 
-            """
-
-            ssh_command = [
-                "ssh",
-                "-i", os.path.join(os.path.dirname(__file__), "openram_key"),
-                f"{user}@{host}",
-                remote_command
-            ]
+    def _start_job(self, job):
+        if job["state"] != "pending":
+            return
+        if "remote" in job:
+            self._launch_detached(job)
+            return
+        process = QProcess()
+        process.setProcessChannelMode(QProcess.MergedChannels)
+        process.readyReadStandardOutput.connect(lambda j=job: self.on_output_ready(j))
+        process.finished.connect(lambda code, status, j=job: self._on_job_finished(j, code, status))
+        job["process"] = process
+        job["state"] = "running"
+        job["parser"].start_time = time.time()
+        if job["label"]:
+            self.ui.log_output.append(f"Starting corner job {job['label']}")
+        if "command" in job:
+            environment = QProcessEnvironment()
+            for name, value in job["env"].items():
+                environment.insert(name, value)
+            process.setProcessEnvironment(environment)
+            process.start(job["command"][0], job["command"][1:])
+        else:
+            process.start("bash", [job["script"]])
+
+    def _launch_detached(self, job):
+        """Starts a remote job in its own session on the server, then follows its log."""
+        try:
+            pid = launch_detached(self.run_plan, job)
+        except RunError as e:
+            self.ui.log_output.append(str(e))
+            self._on_job_finished(job, 1, QProcess.NormalExit)
+            return
 
-            self.process = QProcess()
-            self.process.setProcessChannelMode(QProcess.MergedChannels)
-            self.process.readyReadStandardOutput.connect(self.on_output_ready)
-            self.process.finished.connect(lambda code, status: self.on_run_finished(code, status))
-            self.process.start("ssh", ssh_command[1:])
+        job["parser"].start_time = time.time()
+        label = f" {job['label']}" if job["label"] else ""
+        self.ui.log_output.append(f"Started detached job{label} on {job['remote']['host']} (pid {pid}), log: {job['job_dir']}/run.log")
+        self._attach_job(job)
 
-        else:  # Local execution
-            sram_compiler_script = os.path.join(openram_path, "sram_compiler.py")
-            command_to_run = f"python3 -u {sram_compiler_script} {self.config_path}"
+    def _attach_job(self, job):
+        """Tails a detached job's log from the last byte received."""
+        if not self.run_plan or not any(j is job for j in self.run_plan.jobs) or job["state"] != "running":
+            return
+        process = QProcess()
+        process.readyReadStandardOutput.connect(lambda j=job: self.on_output_ready(j))
+        process.readyReadStandardError.connect(lambda j=job: self._on_tail_stderr(j))
+        process.finished.connect(lambda code, status, j=job: self._on_tail_finished(j))
+        job["process"] = process
+        job["exit_code"] = None
+        process.start("ssh", tail_ssh_args(job))
+
+    def _on_tail_stderr(self, job):
+        text = job["process"].readAllStandardError().data().decode(errors='replace')
+        exit_code = parse_exit_marker(text)
+        if exit_code is not None:
+            job["exit_code"] = exit_code
+
+    def _on_tail_finished(self, job):
+        self.on_output_ready(job)
+        self._on_tail_stderr(job)
+        if job["exit_code"] is None:
+            # The connection dropped while the job keeps running on the server
+            delay = job["retry_delay"] = min(job.get("retry_delay", 2) * 2, 60)
+            self.ui.log_output.append(
+                f"Lost connection to {job['label'] or 'the remote job'}; reattaching in {delay} s "
+                f"(resuming the log at byte {job['offset']}).")
+            QTimer.singleShot(delay * 1000, lambda j=job: self._attach_job(j))
+            return
+        job["retry_delay"] = 2
+        self._on_job_finished(job, job["exit_code"], QProcess.NormalExit)
 
-            self.temp_script_path = self._create_temp_script(command_to_run)
-            if not self.temp_script_path:
-                self.ui.run_button.setEnabled(True)
-                self.ui.run_button.setText("Run OpenRAM")
-                return
+    def resume_detached_runs(self):
+        """Reattaches to the journaled remote run that was in flight when the app last closed."""
+        if self.run_plan or self.planning_run:
+            return
+        plan = resume_run()
+        if not plan:
+            return
+        self.run_plan = plan
 
-            self.process = QProcess()
-            self.process.setProcessChannelMode(QProcess.MergedChannels)
-            self.process.readyReadStandardOutput.connect(self.on_output_ready)
-            self.process.finished.connect(lambda code, status: self.on_run_finished(code, status))
-            self.process.start("bash", [self.temp_script_path])
+        self.ui.run_button.setEnabled(False)
+        self.ui.quick_look_button.setEnabled(False)
+        self.ui.run_button.setText("Running...")
+        self.ui.log_output.append(f"Reattaching to remote run on {plan.remote[1]} ({len(plan.jobs)} job(s))...")
+        self.ui.run_progress.show()
+        self.ui.run_status_label.show()
+        self.progress_timer.start(1000)
+        self._start_resource_sampling()
+
+        for job in plan.jobs:
+            if job["state"] == "running":
+                self._attach_job(job)
+        if any(job["state"] == "pending" for job in plan.jobs):
+            self._start_pending_jobs()
+        elif is_complete(plan):
+            self._finish_run_jobs(QProcess.NormalExit)
 
     def _append_log(self, message):
         self.ui.log_output.append(message)
 
-    def on_output_ready(self):
-        output = self.process.readAllStandardOutput().data().decode(errors='replace')
-        self.ui.log_output.append(output.strip())
+    def on_output_ready(self, job):
+        self._show_job_output(job, job["process"].readAllStandardOutput().data())
+
+    def _show_job_output(self, job, data):
+        output, new_steps = record_job_output(job, data)
+        if new_steps:
+            self._update_run_progress()
+        if not output:
+            return
+        output = output.strip()
+        if job["label"]:
+            output = "\n".join(f"[{job['label']}] {line}" for line in output.splitlines())
+        self.ui.log_output.append(output)
+
+    def _update_run_progress(self):
+        """Refreshes the progress bar, current stage and ETA from the jobs' log parsers."""
+        if not self.run_plan:
+            return
+        fraction, status, eta = run_progress(self.run_plan)
+        if self.run_plan.background:
+            status = f"Full run of {self.run_plan.config_name} (background): {status}"
+        self.ui.run_progress.setValue(int(fraction * 100))
+        if eta is not None:
+            status += f"  ·  ETA ~{format_seconds(eta)}"
+        self.ui.run_status_label.setText(status)
+
+    def _on_job_finished(self, job, exitCode, exitStatus):
+        record_job_finished(self.run_plan, job, exitCode, crashed=exitStatus != QProcess.NormalExit)
+        if job["label"]:
+            self.ui.log_output.append(f"Corner job {job['label']} finished with exit code {exitCode}.")
+
+        if any(j["state"] == "pending" for j in self.run_plan.jobs):
+            self._start_pending_jobs()
+            return
+        if not is_complete(self.run_plan):
+            return
+
+        self._finish_run_jobs(exitStatus)
+
+    def _finish_run_jobs(self, exitStatus):
+        plan = self.run_plan
+        finish_run(plan, log=self._append_log)
+        self.on_run_finished(plan.exit_code, exitStatus)
 
     def on_run_finished(self, exitCode, exitStatus=QProcess.NormalExit):
         self.ui.log_output.append(f"\nOpenRAM process finished.")
@@ -261,14 +488,24 @@ class Controller:
         if isinstance(exitStatus, QProcess.ExitStatus):
              self.ui.log_output.append(f"Exit Status: {'Normal' if exitStatus == QProcess.NormalExit else 'Crash'}")
 
-        self.ui.run_button.setEnabled(True)
-        self.ui.run_button.setText("Run OpenRAM")
-
-        if self.temp_script_path and os.path.exists(self.temp_script_path):
-            os.unlink(self.temp_script_path)
-            self.temp_script_path = None
-
-        self.process = None
+        self._reset_run_button()
+        self.progress_timer.stop()
+        self.batch_timer.stop()
+        self.resource_timer.stop()
+        self.ui.run_progress.hide()
+        self.ui.run_status_label.hide()
+        plan = self.run_plan
+        self.run_plan = None
+
+        if plan and plan.profile == "quick":
+            if exitCode == 0:
+                self.ui.log_output.append(f"Quick look results are in {plan.output_path}; the full run is queued.")
+            else:
+                # Its full run would fail the same way
+                for queued in [queued for queued in self.run_queue if queued.get("linked_run_id") == plan.run_id]:
+                    self._drop_queued_run(queued)
+                self.ui.log_output.append("The quick look failed, so its full run was not started.")
+        QTimer.singleShot(0, self._start_next_run)
 
     def view_gds(self):
         if not self.config_path:
@@ -276,87 +513,56 @@ class Controller:
             return
 
         config = _load_config_file(self.config_path)
-        output_path_from_config = config.get(OUTPUT_PATH, ".")
-
-        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-        openram_path = advanced_config.get("openram_path", "")
-        is_remote = '@' in openram_path and ':' in openram_path
-
-        gds_file_to_open = None
+        try:
+            user, host, output_path = output_location(config)
+        except ValueError:
+            QMessageBox.critical(self.ui, "Error", "Invalid remote path format. Use user@host:/path/to/openram")
+            return
 
-        if is_remote:
+        if user:
             self.ui.log_output.append("Remote GDS: Downloading file...")
             QCoreApplication.processEvents()
 
-            try:
-                user_host, remote_openram_path = openram_path.split(':', 1)
-                user, host = user_host.split('@', 1)
-            except ValueError:
-                QMessageBox.critical(self.ui, "Error", "Invalid remote path format. Use user@host:/path/to/openram")
-                return
-
-            remote_output_path = os.path.join(remote_openram_path, output_path_from_config)
-            list_gds_command = f'ls -1 {remote_output_path}/*.gds 2>/dev/null'
-            
-            try:
-                ssh_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", list_gds_command]
-                process = subprocess.run(ssh_command, check=True, capture_output=True, text=True)
-                gds_files_full_paths = process.stdout.strip().split('\n')
-                gds_files_full_paths = [f for f in gds_files_full_paths if f]
-                err = process.stderr.strip()
-                if err:
-                    QMessageBox.warning(self.ui, "Warning", f"Could not list remote GDS files: {err}")
-                    return
-            except subprocess.CalledProcessError as e:
-                QMessageBox.warning(self.ui, "Warning", f"Error listing remote GDS files: {e.stderr}")
-                return
-
-            if not gds_files_full_paths:
-                QMessageBox.warning(self.ui, "Warning", f"No GDS file found in remote directory: {remote_output_path}")
-                return
+        try:
+            gds_files = list_gds_files(config)
+        except RemoteError as e:
+            QMessageBox.warning(self.ui, "Warning", f"Error listing remote GDS files: {e}")
+            return
 
-            remote_gds_file_path = None
-            if len(gds_files_full_paths) == 1:
-                remote_gds_file_path = gds_files_full_paths[0]
-            else:
-                file_names = [os.path.basename(f) for f in gds_files_full_paths]
-                file_name, ok = QInputDialog.getItem(self.ui, "Select Remote GDS File", "Multiple GDS files found...", file_names, 0, False)
-                if ok and file_name:
-                    remote_gds_file_path = next((path for path in gds_files_full_paths if os.path.basename(path) == file_name), None)
+        if not gds_files:
+            QMessageBox.warning(self.ui, "Warning", f"No GDS file found in {output_path}")
+            return
 
-            if remote_gds_file_path:
-                try:
-                    with tempfile.NamedTemporaryFile(mode='wb', delete=False, suffix='.gds') as tmp:
-                        self.ui.log_output.append(f"Downloading {os.path.basename(remote_gds_file_path)} to temporary file...")
-                        QCoreApplication.processEvents()
-                        scp_command = ["scp", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}:{remote_gds_file_path}", tmp.name]
-                        subprocess.run(scp_command, check=True)
-                        gds_file_to_open = tmp.name
-                    self.ui.log_output.append("Download complete.")
-                except subprocess.CalledProcessError as e:
-                    QMessageBox.critical(self.ui, "SFTP Error", f"Failed to download GDS file: {e.stderr}")
-                    return
-        
-        else:  # Local execution
-            gds_files = glob.glob(os.path.join(output_path_from_config, "*.gds"))
+        gds_file = None
+        if len(gds_files) == 1:
+            gds_file = gds_files[0]
+        else:
+            file_names = [os.path.basename(f) for f in gds_files]
+            file_name, ok = QInputDialog.getItem(self.ui, "Select GDS File", "Multiple GDS files found...",
+                                                 file_names, 0, False)
+            if ok and file_name:
+                gds_file = next((path for path in gds_files if os.path.basename(path) == file_name), None)
+        if not gds_file:
+            return
 
-            if not gds_files:
-                QMessageBox.warning(self.ui, "Warning", f"No GDS file found in {output_path_from_config}")
-                return
+        if not user:
+            self._open_gds(gds_file)
+            return
+        if self.gds_thread and self.gds_thread.isRunning():
+            QMessageBox.warning(self.ui, "Warning", "A GDS download is already in progress.")
+            return
 
-            if len(gds_files) == 1:
-                gds_file_to_open = gds_files[0]
-            else:
-                file_names = [os.path.basename(f) for f in gds_files]
-                file_name, ok = QInputDialog.getItem(self.ui, "Select GDS File", "Multiple GDS files found...",
-                                                     file_names, 0, False)
-                if ok and file_name:
-                    gds_file_to_open = os.path.join(output_path_from_config, file_name)
+        self.ui.log_output.append(f"Fetching {os.path.basename(gds_file)}...")
+        self.gds_thread = BackgroundTask(lambda log, cancelled: fetch_gds(config, gds_file, log=log, cancelled=cancelled))
+        self.gds_thread.message.connect(self._append_log)
+        self.gds_thread.succeeded.connect(self._open_gds)
+        self.gds_thread.failed.connect(lambda error: QMessageBox.critical(self.ui, "SFTP Error", f"Failed to download GDS file: {error}"))
+        self.gds_thread.start()
 
-        if gds_file_to_open:
-            self.ui.log_output.append(f"Opening {gds_file_to_open} with KLayout...")
-            command = f"klayout {gds_file_to_open}"
-            QProcess.startDetached("bash", ["-c", command])
+    def _open_gds(self, gds_file_to_open):
+        self.ui.log_output.append(f"Opening {gds_file_to_open} with KLayout...")
+        command = f"klayout {gds_file_to_open}"
+        QProcess.startDetached("bash", ["-c", command])
 
     def view_output(self):
         if not self.config_path:
@@ -364,63 +570,77 @@ class Controller:
             return
 
         config = _load_config_file(self.config_path)
-        output_path_from_config = config.get(OUTPUT_PATH, ".")
-        config_name = os.path.splitext(os.path.basename(self.config_path))[0]
+        config_name = self.config_name or os.path.splitext(os.path.basename(self.config_path))[0]
 
         output_widget = QWidget()
         layout = QVBoxLayout(output_widget)
 
         config_label = QLabel(f"Current Config:   <b>{config_name}</b>")
         layout.addWidget(config_label)
+        quick_look = self.history.latest_quick_look(self.config_id) if self.config_id else None
+        if quick_look:
+            layout.addWidget(QLabel(_describe_quick_look(quick_look, self.run_queue, config_name)))
 
         file_list_label = QLabel("Output Files:")
         layout.addWidget(file_list_label)
 
-        file_list = QListWidget()
-        layout.addWidget(file_list)
-
-        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-        openram_path = advanced_config.get("openram_path", "")
-        is_remote = '@' in openram_path and ':' in openram_path
-
-        source_path_for_download = ""
-        
-        if is_remote:
-            try:
-                user_host, remote_openram_path = openram_path.split(':', 1)
-                user, host = user_host.split('@', 1)
-                remote_output_path = os.path.join(remote_openram_path, output_path_from_config)
-                source_path_for_download = remote_output_path
-            except ValueError:
-                file_list.addItem("Invalid remote path format in advanced settings.")
-                QMessageBox.critical(self.ui, "Error", "Invalid remote path format. Use user@host:/path/to/openram")
-                return
-
-            list_files_command = f'ls -F {remote_output_path} 2>/dev/null'
-            try:
-                ssh_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", list_files_command]
-                process = subprocess.run(ssh_command, check=True, capture_output=True, text=True)
-                files = process.stdout.strip().split('\n')
-                err = process.stderr.strip()
-                if err:
-                     file_list.addItem(f"Could not list remote directory (or it's empty).")
-                     file_list.addItem(f"Error: {err}")
-                else:
-                    file_list.addItems([f for f in files if f])
-            except subprocess.CalledProcessError as e:
-                file_list.addItem(f"Error listing remote files: {e.stderr}")
+        try:
+            user, host, source_path_for_download = output_location(config)
+        except ValueError:
+            QMessageBox.critical(self.ui, "Error", "Invalid remote path format. Use user@host:/path/to/openram")
+            return
+        is_remote = user is not None
 
-        else:  # Local execution
-            source_path_for_download = output_path_from_config
-            try:
-                files = sorted(os.listdir(output_path_from_config))
-                file_list.addItems(files)
-            except FileNotFoundError:
-                file_list.addItem("Output directory not found.")
+        manifest = []
+        try:
+            manifest = output_manifest(config)
+            if not manifest:
+                layout.addWidget(QLabel("The output directory is empty."))
+        except RemoteError as e:
+            layout.addWidget(QLabel(f"Error listing remote files: {e}"))
+        except FileNotFoundError:
+            layout.addWidget(QLabel("Output directory not found."))
+
+        file_table = QTableWidget()
+        file_table.setColumnCount(5)
+        file_table.setHorizontalHeaderLabels(["File", "Type", "Size", "Modified", "Run"])
+        file_table.setRowCount(len(manifest))
+        for i, entry in enumerate(manifest):
+            name_item = QTableWidgetItem(entry["name"])
+            name_item.setFlags(name_item.flags() | Qt.ItemIsUserCheckable)
+            name_item.setCheckState(Qt.Unchecked)
+            file_table.setItem(i, 0, name_item)
+            file_table.setItem(i, 1, QTableWidgetItem(entry["type"]))
+            file_table.setItem(i, 2, QTableWidgetItem(format_size(entry["size"])))
+            file_table.setItem(i, 3, QTableWidgetItem(_format_time(entry["mtime"])))
+            file_table.setItem(i, 4, QTableWidgetItem("Quick look" if entry["profile"] == "quick" else "Full"))
+        file_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        # One checkbox per artifact type toggles all of its files
+        type_layout = QHBoxLayout()
+        for artifact_type in sorted(set(entry["type"] for entry in manifest)):
+            entries = [entry for entry in manifest if entry["type"] == artifact_type]
+            type_checkbox = QCheckBox(f"{artifact_type} ({len(entries)}, {format_size(sum(e['size'] for e in entries))})")
+            type_checkbox.toggled.connect(
+                lambda checked, t=artifact_type: self._check_artifact_type(file_table, manifest, t, checked))
+            type_layout.addWidget(type_checkbox)
+        type_layout.addStretch()
+        layout.addLayout(type_layout)
+        layout.addWidget(file_table)
+
+        selection_label = QLabel("No files selected.")
+        file_table.itemChanged.connect(lambda _: selection_label.setText(
+            _describe_selection(self._selected_artifacts(file_table, manifest))))
+        layout.addWidget(selection_label)
 
         button_layout = QHBoxLayout()
+        download_selected_button = QPushButton("Download Selected")
+        download_selected_button.clicked.connect(
+            lambda: self.download_selected_outputs(config, self._selected_artifacts(file_table, manifest)))
+        button_layout.addWidget(download_selected_button)
+
         self.ui.download_button = QPushButton("Download Output Folder")
-        self.ui.download_button.clicked.connect(lambda: self.download_output_folder(source_path_for_download, is_remote))
+        self.ui.download_button.clicked.connect(lambda: self.download_output_folder(source_path_for_download, user, host))
         button_layout.addWidget(self.ui.download_button)
 
         view_gds_button = QPushButton("View GDS")
@@ -436,19 +656,56 @@ class Controller:
 
         self.ui.scroll_area.setWidget(output_widget)
 
-    def download_output_folder(self, source_path, is_remote):
-        if self.download_process and self.download_process.state() != QProcess.NotRunning:
+    def _check_artifact_type(self, file_table, manifest, artifact_type, checked):
+        for i, entry in enumerate(manifest):
+            if entry["type"] == artifact_type:
+                file_table.item(i, 0).setCheckState(Qt.Checked if checked else Qt.Unchecked)
+
+    def _selected_artifacts(self, file_table, manifest):
+        return [entry for i, entry in enumerate(manifest) if file_table.item(i, 0).checkState() == Qt.Checked]
+
+    def download_selected_outputs(self, config, entries):
+        if not entries:
+            QMessageBox.warning(self.ui, "Warning", "Select the files to download first.")
+            return
+        if self.download_thread and self.download_thread.isRunning():
             QMessageBox.warning(self.ui, "Warning", "A download is already in progress.")
             return
 
+        destination = QFileDialog.getExistingDirectory(self.ui, "Download Selected Files To", str(Path.home()))
+        if not destination:
+            return
+
+        self.ui.log_output.append("\n--- Starting Download ---")
+        self.download_thread = BackgroundTask(
+            lambda log, cancelled: fetch_selected_outputs(config, entries, destination, log=log, cancelled=cancelled))
+        self.download_thread.message.connect(self._append_log)
+        self.download_thread.succeeded.connect(lambda _: self.on_download_finished(True, save_path=destination))
+        self.download_thread.failed.connect(lambda error: self.on_download_finished(False, error))
+        user, host, output_path = output_location(config)
+        self.download_id = self.history.start_download(self.config_id, host or "localhost", output_path, destination)
+        self.download_thread.start()
+        self.ui.download_button.setText("Cancel")
+
+    def download_output_folder(self, source_path, user=None, host=None):
+        """Archives and saves an output folder; `user` and `host` are where it lives (see output_location)."""
+        is_remote = user is not None
+        if self.download_thread and self.download_thread.isRunning():
+            # The button doubles as Cancel while a download or archive is in progress
+            self.ui.log_output.append("Cancelling...")
+            self.download_thread.requestInterruption()
+            return
+
         suggested_name = os.path.basename(source_path.strip('/')) + ".zip"
         
         home_dir = str(Path.home())
         initial_dir = os.path.join(home_dir, "Downloads")
         if not os.path.isdir(initial_dir):
             initial_dir = home_dir
-        
-        save_path, _ = QFileDialog.getSaveFileName(self.ui, "Save Zip File", os.path.join(initial_dir, suggested_name), "Zip Files (*.zip)")
+
+        # Remote folders are zipped on the server; local ones can use any archive format
+        file_filters = ARCHIVE_FILE_FILTERS if not is_remote else {"Zip Files (*.zip)": "zip"}
+        save_path, selected_filter = QFileDialog.getSaveFileName(self.ui, "Save Archive", os.path.join(initial_dir, suggested_name), ";;".join(file_filters))
 
         if not save_path:
             self.ui.log_output.append("Download cancelled by user.")
@@ -459,90 +716,64 @@ class Controller:
         self.ui.log_output.append("\n--- Starting Download ---")
 
         if is_remote:
-            self.ui.log_output.append(f"Zipping remote folder: {source_path}")
-            
-            advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-            openram_path = advanced_config.get("openram_path", "")
-            try:
-                user_host, _ = openram_path.split(':', 1)
-                user, host = user_host.split('@', 1)
-
-                remote_zip_path = f"/tmp/{os.path.basename(source_path)}.zip"
-                
-                # Command to zip the folder on the remote server
-                zip_command = f"cd {os.path.dirname(source_path)} && zip -r {remote_zip_path} {os.path.basename(source_path)}"
-                
-                ssh_zip_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", zip_command]
-
-                # Run zipping process
-                process = subprocess.run(ssh_zip_command, capture_output=True, text=True)
-                if process.returncode != 0:
-                    QMessageBox.critical(self, "Error", f"Failed to zip remote folder: {process.stderr}")
-                    self.ui.download_button.setEnabled(True)
-                    self.ui.download_button.setText("Download Output Folder")
-                    return
-
-                self.ui.log_output.append("Zipping complete. Starting download...")
-                self.ui.download_button.setText("Downloading...")
-
-                # Command to download the zip file
-                scp_command = ["scp", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}:{remote_zip_path}", save_path]
-
-                self.download_process = QProcess()
-                self.download_process.setProcessChannelMode(QProcess.MergedChannels)
-                self.download_process.readyReadStandardOutput.connect(self._on_download_output_ready)
-                self.download_process.finished.connect(lambda code, status: self.on_download_process_finished(code, status, remote_zip_path=remote_zip_path))
-                self.download_process.start("scp", scp_command[1:])
-
-            except Exception as e:
-                QMessageBox.critical(self.ui, "Error", f"An unexpected error occurred: {e}")
-                self.ui.download_button.setEnabled(True)
-                self.ui.download_button.setText("Download Output Folder")
-
-        else: # Local zipping
-            try:
-                self.ui.log_output.append(f"Zipping local folder {source_path} to {save_path}...")
-                shutil.make_archive(os.path.splitext(save_path)[0], 'zip', source_path)
-                QMessageBox.information(self.ui, "Success", f"Output folder zipped successfully to {save_path}")
-            except Exception as e:
-                QMessageBox.critical(self.ui, "Error", f"An unexpected error occurred during local zipping: {e}")
-            finally:
-                self.ui.download_button.setEnabled(True)
-                self.ui.download_button.setText("Download Output Folder")
-
-    def _on_download_output_ready(self):
-        output = self.download_process.readAllStandardOutput().data().decode(errors='replace')
-        self._append_log(output.strip())
-
-    def on_download_process_finished(self, exitCode, exitStatus, remote_zip_path=None):
+            # Zipped on the server, then a chunked SFTP download; an interrupted one resumes from its .part file
+            zip_path = remote_zip_path(source_path)
+            self.download_thread = BackgroundTask(lambda log, cancelled: download_remote_output(
+                user, host, source_path, save_path, log=log, cancelled=cancelled))
+            self.download_thread.message.connect(self._append_log)
+            self.download_thread.succeeded.connect(lambda _: self.on_download_finished(
+                True, remote_zip_path=zip_path, save_path=save_path, remote=(user, host)))
+            self.download_thread.failed.connect(lambda error: self.on_download_finished(
+                False, error, remote_zip_path=zip_path, save_path=save_path, remote=(user, host)))
+            self.download_id = self.history.start_download(self.config_id, host, source_path, save_path)
+            self.download_thread.start()
+
+        else: # Local archiving, on a background thread
+            archive_format = file_filters.get(selected_filter, "zip")
+            extension = ARCHIVE_FORMATS[archive_format]
+            if not save_path.endswith(extension):
+                save_path = os.path.splitext(save_path)[0] + extension
+            self.download_thread = BackgroundTask(
+                lambda log, cancelled: create_archive(source_path, save_path, archive_format, log=log, cancelled=cancelled))
+            self.download_thread.message.connect(self._append_log)
+            self.download_thread.succeeded.connect(lambda _: self.on_download_finished(True, save_path=save_path))
+            self.download_thread.failed.connect(lambda error: self.on_download_finished(False, error, save_path=save_path))
+            self.download_id = self.history.start_download(self.config_id, "localhost", source_path, save_path)
+            self.download_thread.start()
+
+        self.ui.download_button.setEnabled(True)
+        self.ui.download_button.setText("Cancel")
+
+    def on_download_finished(self, success, error=None, remote_zip_path=None, save_path=None, remote=None):
+        """`remote` is the (user, host) holding `remote_zip_path`."""
         self.ui.download_button.setEnabled(True)
         self.ui.download_button.setText("Download Output Folder")
-        
-        output = self.download_process.readAllStandardOutput().data().decode(errors='replace')
-        if output:
-            self.ui.log_output.append(output.strip())
 
-        if exitCode == 0:
-            QMessageBox.information(self.ui, "Success", f"Output folder downloaded successfully.")
+        if self.download_id:
+            size = None
+            if success and save_path and os.path.isdir(save_path):
+                size = local_folder_size(save_path)
+            elif success and save_path and os.path.exists(save_path):
+                size = os.path.getsize(save_path)
+            self.history.finish_download(self.download_id, success, size)
+            self.download_id = None
+
+        if success:
+            QMessageBox.information(self.ui, "Success", f"Outputs saved to {save_path}.")
             if remote_zip_path:
                 # Clean up the remote zip file
                 try:
-                    advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-                    openram_path = advanced_config.get("openram_path", "")
-                    user_host, _ = openram_path.split(':', 1)
-                    user, host = user_host.split('@', 1)
-                    
-                    rm_command = f"rm {remote_zip_path}"
-                    ssh_rm_command = ["ssh", "-i", os.path.join(os.path.dirname(__file__), "openram_key"), f"{user}@{host}", rm_command]
-                    subprocess.run(ssh_rm_command)
+                    user, host = remote
+                    run_ssh(user, host, f"rm {remote_zip_path}")
                     self.ui.log_output.append(f"Cleaned up remote file: {remote_zip_path}")
-                except Exception as e:
+                except RemoteError as e:
                     self.ui.log_output.append(f"Warning: Failed to clean up remote zip file: {e}")
         else:
-            QMessageBox.critical(self.ui, "Error", f"Download process failed with exit code {exitCode}.")
+            resume_hint = "\nDownloading to the same file again resumes it." if remote_zip_path else ""
+            QMessageBox.critical(self.ui, "Error", f"Download failed: {error}{resume_hint}")
         
         self.ui.log_output.append(f"\n--- Download Finished ---")
-        self.download_process = None
+        self.download_thread = None
 
     def show_advanced_settings(self):
         if self.ui.editor:
@@ -554,24 +785,24 @@ class Controller:
         self.ui.editor.setMinimumWidth(400)
         self.ui.scroll_area.setWidget(self.ui.editor)
 
-    def _view_config_popup(self, file_path):
-        try:
-            with open(file_path, 'r') as f:
-                content = f.read()
-            
-            dialog = QDialog(self.ui)
-            dialog.setWindowTitle(os.path.basename(file_path))
-            layout = QVBoxLayout(dialog)
-            
-            text_edit = QTextEdit()
-            text_edit.setReadOnly(True)
-            text_edit.setText(content)
-            layout.addWidget(text_edit)
-            
-            dialog.exec()
-
-        except Exception as e:
-            QMessageBox.critical(self.ui, "Error", f"Failed to read config file: {e}")
+    def _view_config_popup(self, title, content):
+        dialog = QDialog(self.ui)
+        dialog.setWindowTitle(title)
+        layout = QVBoxLayout(dialog)
+
+        text_edit = QTextEdit()
+        text_edit.setReadOnly(True)
+        text_edit.setText(content)
+        layout.addWidget(text_edit)
+
+        dialog.exec()
+
+    def _view_stored_config(self, config_id):
+        config = self.history.get_config(config_id)
+        if not config or config["content"] is None:
+            QMessageBox.critical(self.ui, "Error", "No stored copy of this config is available.")
+            return
+        self._view_config_popup(f"{config['name']}.py", config["content"])
 
     def show_home_screen(self):
         if self.ui.editor:
@@ -582,71 +813,178 @@ class Controller:
         home_widget = QWidget()
         layout = QVBoxLayout(home_widget)
 
+        if not self.history.has_configs():
+            self.history.import_local_configs(USERS_CONFIG_DIR)
+
         # Recent Activity Table
         activity_label = QLabel("<b>Recent Activity</b>")
         layout.addWidget(activity_label)
-        
-        table = self._get_file_properties_as_table(USERS_CONFIG_DIR)
-        layout.addWidget(table)
+        layout.addWidget(self._get_recent_configs_table())
+
+        runs_label = QLabel("<b>Recent Runs</b>")
+        layout.addWidget(runs_label)
+        layout.addWidget(self._get_runs_table(self.history.recent_runs(10), show_config=True))
+
+        stage_profile_button = QPushButton("Stage Profile by Size")
+        stage_profile_button.clicked.connect(self._view_stage_profile)
+        layout.addWidget(stage_profile_button)
 
-        # # Advanced Settings
-        # advanced_config_content = ""
-        # try:
-        #     advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
-        #     advanced_config_content = "<br><br><b>--- Current Advanced Settings ---</b><br>"
-        #     for key, value in advanced_config.items():
-        #         advanced_config_content += f"{key} = {value}<br>"
-        # except FileNotFoundError:
-        #     advanced_config_content = "\n\nAdvanced config file not found."
-        # except Exception as e:
-        #     advanced_config_content = f"\n\nError loading advanced config: {e}"
-
-        # advanced_settings_label = QLabel(advanced_config_content)
-        # layout.addWidget(advanced_settings_label)
+        compare_button = QPushButton("Compare Results")
+        compare_button.clicked.connect(self._view_results_comparison)
+        layout.addWidget(compare_button)
 
         self.ui.scroll_area.setWidget(home_widget)
 
-    def _get_file_properties_as_table(self, folder_path: str):
-        path = Path(folder_path)
+    def _get_recent_configs_table(self, limit=5):
+        recent_configs = self.history.recent_configs(limit)
 
-        if not path.exists() or not path.is_dir():
-            label = QLabel(f"Path '{folder_path}' does not exist or is not a directory.")
-            return label
+        table = QTableWidget()
+        table.setColumnCount(5)
+        table.setHorizontalHeaderLabels(["Config Name", "Location", "Last Opened", "Last Modified", "Actions"])
+        table.setRowCount(len(recent_configs))
+
+        for i, config in enumerate(recent_configs):
+            table.setItem(i, 0, QTableWidgetItem(config["name"]))
+            table.setItem(i, 1, QTableWidgetItem(config["location"]))
+            table.setItem(i, 2, QTableWidgetItem(_format_time(config["last_opened"])))
+            table.setItem(i, 3, QTableWidgetItem(_format_time(config["last_modified"])))
+
+            actions = QWidget()
+            actions_layout = QHBoxLayout(actions)
+            actions_layout.setContentsMargins(0, 0, 0, 0)
+            view_button = QPushButton("View Config")
+            view_button.clicked.connect(lambda _, c=config["id"]: self._view_stored_config(c))
+            history_button = QPushButton("History")
+            history_button.clicked.connect(lambda _, c=config: self._view_config_history(c))
+            actions_layout.addWidget(view_button)
+            actions_layout.addWidget(history_button)
+            table.setCellWidget(i, 4, actions)
 
-        # Gather all files with access time
-        files = []
-        for file in path.iterdir():
-            if file.is_file() and file.suffix == '.py':
-                stats = file.stat()
-                files.append({
-                    "name": file.stem,
-                    "path": str(file),
-                    "accessed": stats.st_atime,
-                    "modified": stats.st_mtime
-                })
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Stretch)
+
+        return table
 
-        # Sort by access time, descending, and take the last 3 accessed files
-        recent_files = sorted(files, key=lambda x: x["accessed"], reverse=True)[:3]
+    def _get_runs_table(self, runs, show_config=False):
+        headers = ["Host", "Started", "Duration", "Exit Code", "Output Size", "Slowest Stage", "Profile"]
+        if show_config:
+            headers.insert(0, "Config Name")
 
         table = QTableWidget()
-        table.setColumnCount(4)
-        table.setHorizontalHeaderLabels(["Config Name", "Last Accessed", "Last Modified", "Actions"])
-        table.setRowCount(len(recent_files))
-
-        for i, file in enumerate(recent_files):
-            table.setItem(i, 0, QTableWidgetItem(file['name']))
-            table.setItem(i, 1, QTableWidgetItem(time.strftime('%d %b, %Y %H:%M:%S', time.localtime(file["accessed"]))))
-            table.setItem(i, 2, QTableWidgetItem(time.strftime('%d %b, %Y %H:%M:%S', time.localtime(file["modified"]))))
-            
-            view_button = QPushButton("View Config")
-            view_button.clicked.connect(lambda _, p=file["path"]: self._view_config_popup(p))
-            table.setCellWidget(i, 3, view_button)
+        table.setColumnCount(len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setRowCount(len(runs))
+
+        for i, run in enumerate(runs):
+            row = [
+                run["host"] or "",
+                _format_time(run["start_time"]),
+                _format_duration(run["start_time"], run["end_time"]),
+                "" if run["exit_code"] is None else str(run["exit_code"]),
+                "" if run["output_size"] is None else format_size(run["output_size"]),
+                _format_slowest_stage(self.history.slowest_stage(run["id"])),
+                _format_profile(run),
+            ]
+            if show_config:
+                row.insert(0, run.get("config_name") or "")
+            for j, text in enumerate(row):
+                table.setItem(i, j, QTableWidgetItem(text))
 
         header = table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.Stretch)        
+        header.setSectionResizeMode(QHeaderView.Stretch)
 
         return table
 
+    def _view_stage_profile(self):
+        """Shows the average time per stage for each SRAM size, to see which stage dominates as sizes grow."""
+        rows = self.history.stage_breakdown_by_size()
+        stages = sorted(set(STAGE_GROUPS.get(row["stage"], row["stage"]) for row in rows))
+        by_size = {}
+        for row in rows:
+            stage = STAGE_GROUPS.get(row["stage"], row["stage"])
+            sizes = by_size.setdefault(row["bits"], {})
+            sizes[stage] = sizes.get(stage, 0) + row["seconds"]
+
+        table = QTableWidget()
+        table.setColumnCount(len(stages) + 1)
+        table.setHorizontalHeaderLabels(["Size (bits)"] + stages)
+        table.setRowCount(len(by_size))
+        for i, (bits, seconds_by_stage) in enumerate(sorted(by_size.items())):
+            table.setItem(i, 0, QTableWidgetItem(str(bits)))
+            for j, stage in enumerate(stages):
+                seconds = seconds_by_stage.get(stage)
+                table.setItem(i, j + 1, QTableWidgetItem("" if seconds is None else f"{seconds:.1f} s"))
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+
+        dialog = QDialog(self.ui)
+        dialog.setWindowTitle("Stage Profile by Size")
+        dialog.resize(800, 400)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(table)
+        dialog.exec()
+
+    def _view_results_comparison(self):
+        """
+        Ranks the stored .lib results of all runs (sweep points included) by
+        area and delay; the filter narrows them to a config or corner and
+        every column sorts.
+        """
+        rows = compare_results()
+        columns = [("Rank", "rank"), ("Config", "config_name"), ("Corner", "corner"), ("Words", "num_words"),
+                   ("Word Size", "word_size"), ("Words/Row", "words_per_row"), ("Area", "area"), ("Delay", "delay"),
+                   ("Slew", "slew"), ("Setup", "setup"), ("Min Period", "min_period"),
+                   ("Leakage", "leakage_power"), ("Dynamic Power", "dynamic_power"), ("Run", "start_time")]
+
+        table = QTableWidget()
+        table.setColumnCount(len(columns))
+        table.setHorizontalHeaderLabels([label for label, _ in columns])
+        table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            for j, (_, key) in enumerate(columns):
+                value = row.get(key)
+                item = QTableWidgetItem()
+                if key == "start_time":
+                    item.setText(_format_time(value) + (" (quick look)" if row.get("profile") == "quick" else ""))
+                elif isinstance(value, (int, float)):
+                    # Numbers sort as numbers
+                    item.setData(Qt.DisplayRole, value)
+                else:
+                    item.setText(value or "")
+                table.setItem(i, j, item)
+        table.setSortingEnabled(True)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+
+        filter_edit = QLineEdit()
+        filter_edit.setPlaceholderText("Filter by config or corner")
+
+        def apply_filter(text):
+            text = text.strip().lower()
+            for i in range(table.rowCount()):
+                shown = " ".join(table.item(i, j).text().lower() for j in (1, 2))
+                table.setRowHidden(i, bool(text) and text not in shown)
+
+        filter_edit.textChanged.connect(apply_filter)
+
+        dialog = QDialog(self.ui)
+        dialog.setWindowTitle("Compare Results")
+        dialog.resize(1100, 500)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(f"{len(rows)} results; rank 1 is the area/delay Pareto front of each corner. "
+                                f"Units as in the .lib files (area in µm², times in ns, power in mW by default)."))
+        layout.addWidget(filter_edit)
+        layout.addWidget(table)
+        if not rows:
+            layout.addWidget(QLabel("No results yet: they are read from the .lib files of successful runs."))
+        dialog.exec()
+
+    def _view_config_history(self, config):
+        dialog = QDialog(self.ui)
+        dialog.setWindowTitle(f"Run History: {config['name']}")
+        dialog.resize(700, 400)
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(self._get_runs_table(self.history.config_history(config["id"])))
+        dialog.exec()
+
     def show_about(self):
         about_text = """
         <h2>OpenRAM UI</h2>
@@ -656,3 +994,53 @@ class Controller:
         <a href='https://openram.org/'>OpenRAM website</a>.</p>
         """
         QMessageBox.about(self.ui, "About OpenRAM UI", about_text)
+
+
+def _format_time(timestamp):
+    if not timestamp:
+        return ""
+    return time.strftime('%d %b, %Y %H:%M:%S', time.localtime(timestamp))
+
+
+def _format_duration(start_time, end_time):
+    if not end_time:
+        return "running"
+    seconds = int(end_time - start_time)
+    return f"{seconds // 3600}h {seconds % 3600 // 60:02d}m {seconds % 60:02d}s"
+
+
+def _format_profile(run):
+    if run.get("profile") == "quick":
+        return "Quick look" + (" (full run started)" if run.get("linked_run_id") else "")
+    return "Full" + (" (after quick look)" if run.get("linked_run_id") else "")
+
+
+def _format_slowest_stage(stage):
+    if not stage:
+        return ""
+    return f"{stage['stage']} ({stage['seconds']:.0f} s)"
+
+
+def _describe_quick_look(quick_look, run_queue, config_name):
+    """Where the latest quick look of a config and its full run stand, for the output view."""
+    text = f"Quick look: {_format_time(quick_look['start_time'])}, "
+    if quick_look["end_time"] is None:
+        text += "running"
+    else:
+        text += "done" if quick_look["exit_code"] == 0 else f"failed (exit code {quick_look['exit_code']})"
+    if quick_look["full_id"]:
+        if quick_look["full_end_time"] is None:
+            full = "running in the background"
+        else:
+            full = "done" if quick_look["full_exit_code"] == 0 else f"failed (exit code {quick_look['full_exit_code']})"
+    elif any(run.get("linked_run_id") == quick_look["id"] for run in run_queue):
+        full = "queued"
+    else:
+        full = "not started"
+    return f"{text}  ·  Full run: {full}. Quick-look files are under {QUICK_LOOK_DIR}/."
+
+
+def _describe_selection(entries):
+    if not entries:
+        return "No files selected."
+    return f"{len(entries)} file(s) selected, {format_size(sum(entry['size'] for entry in entries))}"
@@ -1,11 +1,21 @@
 from PySide6.QtWidgets import QDialog, QVBoxLayout, QListWidget, QLineEdit, QDialogButtonBox
+from PySide6.QtCore import Qt
 import os
 
 class LoadConfigDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, search=None):
+        """`search` takes a query such as `tech_name=sky130 word_size>=32` and returns the matching config names."""
         super().__init__(parent)
         self.setWindowTitle("Load Config")
         layout = QVBoxLayout(self)
+        self.search = search
+        self.names = []
+
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter, e.g. tech_name=sky130 word_size>=32")
+        self.filter_edit.setVisible(search is not None)
+        self.filter_edit.textChanged.connect(self._apply_filter)
+        layout.addWidget(self.filter_edit)
 
         self.list_widget = QListWidget()
         layout.addWidget(self.list_widget)
@@ -18,6 +28,33 @@ class LoadConfigDialog(QDialog):
     def get_selected_config(self):
         return self.list_widget.currentItem().text()
 
+    def set_config_names(self, names):
+        """Replaces the configs to choose from, keeping the filter and selection."""
+        self.names = list(names)
+        self._apply_filter()
+
+    def _apply_filter(self):
+        query = self.filter_edit.text().strip()
+        shown = self.names
+        if query and self.search:
+            try:
+                matches = set(self.search(query))
+            except ValueError as e:
+                # Keep the last list while a term is being typed
+                self.filter_edit.setStyleSheet("QLineEdit { border: 1px solid red; }")
+                self.filter_edit.setToolTip(str(e))
+                return
+            shown = [name for name in self.names if name in matches]
+        self.filter_edit.setStyleSheet("")
+        self.filter_edit.setToolTip("")
+        current = self.list_widget.currentItem()
+        selected = current.text() if current else None
+        self.list_widget.clear()
+        self.list_widget.addItems(shown)
+        if selected:
+            for item in self.list_widget.findItems(selected, Qt.MatchExactly):
+                self.list_widget.setCurrentItem(item)
+
 class SaveConfigDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
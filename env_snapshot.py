@@ -0,0 +1,148 @@
+# env_snapshot.py
+"""
+Captures the environment the OpenRAM activation scripts set up, once per
+host and OpenRAM path, so jobs can exec the environment's python directly
+instead of sourcing the venv, conda and setpaths.sh scripts on every launch.
+A snapshot holds the variables the scripts set or unset and is captured
+again when any of the scripts' modification times change.
+"""
+import json
+import os
+import shlex
+import subprocess
+import threading
+
+from constants import ENV_SNAPSHOT_FILE
+from remote import run_ssh, RemoteError
+from run_jobs import activation_scripts
+
+# Prints the environment, the python3 it resolves to and the mtimes of the files given as arguments and of that python3
+CAPTURE_SCRIPT = """
+import json, os, shutil, sys
+def mtime(path):
+    try:
+        return int(os.path.getmtime(path))
+    except (OSError, TypeError):
+        return None
+python = shutil.which("python3")
+json.dump({"env": dict(os.environ), "python": python, "mtimes": [mtime(p) for p in sys.argv[1:] + [python]]}, sys.stdout)
+print()
+"""
+# Shell bookkeeping that differs between any two shells
+VOLATILE_VARIABLES = {"_", "SHLVL", "PWD", "OLDPWD"}
+
+_lock = threading.Lock()
+
+
+def _load_snapshots():
+    try:
+        with open(ENV_SNAPSHOT_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_snapshot(key, snapshot):
+    with _lock:
+        snapshots = _load_snapshots()
+        snapshots[key] = snapshot
+        temp_path = ENV_SNAPSHOT_FILE + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(snapshots, f)
+        os.replace(temp_path, ENV_SNAPSHOT_FILE)
+
+
+def _shell(user, host, command, timeout=120):
+    """Runs a shell command on the OpenRAM host, which may be this machine, and returns its output."""
+    if user:
+        return run_ssh(user, host, command, timeout=timeout).stdout
+    try:
+        process = subprocess.run(["bash", "-c", command], capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        raise RemoteError(f"Timed out running '{command}'")
+    if process.returncode != 0:
+        raise RemoteError(process.stderr.strip() or f"'{command}' failed with exit code {process.returncode}")
+    return process.stdout
+
+
+def script_mtimes(user, host, openram_path, python):
+    """Modification times of the activation scripts and the environment's python, None for a missing one."""
+    paths = activation_scripts(openram_path) + [shlex.quote(python)]
+    if not user:
+        return [int(os.path.getmtime(path)) if os.path.exists(path) else None
+                for path in activation_scripts(openram_path) + [python]]
+    output = _shell(user, host, f"for f in {' '.join(paths)}; do stat -L -c %Y \"$f\" 2>/dev/null || echo -; done",
+                    timeout=60)
+    return [int(value) if value.isdigit() else None for value in output.split()]
+
+
+def capture_snapshot(user, host, openram_path):
+    """
+    Sources the activation scripts the way a run does and records what they
+    changed. Raises RemoteError, or ValueError for unreadable output.
+    """
+    scripts = activation_scripts(openram_path)
+    capture = f"python3 -c {shlex.quote(CAPTURE_SCRIPT)}"
+    if user:
+        activation = " && ".join([f"cd {openram_path}"] + [f"source {script}" for script in scripts])
+    else:
+        activation = "; ".join([f"source {script}" for script in scripts] + ["true"])
+    output = _shell(user, host, f"{capture} && {activation} && {capture} {' '.join(scripts)}")
+    lines = [line for line in output.splitlines() if line.startswith("{")]
+    if len(lines) < 2:
+        raise ValueError("Unexpected output while capturing the OpenRAM environment")
+    before, after = json.loads(lines[-2]), json.loads(lines[-1])
+    if not after["python"]:
+        raise ValueError("python3 not found in the OpenRAM environment")
+    return {
+        "set": {name: value for name, value in after["env"].items()
+                if before["env"].get(name) != value and name not in VOLATILE_VARIABLES},
+        "unset": [name for name in before["env"] if name not in after["env"] and name not in VOLATILE_VARIABLES],
+        "python": after["python"],
+        "mtimes": after["mtimes"],
+    }
+
+
+def get_snapshot(user, host, openram_path, log=lambda message: None):
+    """
+    The environment snapshot of an OpenRAM install, captured again when the
+    activation scripts or its python changed. Returns None when it cannot be had, so the
+    caller falls back to sourcing the scripts.
+    """
+    key = f"{user}@{host}:{openram_path}" if user else openram_path
+    snapshot = _load_snapshots().get(key)
+    try:
+        if snapshot and snapshot["mtimes"] == script_mtimes(user, host, openram_path, snapshot["python"]):
+            return snapshot
+        log("Capturing the OpenRAM environment...")
+        snapshot = capture_snapshot(user, host, openram_path)
+    except (RemoteError, ValueError, KeyError) as e:
+        log(f"Could not capture the OpenRAM environment, sourcing the activation scripts instead: {e}")
+        return None
+    try:
+        _save_snapshot(key, snapshot)
+    except OSError:
+        pass
+    return snapshot
+
+
+def snapshot_environment(snapshot, base=None):
+    """The full environment of a local job: `base` (this process's) with the snapshot applied."""
+    environment = dict(os.environ if base is None else base)
+    for name in snapshot["unset"]:
+        environment.pop(name, None)
+    environment.update(snapshot["set"])
+    return environment
+
+
+def local_run_command(openram_path, config_path, snapshot):
+    """Argument list of a local job run with the snapshot's python."""
+    return [snapshot["python"], "-u", os.path.join(openram_path, "sram_compiler.py"), config_path]
+
+
+def snapshot_run_command(remote_openram_path, remote_config_path, snapshot):
+    """Shell command that runs OpenRAM on the remote server with the snapshot's environment and python."""
+    unset = " ".join(f"-u {shlex.quote(name)}" for name in snapshot["unset"])
+    assignments = " ".join(shlex.quote(f"{name}={value}") for name, value in sorted(snapshot["set"].items()))
+    return (f"cd {remote_openram_path} && env {unset} {assignments} {shlex.quote(snapshot['python'])} -u "
+            f"{os.path.join(remote_openram_path, 'sram_compiler.py')} {remote_config_path}")
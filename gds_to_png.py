@@ -1,30 +1,44 @@
 import gdspy
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
 
-# Load the GDS file
-lib = gdspy.GdsLibrary()
-lib.read_gds("test.gds")
 
-# Get the top cell
-top_cell = lib.top_level()[0]
+def render_gds(gds_path, png_path, dpi=300, show=False):
+    """Draws every layer of the top cell of a GDS file and saves it as a PNG."""
+    if not show:
+        matplotlib.use("Agg")
 
-# Get all polygons and layers
-polygons = top_cell.get_polygons(by_spec=True)
+    # Load the GDS file
+    lib = gdspy.GdsLibrary()
+    lib.read_gds(gds_path)
 
-# Create plot
-fig, ax = plt.subplots()
-colors = ['red', 'green', 'blue', 'orange', 'purple', 'cyan']
+    # Get the top cell
+    top_cell = lib.top_level()[0]
 
-for i, ((layer, datatype), poly_list) in enumerate(polygons.items()):
-    color = colors[i % len(colors)]
-    for points in poly_list:
-        polygon = patches.Polygon(points, closed=True, facecolor=color, edgecolor='black', linewidth=0.5, alpha=0.6)
-        ax.add_patch(polygon)
+    # Get all polygons and layers
+    polygons = top_cell.get_polygons(by_spec=True)
 
-ax.set_aspect('equal')
-ax.autoscale()
-plt.axis('off')
-plt.tight_layout()
-plt.savefig("gds_image.png", dpi=300)
-plt.show()
+    # Create plot
+    fig, ax = plt.subplots()
+    colors = ['red', 'green', 'blue', 'orange', 'purple', 'cyan']
+
+    for i, ((layer, datatype), poly_list) in enumerate(polygons.items()):
+        color = colors[i % len(colors)]
+        for points in poly_list:
+            polygon = patches.Polygon(points, closed=True, facecolor=color, edgecolor='black', linewidth=0.5, alpha=0.6)
+            ax.add_patch(polygon)
+
+    ax.set_aspect('equal')
+    ax.autoscale()
+    plt.axis('off')
+    plt.tight_layout()
+    plt.savefig(png_path, dpi=dpi)
+    if show:
+        plt.show()
+    plt.close(fig)
+    return png_path
+
+
+if __name__ == "__main__":
+    render_gds("test.gds", "gds_image.png", show=True)
@@ -0,0 +1,96 @@
+# host_pool.py
+"""
+Spreads runs over several OpenRAM installs. The pool is the configured
+openram_path plus the `host_pool` entries of the advanced settings, each
+{'openram_path': 'user@host:path' or a local path, 'capacity': parallel jobs}.
+A run goes to the least-loaded install that has the config's technology;
+the run history remembers where, so outputs are fetched from the same place.
+
+Hosts are reached with plain ssh, so one needing a port or other options can
+be given as a Host alias from ~/.ssh/config.
+"""
+import os
+
+from constants import OPENRAM_PATH, QUICK_LOOK_DIR
+from host_resources import get_host_resources
+from remote import parse_openram_path, RemoteError
+from run_history import get_history
+from tech_list import get_tech_list
+
+
+def pool_endpoints(advanced_config):
+    """The installs runs may be placed on, the configured openram_path first."""
+    default_capacity = max(int(advanced_config.get("max_parallel_jobs", 4)), 1)
+    endpoints = [{"openram_path": advanced_config.get(OPENRAM_PATH, ""), "capacity": default_capacity}]
+    for entry in advanced_config.get("host_pool") or []:
+        if isinstance(entry, str):
+            entry = {"openram_path": entry}
+        if entry.get("openram_path") and entry["openram_path"] not in [e["openram_path"] for e in endpoints]:
+            endpoints.append({"openram_path": entry["openram_path"],
+                              "capacity": max(int(entry.get("capacity", default_capacity)), 1)})
+    return endpoints
+
+
+def run_output_path(openram_path, output_path):
+    """Where a run on this install writes a config's output_path (as recorded in the run history)."""
+    user, _, remote_path = parse_openram_path(openram_path)
+    return os.path.join(remote_path, output_path) if user else output_path
+
+
+def endpoint_load(endpoint, active_jobs):
+    """
+    Load of an install as our unfinished jobs on it per unit of capacity
+    plus the host's load average per core, or None when it cannot be probed.
+    """
+    user, host, _ = parse_openram_path(endpoint["openram_path"])
+    resources = get_host_resources(user, host)
+    if resources is None:
+        return None
+    running = active_jobs.get(endpoint["openram_path"], 0)
+    return running / endpoint["capacity"] + resources["load"] / max(resources["cores"], 1)
+
+
+def place_run(tech_name, advanced_config, log=lambda message: None):
+    """
+    Picks the least-loaded install that has tech_name. Returns its endpoint
+    dict, or None when no install in the pool can take the run.
+    """
+    endpoints = pool_endpoints(advanced_config)
+    if len(endpoints) == 1:
+        return endpoints[0]
+    active_jobs = get_history().active_jobs_by_endpoint()
+    candidates = []
+    for endpoint in endpoints:
+        try:
+            techs = [tech["name"] for tech in get_tech_list(endpoint["openram_path"])]
+        except (RemoteError, ValueError) as e:
+            log(f"Skipping {endpoint['openram_path']}: {e}")
+            continue
+        if tech_name and tech_name not in techs:
+            log(f"Skipping {endpoint['openram_path']}: no '{tech_name}' technology.")
+            continue
+        load = endpoint_load(endpoint, active_jobs)
+        if load is None:
+            log(f"Skipping {endpoint['openram_path']}: the host could not be probed.")
+            continue
+        candidates.append((load, active_jobs.get(endpoint["openram_path"], 0), endpoint))
+    if not candidates:
+        return None
+    # Equally loaded installs (e.g. several on one machine) go to the one with fewer of our jobs
+    load, _, endpoint = min(candidates, key=lambda candidate: candidate[:2])
+    log(f"Placing the run on {endpoint['openram_path']} (load {load:.2f}).")
+    return endpoint
+
+
+def output_endpoint(output_path, advanced_config):
+    """The install that last ran a config with this output_path, or the configured one."""
+    endpoints = pool_endpoints(advanced_config)
+    if len(endpoints) == 1:
+        return endpoints[0]["openram_path"]
+    expected = {e["openram_path"]: run_output_path(e["openram_path"], output_path) for e in endpoints}
+    for run in get_history().run_endpoints():
+        # A quick look writes below the config's output_path, on the install its full run will use
+        expected_path = expected.get(run["endpoint"])
+        if expected_path and run["output_path"] in (expected_path, os.path.join(expected_path, QUICK_LOOK_DIR)):
+            return run["endpoint"]
+    return endpoints[0]["openram_path"]
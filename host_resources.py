@@ -0,0 +1,82 @@
+# host_resources.py
+import os
+import time
+
+from remote import run_ssh, RemoteError
+
+# Probed values are reused for this long before the host is asked again
+PROBE_TTL = 300
+
+# One round trip: core count, memory and load average
+PROBE_COMMAND = "nproc; grep -E '^(MemTotal|MemAvailable):' /proc/meminfo; cat /proc/loadavg"
+
+_cache = {}
+
+
+def parse_probe_output(text):
+    """Parses the output of PROBE_COMMAND into a resources dict (memory in bytes)."""
+    lines = [line.strip() for line in text.strip().splitlines() if line.strip()]
+    resources = {"cores": int(lines[0]), "memory_total": None, "memory_available": None, "load": 0.0}
+    for line in lines[1:]:
+        if line.startswith("MemTotal:"):
+            resources["memory_total"] = int(line.split()[1]) * 1024
+        elif line.startswith("MemAvailable:"):
+            resources["memory_available"] = int(line.split()[1]) * 1024
+        else:
+            resources["load"] = float(line.split()[0])
+    return resources
+
+
+def _probe_local():
+    resources = {"cores": os.cpu_count() or 1, "memory_total": None, "memory_available": None, "load": 0.0}
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    resources["memory_total"] = int(line.split()[1]) * 1024
+                elif line.startswith("MemAvailable:"):
+                    resources["memory_available"] = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        resources["load"] = os.getloadavg()[0]
+    except OSError:
+        pass
+    return resources
+
+
+def _probe_remote(user, host):
+    # Through the shared connection and agent, like every other remote command
+    return parse_probe_output(run_ssh(user, host, PROBE_COMMAND, timeout=15).stdout)
+
+
+def get_host_resources(user=None, host=None, refresh=False):
+    """
+    Returns {'cores', 'memory_total', 'memory_available', 'load'} for the local
+    machine (no host) or a remote host, probing at most once per PROBE_TTL.
+    Returns None if a remote host can't be probed.
+    """
+    cache_key = f"{user}@{host}" if host else "localhost"
+    cached = _cache.get(cache_key)
+    if cached and not refresh and time.time() - cached[0] < PROBE_TTL:
+        return cached[1]
+    try:
+        resources = _probe_remote(user, host) if host else _probe_local()
+    except (RemoteError, ValueError, IndexError):
+        return None
+    _cache[cache_key] = (time.time(), resources)
+    return resources
+
+
+def free_cores(resources):
+    """Cores not already busy according to the 1-minute load average (at least one)."""
+    return max(resources["cores"] - int(round(resources["load"])), 1)
+
+
+def thread_settings(resources, concurrent_jobs):
+    """
+    Splits the host's free cores between the jobs that will run at the same
+    time and returns the num_threads / num_sim_threads to give each of them.
+    """
+    per_job = max(free_cores(resources) // max(concurrent_jobs, 1), 1)
+    return {"num_threads": per_job, "num_sim_threads": per_job}
@@ -0,0 +1,294 @@
+# liberty_results.py
+"""
+Reads the Liberty (.lib) files a run writes into its outputs: cell area,
+leakage and internal (dynamic) power and every timing table, with its
+index axes. The datasheets OpenRAM writes are generated from the same
+characterisation, so the .lib files carry everything they show.
+
+Files are parsed line by line, keeping only the groups still open, and the
+parser also runs on the server next to the outputs (standard library only),
+so only the extracted numbers come back. The summary of each library goes
+into the run history keyed by the config hash, where sweeps can be ranked
+by area and delay; see rank_results().
+"""
+import bisect
+import inspect
+import json
+import re
+
+from run_history import get_history
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Summary values of a library, as stored in the history and shown in the comparison view
+RESULT_FIELDS = ("area", "delay", "slew", "setup", "hold", "min_period", "leakage_power", "dynamic_power")
+# Library names end in the corner, e.g. sram_8_16_sky130_TT_1p8V_25C_lib
+CORNER_PATTERN = re.compile(r"_([A-Za-z]+)_(\d+)p(\d+)V_(m?\d+)C(?:_lib)?$")
+
+
+def _parse_liberty(path):
+    """
+    Area, power and timing tables of the first cell in a Liberty file, as
+    a JSON-able dict with tables as nested lists. Also runs on the server,
+    so standard library only.
+    """
+    import re
+
+    piece_pattern = re.compile(r'"[^"]*"|[{};]|[^"{};]+')
+    header_pattern = re.compile(r"^([A-Za-z_][\w.]*)\s*\((.*)\)$", re.S)
+    table_groups = ("cell_rise", "cell_fall", "rise_transition", "fall_transition", "rise_constraint",
+                    "fall_constraint", "rise_power", "fall_power")
+
+    def numbers(text):
+        rows = re.findall(r'"([^"]*)"', text) or [text]
+        values = [[float(value) for value in row.split(",") if value.strip()] for row in rows]
+        return values[0] if len(values) == 1 else values
+
+    def number(text):
+        try:
+            return float(text.strip().strip('"').split()[0])
+        except (ValueError, IndexError):
+            return None
+
+    lib = {"library": None, "cell": None, "area": None, "leakage_power": None, "operating_conditions": {},
+           "units": {}, "timing": [], "internal_power": []}
+    templates = {}
+    leakage_values = []
+    # Open groups as {"name", "args", "attrs", "tables"}, outermost first
+    stack = []
+
+    def enclosing(*names):
+        return next((group["args"] for group in reversed(stack) if group["name"] in names), None)
+
+    def close(group):
+        name, attrs = group["name"], group["attrs"]
+        if name in table_groups and stack:
+            template = templates.get(group["args"], {})
+            table = {"table": name, "values": numbers(attrs.get("values", ""))}
+            for axis in ("index_1", "index_2"):
+                if axis in attrs or axis in template:
+                    table[axis] = numbers(attrs[axis]) if axis in attrs else template[axis]
+            stack[-1]["tables"].append(table)
+        elif name in ("lu_table_template", "power_lut_template"):
+            templates[group["args"]] = {axis: numbers(attrs[axis]) for axis in ("index_1", "index_2") if axis in attrs}
+        elif name == "timing":
+            for table in group["tables"]:
+                lib["timing"].append({"pin": enclosing("pin", "bus"), "related_pin": attrs.get("related_pin"),
+                                      "timing_type": attrs.get("timing_type"), **table})
+        elif name == "internal_power":
+            for table in group["tables"]:
+                lib["internal_power"].append({"pin": enclosing("pin", "bus"), "when": attrs.get("when"), **table})
+        elif name == "leakage_power" and "value" in attrs:
+            leakage_values.append(number(attrs["value"]))
+        elif name == "operating_conditions":
+            lib["operating_conditions"] = {key: number(attrs[key]) for key in ("process", "voltage", "temperature")
+                                           if key in attrs}
+        elif name == "cell" and lib["cell"] is None:
+            lib["cell"] = group["args"]
+            lib["area"] = number(attrs.get("area", ""))
+            if "cell_leakage_power" in attrs:
+                lib["leakage_power"] = number(attrs["cell_leakage_power"])
+        elif name == "library":
+            lib["library"] = group["args"]
+            lib["units"] = {key: attrs[key] for key in ("time_unit", "leakage_power_unit", "capacitive_load_unit",
+                                                        "voltage_unit", "current_unit") if key in attrs}
+
+    def statement(text, terminator):
+        text = text.strip()
+        if terminator == "{":
+            match = header_pattern.match(text)
+            name, args = (match.group(1), match.group(2).strip().strip('"')) if match else (text, "")
+            stack.append({"name": name, "args": args, "attrs": {}, "tables": []})
+            return
+        if text and stack:
+            key, colon, value = text.partition(":")
+            if colon and "(" not in key:
+                stack[-1]["attrs"][key.strip()] = value.strip().strip('"')
+            else:
+                match = header_pattern.match(text)
+                if match:
+                    stack[-1]["attrs"][match.group(1)] = match.group(2)
+        if terminator == "}" and stack:
+            close(stack.pop())
+
+    buffer = ""
+    in_comment = False
+    with open(path, errors="replace") as f:
+        for line in f:
+            # Drop /* comments */, which may span lines
+            text = ""
+            while line:
+                if in_comment:
+                    end = line.find("*/")
+                    line = line[end + 2:] if end >= 0 else ""
+                    in_comment = end < 0
+                    continue
+                start = line.find("/*")
+                if start < 0:
+                    text += line
+                    break
+                text += line[:start]
+                line = line[start + 2:]
+                in_comment = True
+            text = text.rstrip()
+            if text.endswith("\\"):
+                text = text[:-1]
+            for piece in piece_pattern.findall(text):
+                if piece in ("{", ";", "}"):
+                    statement(buffer, piece)
+                    buffer = ""
+                else:
+                    buffer += piece
+            buffer += " "
+
+    if lib["leakage_power"] is None and leakage_values:
+        lib["leakage_power"] = sum(value for value in leakage_values if value is not None)
+    return lib
+
+
+def _parse_output_libs(folder, since):
+    """[file name, parsed library] of the .lib files in `folder` written after `since`. Runs on the server."""
+    import glob
+    import os
+
+    libs = []
+    for path in sorted(glob.glob(os.path.join(os.path.expanduser(folder), "*.lib"))):
+        try:
+            if os.path.getmtime(path) >= since:
+                libs.append([os.path.basename(path), _parse_liberty(path)])
+        except (OSError, ValueError):
+            pass
+    return libs
+
+
+LIB_SCRIPT = inspect.getsource(_parse_liberty) + "\n" + inspect.getsource(_parse_output_libs) + \
+    "\nimport json, sys\njson.dump(_parse_output_libs(*json.load(sys.stdin)), sys.stdout)\n"
+
+
+def lib_script_input(folder, since):
+    return json.dumps([folder, since])
+
+
+def parse_output_libs(folder, since=0):
+    """[file name, parsed library] of the local .lib files in `folder` written after `since`."""
+    return _parse_output_libs(folder, since)
+
+
+def read_lib_script_output(text):
+    """The libraries LIB_SCRIPT printed, or an empty list when it failed."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return []
+
+
+def _flat(values):
+    return [value for row in values for value in (row if isinstance(row, list) else [row])]
+
+
+def _table_max(lib, tables, timing_types=None):
+    values = [value for entry in lib["timing"] if entry["table"] in tables
+              and (timing_types is None or (entry["timing_type"] or "") in timing_types)
+              for value in _flat(entry["values"])]
+    return max(values) if values else None
+
+
+def corner_of(lib):
+    """Corner label of a parsed library, e.g. 'TT 1.8V 25C', from its name or its operating conditions."""
+    match = CORNER_PATTERN.search(lib["library"] or "")
+    if match:
+        process, volts, fraction, temperature = match.groups()
+        return f"{process} {float(f'{volts}.{fraction}'):g}V {temperature.replace('m', '-')}C"
+    conditions = lib["operating_conditions"]
+    return " ".join(f"{conditions[key]:g}{unit}" for key, unit in (("process", ""), ("voltage", "V"),
+                                                                  ("temperature", "C")) if key in conditions)
+
+
+def summarize(lib):
+    """
+    The RESULT_FIELDS of a parsed library. Delays, slews and constraints are
+    the worst case over the characterised slews and loads, so points of a
+    sweep compare on the same footing.
+    """
+    power = [value for entry in lib["internal_power"] for value in _flat(entry["values"])]
+    return {
+        "area": lib["area"],
+        "delay": _table_max(lib, ("cell_rise", "cell_fall")),
+        "slew": _table_max(lib, ("rise_transition", "fall_transition")),
+        "setup": _table_max(lib, ("rise_constraint", "fall_constraint"), ("setup_rising", "setup_falling")),
+        "hold": _table_max(lib, ("rise_constraint", "fall_constraint"), ("hold_rising", "hold_falling")),
+        "min_period": _table_max(lib, ("rise_constraint", "fall_constraint"), ("minimum_period",)),
+        "leakage_power": lib["leakage_power"],
+        "dynamic_power": max(power) if power else None,
+    }
+
+
+def library_results(libs):
+    """Rows for RunHistory.save_lib_results from [file name, parsed library] pairs."""
+    return [{"corner": corner_of(lib), "lib_file": name, **summarize(lib), "units": lib["units"],
+             "tables": {"timing": lib["timing"], "internal_power": lib["internal_power"]}}
+            for name, lib in libs]
+
+
+def as_arrays(tables):
+    """Timing or power table entries with values and index axes as numpy arrays (lists without numpy)."""
+    if numpy is None:
+        return tables
+    return [{key: numpy.array(value) if key in ("values", "index_1", "index_2") else value
+             for key, value in entry.items()} for entry in tables]
+
+
+def parse_liberty(path):
+    """Parses a local Liberty file; timing and power tables come as numpy arrays when numpy is installed."""
+    lib = _parse_liberty(path)
+    lib["timing"] = as_arrays(lib["timing"])
+    lib["internal_power"] = as_arrays(lib["internal_power"])
+    return lib
+
+
+def stored_tables(config_hash, corner, history=None):
+    """
+    The timing and power tables stored for a config hash and corner, as
+    {'timing': [...], 'internal_power': [...]} with numpy arrays, or None.
+    """
+    tables = (history or get_history()).lib_tables(config_hash, corner)
+    if tables is None:
+        return None
+    return {kind: as_arrays(entries) for kind, entries in tables.items()}
+
+
+def rank_results(rows, keys=("area", "delay")):
+    """
+    Sorts result rows best first: by Pareto front over the two `keys`
+    (lower is better) within each corner, then by the product of the keys.
+    Sets each row's 'rank' to its front, 1 being the points no other point
+    beats on both keys; rows missing a key get no rank and go last.
+    """
+    first, second = keys
+    by_corner = {}
+    for row in rows:
+        row["rank"] = None
+        if row.get(first) is not None and row.get(second) is not None:
+            by_corner.setdefault(row.get("corner"), []).append(row)
+    for corner_rows in by_corner.values():
+        # Sweeping in order of the first key, a point belongs to the first front whose
+        # smallest second key so far is above its own; equal points share a front
+        front_minimums = []
+        previous = None
+        for row in sorted(corner_rows, key=lambda row: (row[first], row[second])):
+            point = (row[first], row[second])
+            if previous and point == previous[0]:
+                row["rank"] = previous[1]
+                continue
+            front = bisect.bisect_right(front_minimums, point[1])
+            if front == len(front_minimums):
+                front_minimums.append(point[1])
+            else:
+                front_minimums[front] = point[1]
+            row["rank"] = front + 1
+            previous = (point, row["rank"])
+    return sorted(rows, key=lambda row: (row["rank"] is None, row["rank"] or 0,
+                                         (row.get(first) or 0) * (row.get(second) or 0)))
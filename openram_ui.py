@@ -0,0 +1,549 @@
+# openram_ui.py
+"""
+Headless command line for batch use, sharing the app's run, validate, list,
+download and render logic (run_service.py) without importing Qt:
+
+    python -m openram_ui validate <config>
+    python -m openram_ui list [tech_name=sky130 word_size>=32 ...]
+    python -m openram_ui run <config> [--set key=value ...]
+    python -m openram_ui sweep <config> --set word_size=8,16,32 [--set ...]
+    python -m openram_ui fetch <config> [-o outputs.zip] [--format tar.zst] [--only lib,lef,v]
+    python -m openram_ui render <config | file.gds> [-o layout.png]
+
+<config> is the name of a saved config (in users_configs, on the server when
+OpenRAM is remote) or the path of a config file. Progress is written to
+stdout as one JSON object per line.
+"""
+import argparse
+import itertools
+import json
+import os
+import re
+import selectors
+import subprocess
+import sys
+import tempfile
+import time
+
+from archiver import ArchiveError, ARCHIVE_FORMATS
+from batch_queue import POLL_INTERVAL
+from config_loader import _load_config_file
+from config_schema import validate_config, parse_field_text
+from constants import OUTPUT_PATH
+from remote import RemoteError, InvalidRemotePathError
+from run_history import get_history
+from run_jobs import parse_exit_marker
+from run_service import (RunError, InvalidConfigError, list_configs, search_configs, fetch_config, plan_run,
+                         next_jobs, launch_detached, tail_ssh_args, record_job_output, record_job_finished, is_complete,
+                         run_progress, finish_run, cleanup_run_files, list_gds_files, fetch_gds, output_location,
+                         fetch_outputs, output_manifest, fetch_selected_outputs, submit_batch, poll_batch,
+                         sample_resources, compare_results)
+
+EXIT_OK = 0
+EXIT_RUN_FAILED = 1
+EXIT_INVALID = 2
+EXIT_CONNECTION = 3
+EXIT_INTERRUPTED = 130
+
+# Seconds between progress events while nothing else happens
+PROGRESS_INTERVAL = 5
+
+
+def emit(event, **fields):
+    print(json.dumps({"event": event, "time": round(time.time(), 3), **fields}), flush=True)
+
+
+def _log(message):
+    emit("log", message=message)
+
+
+def _resolve_config(config):
+    """(local path, name, history config id) of a config given by name or path."""
+    if os.path.isfile(config):
+        return config, os.path.splitext(os.path.basename(config))[0], None
+    path, config_id = fetch_config(config)
+    return path, config, config_id
+
+
+def _parse_assignments(assignments):
+    """Turns ['key=value', ...] into {key: value}, parsing values like the config editor does."""
+    values = {}
+    for assignment in assignments or []:
+        key, sep, text = assignment.partition("=")
+        if not sep or not key.strip():
+            raise InvalidConfigError({assignment: f"Expected key=value, got '{assignment}'"})
+        values[key.strip()] = parse_field_text(text.strip())
+    return values
+
+
+class JobRunner:
+    """Drives the jobs of a RunPlan with plain subprocesses, mirroring the Qt controller."""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.selector = selectors.DefaultSelector()
+        self.last_progress = 0
+        self.last_sample = 0
+
+    def run(self):
+        try:
+            self._start_pending_jobs()
+            while not is_complete(self.plan):
+                self._poll()
+        except KeyboardInterrupt:
+            self._interrupt()
+            raise
+        finish_run(self.plan, log=_log)
+        return self.plan.exit_code
+
+    def _start_pending_jobs(self):
+        for job in next_jobs(self.plan):
+            self._start_job(job)
+
+    def _start_job(self, job):
+        if "remote" in job:
+            try:
+                pid = launch_detached(self.plan, job)
+            except RunError as e:
+                _log(str(e))
+                self._job_finished(job, 1)
+                return
+            emit("job_started", job=job["label"], host=job["remote"]["host"], pid=pid, log=f"{job['job_dir']}/run.log")
+            job["parser"].start_time = time.time()
+            self._attach(job)
+            return
+        if "command" in job:
+            process = subprocess.Popen(job["command"], env=job["env"], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        else:
+            process = subprocess.Popen(["bash", job["script"]], stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        job["state"] = "running"
+        job["process"] = process
+        job["open_streams"] = 1
+        job["parser"].start_time = time.time()
+        self.selector.register(process.stdout, selectors.EVENT_READ, (job, "stdout"))
+        emit("job_started", job=job["label"], host="localhost", pid=process.pid)
+
+    def _attach(self, job):
+        """Tails a detached job's log from the last byte received."""
+        process = subprocess.Popen(["ssh"] + tail_ssh_args(job), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        job["process"] = process
+        job["exit_code"] = None
+        job["stderr"] = b""
+        job["open_streams"] = 2
+        job.pop("retry_at", None)
+        self.selector.register(process.stdout, selectors.EVENT_READ, (job, "stdout"))
+        self.selector.register(process.stderr, selectors.EVENT_READ, (job, "stderr"))
+
+    def _poll(self):
+        for job in self.plan.jobs:
+            if job.get("retry_at") and job["retry_at"] <= time.time():
+                self._attach(job)
+
+        if self.selector.get_map():
+            events = self.selector.select(timeout=1.0)
+        else:
+            events = []
+            time.sleep(1.0)
+        for key, _ in events:
+            job, stream = key.data
+            data = os.read(key.fileobj.fileno(), 65536)
+            if not data:
+                self.selector.unregister(key.fileobj)
+                job["open_streams"] -= 1
+                if job["open_streams"] == 0:
+                    self._stream_closed(job)
+            elif stream == "stderr":
+                job["stderr"] += data
+            else:
+                self._on_output(job, data)
+
+        if time.time() - self.last_progress >= PROGRESS_INTERVAL:
+            self._emit_progress()
+        if self.plan.sampler and time.time() - self.last_sample >= self.plan.sampler.interval:
+            self._sample_resources()
+
+    def _sample_resources(self):
+        self.last_sample = time.time()
+        local_pids = [job["process"].pid for job in self.plan.jobs
+                      if job["state"] == "running" and "remote" not in job and job.get("process")]
+        try:
+            point = sample_resources(self.plan, local_pids)
+        except RemoteError as e:
+            _log(f"Resource sample failed: {e}")
+            return
+        if point:
+            emit("resources", peak_memory=self.plan.sampler.peak_memory(), **point)
+
+    def _on_output(self, job, data):
+        text, new_steps = record_job_output(job, data)
+        for line in text.splitlines():
+            if line.strip():
+                emit("output", job=job["label"], line=line)
+        for step, seconds in new_steps:
+            emit("stage", job=job["label"], step=step, seconds=seconds, stage=job["parser"].current_stage())
+        if new_steps:
+            self._emit_progress()
+
+    def _emit_progress(self):
+        fraction, status, eta = run_progress(self.plan)
+        emit("progress", progress=round(fraction, 3), status=status, eta=None if eta is None else round(eta))
+        self.last_progress = time.time()
+
+    def _stream_closed(self, job):
+        process = job["process"]
+        exit_code = process.wait()
+        if "remote" not in job:
+            self._job_finished(job, exit_code)
+            return
+        job["exit_code"] = parse_exit_marker(job["stderr"].decode(errors='replace'))
+        if job["exit_code"] is None:
+            # The connection dropped while the job keeps running on the server
+            delay = job["retry_delay"] = min(job.get("retry_delay", 2) * 2, 60)
+            emit("reconnecting", job=job["label"], delay=delay, offset=job["offset"])
+            job["retry_at"] = time.time() + delay
+            return
+        job["retry_delay"] = 2
+        self._job_finished(job, job["exit_code"])
+
+    def _job_finished(self, job, exit_code):
+        record_job_finished(self.plan, job, exit_code)
+        emit("job_finished", job=job["label"], exit_code=exit_code)
+        if any(j["state"] == "pending" for j in self.plan.jobs):
+            self._start_pending_jobs()
+
+    def _interrupt(self):
+        remote = False
+        for job in self.plan.jobs:
+            process = job.get("process")
+            if process and process.poll() is None:
+                process.terminate()
+            remote = remote or "remote" in job
+        if remote:
+            emit("interrupted", message="Remote jobs keep running on the server; the app reattaches to them on start.")
+        else:
+            cleanup_run_files(self.plan)
+            emit("interrupted", message="Local jobs were stopped.")
+
+
+class BatchRunner:
+    """Submits the jobs of one or more batch plans as a single job array and follows them with bulk status polls."""
+
+    def __init__(self, plans):
+        self.plans = plans
+        self.last_progress = 0
+
+    def run(self):
+        """Returns the exit code of each plan."""
+        submit_batch(self.plans, log=_log)
+        for plan in self.plans:
+            for job in plan.jobs:
+                emit("job_submitted", run_id=plan.run_id, job=job["label"], array=job["batch"]["array_id"],
+                     task=job["batch"]["task"], log=f"{job['batch']['task_dir']}/{job['batch']['task']}/run.log")
+        try:
+            while not all(is_complete(plan) for plan in self.plans):
+                time.sleep(POLL_INTERVAL)
+                self._poll()
+        except KeyboardInterrupt:
+            emit("interrupted", message="Submitted tasks keep running in the batch queue.")
+            raise
+        for plan in self.plans:
+            finish_run(plan, log=_log)
+        return [plan.exit_code for plan in self.plans]
+
+    def _poll(self):
+        try:
+            updates = poll_batch(self.plans)
+        except RemoteError as e:
+            _log(f"Batch status query failed ({e}); retrying.")
+            return
+        for job, data, exit_code in updates:
+            plan = next(plan for plan in self.plans if any(j is job for j in plan.jobs))
+            text, new_steps = record_job_output(job, data)
+            for line in text.splitlines():
+                if line.strip():
+                    emit("output", run_id=plan.run_id, job=job["label"], task=job["batch"]["task"], line=line)
+            for step, seconds in new_steps:
+                emit("stage", run_id=plan.run_id, job=job["label"], step=step, seconds=seconds,
+                     stage=job["parser"].current_stage())
+            if exit_code is not None:
+                record_job_finished(plan, job, exit_code)
+                emit("job_finished", run_id=plan.run_id, job=job["label"], task=job["batch"]["task"],
+                     exit_code=exit_code)
+        if time.time() - self.last_progress >= PROGRESS_INTERVAL:
+            for plan in self.plans:
+                fraction, status, eta = run_progress(plan)
+                emit("progress", run_id=plan.run_id, progress=round(fraction, 3), status=status,
+                     eta=None if eta is None else round(eta))
+            self.last_progress = time.time()
+
+
+def _plan_one(config_path, config_name, config_id, overrides=None, materialize=False, **profile):
+    plan = plan_run(config_path, config_name, config_id, overrides=overrides, log=_log, materialize=materialize,
+                    **profile)
+    emit("run_started", run_id=plan.run_id, config=config_name, overrides=overrides or {},
+         jobs=[job["label"] for job in plan.jobs], remote=bool(plan.remote), batch=bool(plan.batch),
+         profile=plan.profile, linked_run_id=profile.get("linked_run_id"))
+    return plan
+
+
+def _run_one(config_path, config_name, config_id, overrides=None, materialize=False, **profile):
+    """Plans and runs one config. `profile` holds plan_run's profile, background, endpoint_path and linked_run_id."""
+    plan = _plan_one(config_path, config_name, config_id, overrides, materialize, **profile)
+    exit_code = BatchRunner([plan]).run()[0] if plan.batch else JobRunner(plan).run()
+    emit("run_finished", run_id=plan.run_id, config=config_name, exit_code=exit_code)
+    return exit_code
+
+
+def cmd_validate(args):
+    config_path, config_name, _ = _resolve_config(args.config)
+    config = {**_load_config_file(config_path), **_parse_assignments(args.set)}
+    errors, warnings = validate_config(config)
+    emit("validation", config=config_name, valid=not errors, errors=errors, warnings=warnings)
+    return EXIT_INVALID if errors else EXIT_OK
+
+
+def cmd_list(args):
+    names = list_configs()
+    if args.query:
+        try:
+            matches = set(search_configs(" ".join(args.query)))
+        except ValueError as e:
+            _log(str(e))
+            return EXIT_INVALID
+        names = [name for name in names if name in matches]
+    for name in names:
+        emit("config", name=name)
+    return EXIT_OK
+
+
+def cmd_results(args):
+    try:
+        rows = compare_results(args.config, args.corner, tuple(args.by.split(",")))
+    except ValueError as e:
+        _log(str(e))
+        return EXIT_INVALID
+    for row in rows[:args.limit]:
+        emit("result", **row)
+    return EXIT_OK
+
+
+def cmd_run(args):
+    config_path, config_name, config_id = _resolve_config(args.config)
+    overrides = _parse_assignments(args.set)
+    materialize = config_id is None
+    if not (args.quick or args.quick_only):
+        return _run_one(config_path, config_name, config_id, overrides, materialize)
+
+    # The full run follows on the same install at background priority, from the config as it was
+    with open(config_path) as f:
+        config_text = f.read()
+    plan = _plan_one(config_path, config_name, config_id, overrides, materialize, profile="quick")
+    exit_code = BatchRunner([plan]).run()[0] if plan.batch else JobRunner(plan).run()
+    emit("run_finished", run_id=plan.run_id, config=config_name, exit_code=exit_code)
+    if args.quick_only or exit_code != EXIT_OK:
+        return exit_code
+    fd, frozen_path = tempfile.mkstemp(prefix="openram_full_", suffix=".py")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(config_text)
+        return _run_one(frozen_path, config_name, config_id, overrides, True, background=True,
+                        endpoint_path=plan.endpoint, linked_run_id=plan.run_id)
+    finally:
+        os.unlink(frozen_path)
+
+
+def _sweep_points(assignments):
+    """Cross product of --set key=v1,v2 options, as a list of override dicts."""
+    axes = []
+    for key, value in _parse_assignments(assignments).items():
+        values = list(value) if isinstance(value, tuple) else [value]
+        axes.append([(key, v) for v in values])
+    return [dict(point) for point in itertools.product(*axes)]
+
+
+def _sweep_output_path(output_path, point):
+    suffix = "_".join(f"{key}{re.sub(r'[^A-Za-z0-9.]+', '', str(value))}" for key, value in point.items())
+    return f"{output_path.rstrip('/')}_{suffix}"
+
+
+def cmd_sweep(args):
+    config_path, config_name, config_id = _resolve_config(args.config)
+    points = _sweep_points(args.set)
+    output_path = _load_config_file(config_path).get(OUTPUT_PATH, ".")
+    emit("sweep_started", config=config_name, points=len(points))
+    failed = 0
+    batch_plans = []
+    for point in points:
+        overrides = dict(point)
+        # Keep each point's results apart unless the sweep sets output_path itself
+        overrides.setdefault(OUTPUT_PATH, _sweep_output_path(output_path, point))
+        try:
+            plan = _plan_one(config_path, config_name, config_id, overrides, materialize=True)
+        except InvalidConfigError as e:
+            emit("invalid_config", config=config_name, overrides=point, errors=e.errors)
+            plan, exit_code = None, EXIT_INVALID
+        except RemoteError as e:
+            # A point that can't be planned, e.g. when its upload or placement fails, doesn't end the sweep
+            emit("plan_failed", config=config_name, overrides=point, kind="connection", message=str(e))
+            plan, exit_code = None, EXIT_CONNECTION
+        except (RunError, OSError) as e:
+            emit("plan_failed", config=config_name, overrides=point, kind="run", message=str(e))
+            plan, exit_code = None, EXIT_RUN_FAILED
+        if plan and plan.batch:
+            # Batch points are submitted together as one job array below
+            batch_plans.append(plan)
+            continue
+        if plan:
+            exit_code = JobRunner(plan).run()
+            emit("run_finished", run_id=plan.run_id, config=config_name, exit_code=exit_code)
+        if exit_code != 0:
+            failed += 1
+            if args.fail_fast:
+                break
+    if batch_plans:
+        for plan, exit_code in zip(batch_plans, BatchRunner(batch_plans).run()):
+            emit("run_finished", run_id=plan.run_id, config=config_name, exit_code=exit_code)
+            failed += exit_code != 0
+    emit("sweep_finished", config=config_name, points=len(points), failed=failed)
+    return EXIT_RUN_FAILED if failed else EXIT_OK
+
+
+def _fetch_selected(args, config, config_name, config_id):
+    wanted = {item.strip().lower() for item in args.only.split(",") if item.strip()}
+    entries = [entry for entry in output_manifest(config)
+               if entry["type"].lower() in wanted or os.path.splitext(entry["name"])[1].lstrip(".").lower() in wanted]
+    if not entries:
+        raise RunError(f"No output files match {args.only}")
+    user, host, source_path = output_location(config)
+    destination = os.path.abspath(args.output or os.path.basename(source_path.rstrip('/')))
+    history = get_history()
+    download_id = history.start_download(config_id, host or "localhost", source_path, destination)
+    try:
+        paths = fetch_selected_outputs(config, entries, destination, log=_log)
+    except (RemoteError, RunError):
+        history.finish_download(download_id, False)
+        raise
+    size = sum(entry["size"] for entry in entries)
+    history.finish_download(download_id, True, size)
+    emit("downloaded", config=config_name, path=destination, size=size, files=[os.path.relpath(p, destination) for p in paths])
+    return EXIT_OK
+
+
+def cmd_fetch(args):
+    config_path, config_name, config_id = _resolve_config(args.config)
+    config = _load_config_file(config_path)
+    if args.only:
+        return _fetch_selected(args, config, config_name, config_id)
+    user, host, source_path = output_location(config)
+    destination = os.path.abspath(args.output or f"{os.path.basename(source_path.rstrip('/'))}.zip")
+    history = get_history()
+    download_id = history.start_download(config_id, host or "localhost", source_path, destination)
+    try:
+        fetch_outputs(config, destination, log=_log, archive_format=args.format)
+    except (RemoteError, RunError, ArchiveError):
+        history.finish_download(download_id, False)
+        raise
+    size = os.path.getsize(destination)
+    history.finish_download(download_id, True, size)
+    emit("downloaded", config=config_name, path=destination, size=size)
+    return EXIT_OK
+
+
+def cmd_render(args):
+    from gds_to_png import render_gds
+
+    if args.config.endswith(".gds") and os.path.isfile(args.config):
+        gds_paths = [args.config]
+    else:
+        config_path, _, _ = _resolve_config(args.config)
+        config = _load_config_file(config_path)
+        gds_files = list_gds_files(config)
+        if not gds_files:
+            raise RunError(f"No GDS file found in {output_location(config)[2]}")
+        gds_paths = [fetch_gds(config, path) for path in gds_files]
+
+    for i, gds_path in enumerate(gds_paths):
+        png_path = args.output or f"{os.path.splitext(os.path.basename(gds_path))[0]}.png"
+        if args.output and len(gds_paths) > 1:
+            png_path = f"{os.path.splitext(args.output)[0]}_{i}.png"
+        render_gds(gds_path, png_path, dpi=args.dpi)
+        emit("rendered", gds=gds_path, path=os.path.abspath(png_path))
+    return EXIT_OK
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m openram_ui", description="Run OpenRAM configs without the GUI.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    validate = subparsers.add_parser("validate", help="check a config against the schema")
+    validate.add_argument("config")
+    validate.add_argument("--set", action="append", metavar="KEY=VALUE", help="override a config option")
+    validate.set_defaults(func=cmd_validate)
+
+    list_parser = subparsers.add_parser("list", help="list the saved configs")
+    list_parser.add_argument("query", nargs="*", help="only configs matching, e.g. tech_name=sky130 word_size>=32")
+    list_parser.set_defaults(func=cmd_list)
+
+    run = subparsers.add_parser("run", help="run OpenRAM on a config")
+    run.add_argument("config")
+    run.add_argument("--set", action="append", metavar="KEY=VALUE", help="override a config option")
+    run.add_argument("--quick", action="store_true",
+                     help="quick look first (netlist only, analytical delays, nominal corner), "
+                          "then the full run at background priority")
+    run.add_argument("--quick-only", action="store_true", help="only the quick look")
+    run.set_defaults(func=cmd_run)
+
+    sweep = subparsers.add_parser("sweep", help="run every combination of the given option values")
+    sweep.add_argument("config")
+    sweep.add_argument("--set", action="append", required=True, metavar="KEY=V1,V2",
+                       help="option and the comma-separated values to sweep")
+    sweep.add_argument("--fail-fast", action="store_true", help="stop at the first failing point")
+    sweep.set_defaults(func=cmd_sweep)
+
+    fetch = subparsers.add_parser("fetch", help="download a config's output folder as a zip")
+    fetch.add_argument("config")
+    fetch.add_argument("-o", "--output", help="archive to write (a folder with --only)")
+    fetch.add_argument("--only", metavar="TYPES",
+                       help="comma-separated artifact types or extensions to fetch, e.g. lib,lef,v,Datasheet")
+    fetch.add_argument("--format", choices=sorted(ARCHIVE_FORMATS),
+                       help="archive format for local outputs (default: from the file name)")
+    fetch.set_defaults(func=cmd_fetch)
+
+    results = subparsers.add_parser("results", help="rank the stored .lib results of finished runs")
+    results.add_argument("--config", help="only this config's runs, e.g. the points of a sweep")
+    results.add_argument("--corner", help="only this corner, e.g. 'TT 1.8V 25C'")
+    results.add_argument("--by", default="area,delay", metavar="KEY1,KEY2",
+                         help="the two results to rank on, lower being better (default: area,delay)")
+    results.add_argument("--limit", type=int, default=50)
+    results.set_defaults(func=cmd_results)
+
+    render = subparsers.add_parser("render", help="render a config's GDS output (or a GDS file) to PNG")
+    render.add_argument("config")
+    render.add_argument("-o", "--output", help="PNG file to write")
+    render.add_argument("--dpi", type=int, default=300)
+    render.set_defaults(func=cmd_render)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except InvalidConfigError as e:
+        emit("invalid_config", errors=e.errors)
+        return EXIT_INVALID
+    except (RemoteError, InvalidRemotePathError) as e:
+        emit("error", kind="connection", message=str(e))
+        return EXIT_CONNECTION
+    except ValueError as e:
+        emit("error", kind="invalid", message=str(e))
+        return EXIT_INVALID
+    except (RunError, ArchiveError, OSError) as e:
+        emit("error", kind="run", message=str(e))
+        return EXIT_RUN_FAILED
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
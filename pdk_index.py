@@ -0,0 +1,164 @@
+# pdk_index.py
+"""
+Discovers the PDKs under <openram_path>/technology instead of trusting a
+hand-maintained list. One scan (a single ssh call for remote installs)
+returns every file's size and mtime and hashes only the files that changed
+since the last scan; the per-file results are kept in a local index so the
+next scan stays incremental. Each PDK gets a size, file count and content
+hash, the hash being independent of the PDK's folder name.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shlex
+import threading
+import time
+
+from constants import PDK_INDEX_FILE, TECHNOLOGY_PATH
+from remote import parse_openram_path, run_ssh, RemoteError
+
+_lock = threading.Lock()
+
+
+def _scan_technology_dir(root, known):
+    """
+    Lists the files of every PDK folder under root as {path: [size, mtime, sha256]},
+    with paths relative to root. Files whose size and mtime match `known`
+    ({path: [size, mtime]}) get None instead of a hash. Also runs on the
+    server, so it must only use the standard library.
+    """
+    import hashlib
+    import os
+
+    files = {}
+    for tech in sorted(os.listdir(root)):
+        tech_dir = os.path.join(root, tech)
+        if tech.startswith((".", "__")) or not os.path.isdir(tech_dir):
+            continue
+        if not (os.path.isdir(os.path.join(tech_dir, "tech")) or os.path.isfile(os.path.join(tech_dir, "__init__.py"))):
+            continue
+        for dirpath, dirnames, filenames in os.walk(tech_dir):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for name in sorted(filenames):
+                path = os.path.join(dirpath, name)
+                if name.endswith(".pyc") or not os.path.isfile(path):
+                    continue
+                stat = os.stat(path)
+                relative_path = os.path.relpath(path, root)
+                old = known.get(relative_path)
+                digest = None
+                if not old or old[0] != stat.st_size or old[1] != stat.st_mtime:
+                    sha = hashlib.sha256()
+                    with open(path, "rb") as f:
+                        for block in iter(lambda: f.read(1024 * 1024), b""):
+                            sha.update(block)
+                    digest = sha.hexdigest()
+                files[relative_path] = [stat.st_size, stat.st_mtime, digest]
+    return files
+
+
+SCAN_SCRIPT = inspect.getsource(_scan_technology_dir) + \
+    "\nimport json, sys\njson.dump(_scan_technology_dir('.', json.load(sys.stdin)), sys.stdout)\n"
+
+
+def _load_index():
+    try:
+        with open(PDK_INDEX_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_index(index):
+    temp_path = PDK_INDEX_FILE + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(temp_path, PDK_INDEX_FILE)
+
+
+def tree_hash(files):
+    """Content hash of one PDK from its {path within the PDK: sha256} files."""
+    digest = hashlib.sha256()
+    for path in sorted(files):
+        digest.update(f"{path}\0{files[path]}\n".encode())
+    return digest.hexdigest()
+
+
+def summarize(files):
+    """Groups scanned {path: [size, mtime, sha256]} files into PDK summaries, sorted by name."""
+    by_tech = {}
+    for path, (size, _, digest) in files.items():
+        tech, _, inner_path = path.replace(os.sep, "/").partition("/")
+        by_tech.setdefault(tech, {})[inner_path] = (size, digest)
+    return [{
+        "name": tech,
+        "size": sum(size for size, _ in tech_files.values()),
+        "file_count": len(tech_files),
+        "content_hash": tree_hash({path: digest for path, (_, digest) in tech_files.items()}),
+    } for tech, tech_files in sorted(by_tech.items())]
+
+
+def scan_pdks(openram_path):
+    """
+    Scans <openram_path>/technology (openram_path may be user@host:path),
+    updates the local index and returns the PDK summaries.
+    Raises RemoteError or ValueError for a malformed path.
+    """
+    user, host, remote_path = parse_openram_path(openram_path)
+    with _lock:
+        entry = _load_index().get(openram_path, {})
+    old_files = entry.get("files", {})
+    known = {path: values[:2] for path, values in old_files.items()}
+
+    if user:
+        tech_dir = os.path.join(remote_path, TECHNOLOGY_PATH)
+        process = run_ssh(user, host, f"cd {tech_dir} && python3 -c {shlex.quote(SCAN_SCRIPT)}",
+                          input=json.dumps(known), timeout=600)
+        try:
+            scanned = json.loads(process.stdout)
+        except ValueError:
+            raise RemoteError(f"Unreadable PDK scan from {host}: {process.stdout[:200]}")
+    else:
+        tech_dir = os.path.join(openram_path, TECHNOLOGY_PATH)
+        scanned = _scan_technology_dir(tech_dir, known) if os.path.isdir(tech_dir) else {}
+
+    files = {}
+    for path, (size, mtime, digest) in scanned.items():
+        files[path] = [size, mtime, digest if digest is not None else old_files[path][2]]
+    techs = summarize(files)
+
+    with _lock:
+        index = _load_index()
+        index[openram_path] = {"scanned": time.time(), "files": files, "techs": techs}
+        _save_index(index)
+    return techs
+
+
+def indexed_pdks(openram_path):
+    """The PDK summaries from the last scan of an OpenRAM install, without scanning."""
+    with _lock:
+        return _load_index().get(openram_path, {}).get("techs", [])
+
+
+def file_sha256(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def local_pdk_files(folder):
+    """The files of a local PDK folder that the index counts, skipping Python caches."""
+    for dirpath, dirnames, filenames in os.walk(folder):
+        dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+        for filename in sorted(filenames):
+            path = os.path.join(dirpath, filename)
+            if not filename.endswith(".pyc") and os.path.isfile(path):
+                yield path
+
+
+def find_pdk(techs, content_hash):
+    """The indexed PDKs with the given content hash."""
+    return [tech for tech in techs if tech["content_hash"] == content_hash]
@@ -0,0 +1,165 @@
+# pdk_store.py
+"""
+Content-addressed PDK storage on the OpenRAM host. Every file is kept once
+in technology/.pdk_store under its SHA-256, and each technology folder is a
+tree of hard links into the store (symbolic links where the file system has
+none). Uploading a PDK only sends the files the store does not have yet, so
+variants sharing most of their files, or an unchanged re-upload, cost little
+more than hashing the local folder.
+"""
+import inspect
+import json
+import os
+import posixpath
+import shlex
+import shutil
+import time
+
+import paramiko
+
+from constants import TECHNOLOGY_PATH
+from pdk_index import file_sha256, local_pdk_files, tree_hash
+from remote import parse_openram_path, run_ssh, RemoteError
+from sftp_transfer import PROGRESS_INTERVAL, TransferCancelled, TransferProgress, connect, format_size, sftp_path
+
+STORE_DIR = ".pdk_store"
+
+
+def _missing_blobs(root, hashes):
+    """The hashes not yet in the store under root. Also runs on the server, so standard library only."""
+    import os
+
+    store = os.path.join(root, ".pdk_store")
+    os.makedirs(store, exist_ok=True)
+    return [digest for digest in hashes if not os.path.exists(os.path.join(store, digest))]
+
+
+def _link_tree(root, name, manifest):
+    """
+    Replaces the technology folder root/name with links into the store, as
+    listed in manifest ({path within the PDK: sha256}). The new tree is built
+    beside the old one and swapped in, so a failed upload leaves the old PDK
+    in place. Also runs on the server, so standard library only.
+    """
+    import os
+    import shutil
+
+    target = os.path.join(root, name)
+    staging = os.path.join(root, "." + name + ".staging")
+    old = os.path.join(root, "." + name + ".old")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    for path, digest in manifest.items():
+        link = os.path.join(staging, path)
+        os.makedirs(os.path.dirname(link), exist_ok=True)
+        blob = os.path.join(root, ".pdk_store", digest)
+        try:
+            os.link(blob, link)
+        except OSError:
+            os.symlink(os.path.relpath(blob, os.path.dirname(link)), link)
+    shutil.rmtree(old, ignore_errors=True)
+    if os.path.lexists(target):
+        os.rename(target, old)
+    os.rename(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def _remote_call(user, host, tech_dir, function, *args):
+    """Runs one of the functions above in tech_dir on the server and returns its result."""
+    script = inspect.getsource(function) + \
+        f"\nimport json, sys\njson.dump({function.__name__}('.', *json.load(sys.stdin)), sys.stdout)\n"
+    process = run_ssh(user, host, f"mkdir -p {tech_dir} && cd {tech_dir} && python3 -c {shlex.quote(script)}",
+                      input=json.dumps(args), timeout=600)
+    try:
+        return json.loads(process.stdout)
+    except ValueError:
+        raise RemoteError(f"Unexpected reply from {host}: {process.stdout[:200]}")
+
+
+def hash_pdk(folder):
+    """
+    Hashes a local PDK folder once for both the duplicate check and the
+    upload. Returns {'summary': size, file count and content hash comparable
+    with the PDK index, 'manifest': {path within the PDK: sha256},
+    'blobs': {sha256: local path} for its distinct files}. Raises OSError.
+    """
+    manifest, blobs = {}, {}
+    size = 0
+    for path in local_pdk_files(folder):
+        digest = file_sha256(path)
+        manifest[os.path.relpath(path, folder).replace(os.sep, "/")] = digest
+        blobs[digest] = path
+        size += os.path.getsize(path)
+    summary = {"name": os.path.basename(os.path.abspath(folder)), "size": size, "file_count": len(manifest),
+               "content_hash": tree_hash(manifest)}
+    return {"summary": summary, "manifest": manifest, "blobs": blobs}
+
+
+def _upload_blobs(user, host, store, blobs, missing, progress, name, log, cancelled):
+    client = connect(user, host)
+    try:
+        sftp = client.open_sftp()
+        store = sftp_path(store)
+        last_report = time.time()
+        for digest in missing:
+            path = blobs[digest]
+            if cancelled and cancelled():
+                raise TransferCancelled(f"Upload of {name} cancelled")
+            # Written under a temporary name so an interrupted upload never leaves a partial blob
+            part_path = f"{store}/{digest}.part"
+            sftp.put(path, part_path)
+            sftp.chmod(part_path, 0o444)
+            sftp.posix_rename(part_path, f"{store}/{digest}")
+            progress.add(os.path.getsize(path))
+            if time.time() - last_report >= PROGRESS_INTERVAL:
+                log(f"Uploading {name}: {progress.describe()}")
+                last_report = time.time()
+    except paramiko.SSHException as e:
+        raise RemoteError(f"Upload of {name} to {host} failed: {e}")
+    finally:
+        client.close()
+
+
+def upload_pdk(folder, openram_path, log=None, cancelled=None, hashed=None):
+    """
+    Installs a local PDK folder as <openram_path>/technology/<folder name>,
+    replacing any existing copy; `hashed` is the folder's hash_pdk() result
+    when it is already known. Returns a dict with the file count and the
+    number and total size of the files that had to be sent. Raises
+    RemoteError, TransferCancelled or OSError.
+    """
+    log = log or (lambda message: None)
+    name = os.path.basename(os.path.abspath(folder))
+    if hashed is None:
+        log(f"Hashing {name}...")
+        hashed = hash_pdk(folder)
+    manifest, blobs = hashed["manifest"], hashed["blobs"]
+    user, host, remote_path = parse_openram_path(openram_path)
+
+    if user:
+        tech_dir = posixpath.join(remote_path, TECHNOLOGY_PATH)
+        missing = _remote_call(user, host, tech_dir, _missing_blobs, sorted(blobs))
+    else:
+        tech_dir = os.path.join(openram_path, TECHNOLOGY_PATH)
+        missing = _missing_blobs(tech_dir, sorted(blobs))
+    progress = TransferProgress(sum(os.path.getsize(blobs[digest]) for digest in missing))
+    log(f"{len(manifest)} files, {len(blobs) - len(missing)} already stored; "
+        f"sending {len(missing)} ({format_size(progress.total)}).")
+
+    if user:
+        if missing:
+            _upload_blobs(user, host, posixpath.join(tech_dir, STORE_DIR), blobs, missing, progress, name, log, cancelled)
+        _remote_call(user, host, tech_dir, _link_tree, name, manifest)
+    else:
+        store = os.path.join(tech_dir, STORE_DIR)
+        for digest in missing:
+            if cancelled and cancelled():
+                raise TransferCancelled(f"Copy of {name} cancelled")
+            part_path = os.path.join(store, digest + ".part")
+            shutil.copyfile(blobs[digest], part_path)
+            os.chmod(part_path, 0o444)
+            os.replace(part_path, os.path.join(store, digest))
+            progress.add(os.path.getsize(blobs[digest]))
+        _link_tree(tech_dir, name, manifest)
+
+    return {"name": name, "files": len(manifest), "sent": len(missing), "bytes": progress.total}
@@ -0,0 +1,173 @@
+# remote.py
+import atexit
+import json
+import os
+import shlex
+import subprocess
+import threading
+import time
+
+from config_loader import _load_config_file
+from constants import ADVANCED_CONFIG_FILE, OPENRAM_PATH
+from remote_agent import RemoteAgent, AgentError, bootstrap_command, ONESHOT_SCRIPT
+
+SSH_KEY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openram_key")
+# Remote commands go through one persistent agent channel per host (see remote_agent.py)
+USE_AGENT = True
+# Seconds before starting the agent is tried again on a host where it failed
+AGENT_RETRY_INTERVAL = 300
+
+_agents = {}
+_agent_failures = {}
+# Guards the two dicts above; an agent is started under its host's own lock in _agent_start_locks
+_agents_lock = threading.Lock()
+_agent_start_locks = {}
+
+
+class RemoteError(Exception):
+    """An ssh/scp operation against the OpenRAM server failed."""
+
+
+class InvalidRemotePathError(ValueError):
+    """An OpenRAM path looks remote but is not of the form user@host:/path."""
+
+
+def parse_openram_path(openram_path):
+    """
+    Splits an OpenRAM path of the form user@host:/path into (user, host, path).
+    Returns (None, None, None) for a local path and raises
+    InvalidRemotePathError, a ValueError, if a remote path is malformed.
+    """
+    if '@' in openram_path and ':' in openram_path:
+        user_host, remote_path = openram_path.split(':', 1)
+        user, host = user_host.split('@', 1)
+        if not user or not host:
+            raise InvalidRemotePathError("Invalid remote path format. Use user@host:/path/to/openram")
+        return user, host, remote_path
+    return None, None, None
+
+
+def openram_target(advanced_config=None):
+    """(user, host, path) of the configured OpenRAM install; user and host are None when it is local."""
+    if advanced_config is None:
+        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
+    openram_path = advanced_config.get(OPENRAM_PATH, "")
+    user, host, remote_path = parse_openram_path(openram_path)
+    if user:
+        return user, host, remote_path
+    return None, None, openram_path
+
+
+def ssh_args(user, host, command, options=()):
+    """Arguments for the ssh executable (without the program name itself)."""
+    return ["-i", SSH_KEY_FILE, *options, f"{user}@{host}", command]
+
+
+def get_agent(user, host):
+    """The agent channel to user@host, started if needed, or None when the agent cannot run there."""
+    if not USE_AGENT:
+        return None
+    key = (user, host)
+    with _agents_lock:
+        agent = _agents.get(key)
+        if agent and agent.alive():
+            return agent
+        start_lock = _agent_start_locks.setdefault(key, threading.Lock())
+    # Starting can take a while, so it only holds up calls to the same host
+    with start_lock:
+        with _agents_lock:
+            agent = _agents.get(key)
+            if agent and agent.alive():
+                return agent  # Started by another caller while this one waited
+            if time.time() - _agent_failures.get(key, 0) < AGENT_RETRY_INTERVAL:
+                return None
+        try:
+            agent = RemoteAgent(["ssh"] + ssh_args(user, host, bootstrap_command()))
+        except AgentError:
+            with _agents_lock:
+                _agent_failures[key] = time.time()
+            return None
+        with _agents_lock:
+            _agents[key] = agent
+        return agent
+
+
+def _close_agents():
+    with _agents_lock:
+        agents = list(_agents.values())
+    for agent in agents:
+        agent.close()
+
+
+atexit.register(_close_agents)
+
+
+def remote_batch(user, host, ops, timeout=None):
+    """
+    Runs several agent operations (see remote_agent.py) on the server in one
+    round trip and returns their results in order. Raises RemoteError if any
+    of them failed.
+    """
+    agent = get_agent(user, host)
+    try:
+        if agent:
+            replies = agent.call(ops, timeout)
+        else:
+            process = subprocess.run(["ssh"] + ssh_args(user, host, f"python3 -c {shlex.quote(ONESHOT_SCRIPT)}"),
+                                     capture_output=True, text=True, timeout=timeout, input=json.dumps({"ops": ops}))
+            if process.returncode != 0:
+                raise RemoteError(process.stderr.strip() or f"Remote operations failed on {host}")
+            replies = json.loads(process.stdout)
+    except AgentError as e:
+        raise RemoteError(f"{e} ({host})")
+    except subprocess.TimeoutExpired:
+        raise RemoteError(f"Timed out running remote operations on {host}")
+    except ValueError:
+        raise RemoteError(f"Unreadable reply from {host}")
+    errors = [reply["error"] for reply in replies if "error" in reply]
+    if errors:
+        raise RemoteError("; ".join(errors))
+    return [reply["result"] for reply in replies]
+
+
+def run_ssh(user, host, command, timeout=None, check=True, input=None):
+    """Runs a command on the server and returns the CompletedProcess, raising RemoteError on failure."""
+    agent = get_agent(user, host)
+    if agent:
+        try:
+            reply = agent.call([{"op": "exec", "command": command, "input": input, "timeout": timeout}], timeout)[0]
+        except AgentError as e:
+            raise RemoteError(f"'{command}' failed on {host}: {e}")
+        if "error" in reply:
+            if reply["error"].startswith("TimeoutExpired"):
+                raise RemoteError(f"Timed out running '{command}' on {host}")
+            raise RemoteError(reply["error"])
+        result = reply["result"]
+        process = subprocess.CompletedProcess(command, result["returncode"], result["stdout"], result["stderr"])
+        if check and process.returncode != 0:
+            raise RemoteError(process.stderr.strip() or f"'{command}' failed on {host} with exit code {process.returncode}")
+        return process
+    try:
+        process = subprocess.run(["ssh"] + ssh_args(user, host, command), capture_output=True, text=True, timeout=timeout,
+                                 input=input)
+    except subprocess.TimeoutExpired:
+        raise RemoteError(f"Timed out running '{command}' on {host}")
+    if check and process.returncode != 0:
+        raise RemoteError(process.stderr.strip() or f"'{command}' failed on {host} with exit code {process.returncode}")
+    return process
+
+
+def scp_from(user, host, remote_path, local_path, recursive=False):
+    command = ["scp", "-i", SSH_KEY_FILE] + (["-r"] if recursive else []) + [f"{user}@{host}:{remote_path}", local_path]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RemoteError(process.stderr.strip() or f"scp of {remote_path} failed")
+
+
+def scp_to(user, host, local_paths, remote_path, recursive=False):
+    if isinstance(local_paths, str):
+        local_paths = [local_paths]
+    command = ["scp", "-i", SSH_KEY_FILE] + (["-r"] if recursive else []) + list(local_paths) + [f"{user}@{host}:{remote_path}"]
+    process = subprocess.run(command, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RemoteError(process.stderr.strip() or f"scp to {remote_path} failed")
@@ -0,0 +1,259 @@
+# remote_agent.py
+"""
+A small agent that runs on the OpenRAM server behind one persistent ssh
+channel, so remote commands no longer cost an ssh process and handshake
+each. The agent is copied to ~/.openram_ui/ on the server the first time it
+is needed and speaks length-prefixed JSON over the channel's stdin/stdout:
+
+    request:  {"id": n, "ops": [{"op": "exec", "command": "ls", ...}, ...]}
+    replies:  {"id": n, "index": i, "result": ...} or {"id": n, "index": i, "error": "..."}
+              per operation as it completes, then {"id": n, "done": true}
+
+Operations: exec (command, input, timeout, cwd), stat, listdir, read, write,
+mkdir and remove (path). Requests run concurrently on the server, so a long
+command does not hold up the others. This module only knows how to start
+the channel; remote.py supplies the ssh command.
+"""
+import hashlib
+import inspect
+import json
+import queue
+import struct
+import subprocess
+import threading
+
+AGENT_DIR = "~/.openram_ui"
+HEADER = struct.Struct(">I")
+# Extra seconds allowed for a reply beyond the operation's own timeout
+REPLY_GRACE = 30
+
+
+class AgentError(Exception):
+    """The agent could not be started or its channel broke."""
+
+
+def _agent_main(oneshot=False):
+    """
+    The agent itself. Runs on the server, so standard library only. With
+    `oneshot` it runs the ops of one JSON request from stdin and prints the
+    replies as a JSON list, for when no channel can be kept open.
+    """
+    import json
+    import os
+    import struct
+    import subprocess
+    import sys
+    import threading
+
+    header = struct.Struct(">I")
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    write_lock = threading.Lock()
+
+    def send(message):
+        data = json.dumps(message).encode()
+        with write_lock:
+            stdout.write(header.pack(len(data)) + data)
+            stdout.flush()
+
+    def run(op):
+        path = os.path.expanduser(op.get("path", ""))
+        kind = op["op"]
+        if kind == "exec":
+            # Without input the command must not inherit stdin, which is the request channel
+            stdin = subprocess.DEVNULL if op.get("input") is None else None
+            process = subprocess.run(["bash", "-c", op["command"]], input=op.get("input"), stdin=stdin,
+                                     capture_output=True, text=True, errors="replace", timeout=op.get("timeout"),
+                                     cwd=os.path.expanduser(op.get("cwd") or "~"))
+            return {"returncode": process.returncode, "stdout": process.stdout, "stderr": process.stderr}
+        if kind == "stat":
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return None
+            return {"size": stat.st_size, "mtime": stat.st_mtime, "is_dir": os.path.isdir(path)}
+        if kind == "listdir":
+            return sorted(os.listdir(path)) if os.path.isdir(path) else None
+        if kind == "read":
+            with open(path, errors="replace") as f:
+                return f.read()
+        if kind == "write":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path + ".tmp", "w") as f:
+                f.write(op["text"])
+            os.replace(path + ".tmp", path)
+            return True
+        if kind == "mkdir":
+            os.makedirs(path, exist_ok=True)
+            return True
+        if kind == "remove":
+            if os.path.exists(path):
+                os.remove(path)
+            return True
+        raise ValueError(f"Unknown operation '{kind}'")
+
+    def serve(request):
+        for index, op in enumerate(request["ops"]):
+            try:
+                send({"id": request["id"], "index": index, "result": run(op)})
+            except Exception as e:
+                send({"id": request["id"], "index": index, "error": f"{type(e).__name__}: {e}"})
+        send({"id": request["id"], "done": True})
+
+    if oneshot:
+        replies = []
+        for op in json.load(sys.stdin)["ops"]:
+            try:
+                replies.append({"result": run(op)})
+            except Exception as e:
+                replies.append({"error": f"{type(e).__name__}: {e}"})
+        json.dump(replies, sys.stdout)
+        return
+
+    send({"ready": True})
+    while True:
+        size = stdin.read(header.size)
+        if len(size) < header.size:
+            return
+        request = json.loads(stdin.read(header.unpack(size)[0]))
+        threading.Thread(target=serve, args=(request,), daemon=True).start()
+
+
+AGENT_SOURCE = inspect.getsource(_agent_main) + "\n_agent_main()\n"
+ONESHOT_SCRIPT = inspect.getsource(_agent_main) + "\n_agent_main(oneshot=True)\n"
+AGENT_FILE = f"{AGENT_DIR}/agent_{hashlib.sha1(AGENT_SOURCE.encode()).hexdigest()[:12]}.py"
+
+
+def bootstrap_command():
+    """
+    Remote shell command that starts the agent, first saving it from stdin
+    when this version is not on the server yet. It prints 'need' or 'ready'.
+    """
+    size = len(AGENT_SOURCE.encode())
+    return (f"f={AGENT_FILE}; if [ -f $f ]; then echo ready; else echo need; mkdir -p {AGENT_DIR} && "
+            f"head -c {size} > $f.tmp && mv $f.tmp $f; fi && exec python3 -u $f")
+
+
+class RemoteAgent:
+    """One agent channel. `command` is the argument list that runs bootstrap_command() on the server."""
+
+    def __init__(self, command, timeout=30):
+        self.process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE)
+        self.write_lock = threading.Lock()
+        self.replies = {}
+        self.replies_lock = threading.Lock()
+        self.next_id = 0
+        self.closed = False
+        self.stderr_tail = b""
+        threading.Thread(target=self._drain_stderr, daemon=True).start()
+        hello = queue.Queue()
+        threading.Thread(target=self._handshake, args=(hello,), daemon=True).start()
+        try:
+            error = hello.get(timeout=timeout)
+        except queue.Empty:
+            error = "no reply"
+        if error:
+            self.close()
+            raise AgentError(f"Could not start the remote agent: {error}")
+
+    def _handshake(self, hello):
+        try:
+            line = self.process.stdout.readline().strip()
+            if line == b"need":
+                with self.write_lock:
+                    self.process.stdin.write(AGENT_SOURCE.encode())
+                    self.process.stdin.flush()
+            elif line != b"ready":
+                try:
+                    self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    pass
+                raise AgentError(self.stderr_tail.decode(errors="replace").strip() or "no reply")
+            if self._read_frame() != {"ready": True}:
+                raise AgentError("unexpected greeting")
+        except (AgentError, OSError, ValueError) as e:
+            hello.put(str(e) or "channel closed")
+            return
+        hello.put(None)
+        self._read_replies()
+
+    def _drain_stderr(self):
+        """Keeps the end of ssh's stderr for error messages, without letting the pipe fill up."""
+        for line in self.process.stderr:
+            self.stderr_tail = (self.stderr_tail + line)[-4096:]
+
+    def _read_frame(self):
+        size = self.process.stdout.read(HEADER.size)
+        if len(size) < HEADER.size:
+            raise AgentError("channel closed")
+        return json.loads(self.process.stdout.read(HEADER.unpack(size)[0]))
+
+    def _read_replies(self):
+        """Hands every reply to the queue of its request, until the channel closes."""
+        try:
+            while True:
+                reply = self._read_frame()
+                with self.replies_lock:
+                    replies = self.replies.get(reply.get("id"))
+                if replies is not None:
+                    replies.put(reply)
+        except (AgentError, OSError, ValueError):
+            pass
+        with self.replies_lock:
+            self.closed = True
+            waiting = list(self.replies.values())
+        for replies in waiting:
+            replies.put(None)
+
+    def alive(self):
+        return not self.closed and self.process.poll() is None
+
+    def request(self, ops, timeout=None):
+        """
+        Sends a batch of operations and yields (index, reply) pairs as they
+        complete; a reply holds 'result' or 'error'. Raises AgentError when
+        the channel breaks or a reply takes longer than `timeout` seconds.
+        """
+        replies = queue.Queue()
+        with self.replies_lock:
+            if self.closed:
+                raise AgentError("Remote agent channel closed")
+            self.next_id += 1
+            request_id = self.next_id
+            self.replies[request_id] = replies
+        try:
+            data = json.dumps({"id": request_id, "ops": ops}).encode()
+            try:
+                with self.write_lock:
+                    self.process.stdin.write(HEADER.pack(len(data)) + data)
+                    self.process.stdin.flush()
+            except OSError as e:
+                raise AgentError(f"Remote agent channel closed: {e}")
+            while True:
+                try:
+                    reply = replies.get(timeout=timeout + REPLY_GRACE if timeout else None)
+                except queue.Empty:
+                    raise AgentError("Timed out waiting for the remote agent")
+                if reply is None:
+                    raise AgentError("Remote agent channel closed")
+                if reply.get("done"):
+                    return
+                yield reply["index"], reply
+        finally:
+            with self.replies_lock:
+                self.replies.pop(request_id, None)
+
+    def call(self, ops, timeout=None):
+        """Runs a batch of operations and returns their replies in order."""
+        replies = [None] * len(ops)
+        for index, reply in self.request(ops, timeout):
+            replies[index] = reply
+        return replies
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        if self.process.poll() is None:
+            self.process.terminate()
@@ -0,0 +1,184 @@
+# resource_sampler.py
+"""
+Samples the CPU, memory, I/O and process count of a run's OpenRAM process
+trees while it runs, from /proc on the machine the jobs run on (through the
+usual ssh path when that is the server). The samples of a run form a compact
+columnar time series that is stored with the run in the history, together
+with its peak memory, for sizing servers.
+"""
+import inspect
+import json
+import os
+import shlex
+import time
+
+from remote import run_ssh, RemoteError
+from sftp_transfer import format_size
+from warm_worker import JOB_PID_FILE
+
+# Seconds between samples unless the advanced settings give `sample_interval` (0 turns sampling off)
+SAMPLE_INTERVAL = 5
+SERIES_FIELDS = ("t", "cpu", "rss", "read_bytes", "write_bytes", "processes")
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+
+def _sample_tree(pids, pid_files, job_pid_file):
+    """
+    Resource use of the process trees rooted at `pids` and at the pids
+    written in `pid_files`: CPU ticks per process, total RSS, I/O bytes and
+    process count. A warm worker's job counts as part of the tree of the
+    client that sent it, found through `job_pid_file`. Returns None without
+    /proc. Also runs on the server, so standard library only.
+    """
+    import os
+
+    if not os.path.isdir("/proc"):
+        return None
+    roots = set(pids)
+    for path in pid_files:
+        try:
+            with open(os.path.expanduser(path)) as f:
+                roots.add(int(f.read().strip()))
+        except (OSError, ValueError):
+            pass
+
+    stats = {}
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        pid = int(entry)
+        # Fields after the command name: state, ppid, ..., utime (12th), stime, ..., rss in pages (22nd)
+        stats[pid] = (int(fields[11]) + int(fields[12]), int(fields[21]))
+        children.setdefault(int(fields[1]), []).append(pid)
+
+    tree = []
+    pending = [pid for pid in roots if pid in stats]
+    while pending:
+        pid = pending.pop()
+        # A client that started the worker has the job in its tree twice
+        if pid in tree:
+            continue
+        tree.append(pid)
+        pending += children.get(pid, [])
+        try:
+            with open(job_pid_file.format(uid=os.getuid(), pid=pid)) as f:
+                job_pid = int(f.read().strip())
+            if job_pid in stats:
+                pending.append(job_pid)
+        except (OSError, ValueError):
+            pass
+
+    sample = {"ticks": {}, "rss": 0, "read_bytes": 0, "write_bytes": 0, "processes": len(tree),
+              "clock_ticks": os.sysconf("SC_CLK_TCK")}
+    page_size = os.sysconf("SC_PAGE_SIZE")
+    for pid in tree:
+        ticks, rss_pages = stats[pid]
+        sample["ticks"][str(pid)] = ticks
+        sample["rss"] += rss_pages * page_size
+        try:
+            with open(f"/proc/{pid}/io") as f:
+                for line in f:
+                    key, _, value = line.partition(":")
+                    if key in ("read_bytes", "write_bytes"):
+                        sample[key] += int(value)
+        except (OSError, ValueError):
+            pass
+    return sample
+
+
+SAMPLE_SCRIPT = inspect.getsource(_sample_tree) + \
+    "\nimport json, sys\njson.dump(_sample_tree(*json.load(sys.stdin)), sys.stdout)\n"
+
+
+class RunSampler:
+    """Collects one run's resource time series, one sample() call per interval."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        self.interval = interval
+        self.start_time = time.time()
+        self.series = {field: [] for field in SERIES_FIELDS}
+        # CPU ticks per (host, pid) at the previous sample
+        self.previous_ticks = {}
+        self.previous_time = None
+
+    def _tree_samples(self, plan, local_pids):
+        """Raw samples of every machine the running jobs are on."""
+        samples = []
+        if local_pids:
+            sample = _sample_tree(local_pids, [], JOB_PID_FILE)
+            if sample:
+                samples.append(("localhost", sample))
+        pid_files = {}
+        for job in plan.jobs:
+            if job["state"] == "running" and "remote" in job and job.get("job_dir"):
+                host = (job["remote"]["user"], job["remote"]["host"])
+                pid_files.setdefault(host, []).append(os.path.join(job["job_dir"], "pid"))
+        for (user, host), paths in pid_files.items():
+            process = run_ssh(user, host, f"python3 -c {shlex.quote(SAMPLE_SCRIPT)}", timeout=30,
+                              input=json.dumps([[], paths, JOB_PID_FILE]))
+            try:
+                sample = json.loads(process.stdout)
+            except ValueError:
+                raise RemoteError(f"Unreadable resource sample from {host}")
+            if sample:
+                samples.append((host, sample))
+        return samples
+
+    def sample(self, plan, local_pids=()):
+        """
+        Samples the process trees of the run's running jobs (`local_pids` for
+        the local ones) and appends to the series. Returns the new point as a
+        dict of SERIES_FIELDS, or None when nothing is running. Raises
+        RemoteError.
+        """
+        samples = self._tree_samples(plan, local_pids)
+        if not samples:
+            return None
+        now = time.time()
+        ticks = {(host, pid): value for host, sample in samples for pid, value in sample["ticks"].items()}
+        cpu = 0.0
+        if self.previous_time is not None:
+            # Processes that started since the last sample count from zero
+            used = sum(value - self.previous_ticks.get(key, 0) for key, value in ticks.items())
+            cpu = 100.0 * max(used, 0) / samples[0][1]["clock_ticks"] / max(now - self.previous_time, 1e-3)
+        self.previous_ticks = ticks
+        self.previous_time = now
+        point = {
+            "t": round(now - self.start_time, 1),
+            "cpu": round(cpu, 1),
+            "rss": sum(sample["rss"] for _, sample in samples),
+            "read_bytes": sum(sample["read_bytes"] for _, sample in samples),
+            "write_bytes": sum(sample["write_bytes"] for _, sample in samples),
+            "processes": sum(sample["processes"] for _, sample in samples),
+        }
+        for field in SERIES_FIELDS:
+            self.series[field].append(point[field])
+        return point
+
+    def peak_memory(self):
+        return max(self.series["rss"]) if self.series["rss"] else None
+
+    def summary(self):
+        """One-line status: current CPU and memory, peak memory and sparklines of both."""
+        if not self.series["t"]:
+            return ""
+        return (f"CPU {self.series['cpu'][-1]:.0f}% {sparkline(self.series['cpu'])}  ·  "
+                f"Memory {format_size(self.series['rss'][-1])} (peak {format_size(self.peak_memory())}) "
+                f"{sparkline(self.series['rss'])}  ·  {self.series['processes'][-1]} processes")
+
+
+def sparkline(values, width=24):
+    """The values as at most `width` block characters, each standing for the maximum of its share of them."""
+    if not values:
+        return ""
+    bucket = max(1, -(-len(values) // width))
+    points = [max(values[i:i + bucket]) for i in range(0, len(values), bucket)]
+    top = max(points) or 1
+    return "".join(SPARK_BLOCKS[min(int(value / top * (len(SPARK_BLOCKS) - 1) + 0.5), len(SPARK_BLOCKS) - 1)]
+                   for value in points)
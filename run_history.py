@@ -0,0 +1,553 @@
+# run_history.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from constants import HISTORY_DB_FILE, USERS_CONFIG_DIR
+
+LOCAL_LOCATION = "local"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS configs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    location TEXT NOT NULL,
+    config_hash TEXT,
+    content TEXT,
+    last_opened REAL,
+    last_modified REAL,
+    last_activity REAL,
+    UNIQUE (location, name)
+);
+CREATE INDEX IF NOT EXISTS idx_configs_last_activity ON configs (last_activity);
+
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    config_id INTEGER REFERENCES configs (id),
+    config_hash TEXT,
+    host TEXT,
+    output_path TEXT,
+    start_time REAL NOT NULL,
+    end_time REAL,
+    exit_code INTEGER,
+    output_size INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_runs_start_time ON runs (start_time);
+CREATE INDEX IF NOT EXISTS idx_runs_config ON runs (config_id, start_time);
+CREATE INDEX IF NOT EXISTS idx_runs_config_hash ON runs (config_hash);
+
+CREATE TABLE IF NOT EXISTS downloads (
+    id INTEGER PRIMARY KEY,
+    config_id INTEGER REFERENCES configs (id),
+    host TEXT,
+    source TEXT,
+    destination TEXT,
+    start_time REAL NOT NULL,
+    end_time REAL,
+    size INTEGER,
+    success INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_downloads_start_time ON downloads (start_time);
+CREATE INDEX IF NOT EXISTS idx_downloads_config ON downloads (config_id, start_time);
+
+CREATE TABLE IF NOT EXISTS run_stages (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    job_label TEXT,
+    position INTEGER,
+    stage TEXT NOT NULL,
+    seconds REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_run_stages_run ON run_stages (run_id);
+CREATE INDEX IF NOT EXISTS idx_run_stages_stage ON run_stages (stage);
+
+-- Journal of detached remote jobs, so runs can be reattached after a disconnect or restart
+CREATE TABLE IF NOT EXISTS remote_jobs (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER REFERENCES runs (id),
+    position INTEGER,
+    user TEXT,
+    host TEXT,
+    label TEXT,
+    run_command TEXT,
+    job_dir TEXT,
+    job_config TEXT,
+    run_info TEXT,
+    steps TEXT,
+    log_offset INTEGER NOT NULL DEFAULT 0,
+    exit_code INTEGER,
+    state TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_remote_jobs_state ON remote_jobs (state, run_id);
+
+-- Resource use sampled while a run ran: columns of the time series as JSON lists (see resource_sampler.py)
+CREATE TABLE IF NOT EXISTS run_resources (
+    run_id INTEGER PRIMARY KEY REFERENCES runs (id),
+    interval REAL,
+    series TEXT
+);
+
+-- Summary of every .lib file a successful run wrote, keyed by the config hash, so sweep
+-- points can be ranked; a later run of the same config replaces them (see liberty_results.py)
+CREATE TABLE IF NOT EXISTS lib_results (
+    config_hash TEXT NOT NULL,
+    corner TEXT NOT NULL,
+    run_id INTEGER REFERENCES runs (id),
+    lib_file TEXT,
+    area REAL,
+    delay REAL,
+    slew REAL,
+    setup REAL,
+    hold REAL,
+    min_period REAL,
+    leakage_power REAL,
+    dynamic_power REAL,
+    units TEXT,
+    tables TEXT,
+    PRIMARY KEY (config_hash, corner)
+);
+CREATE INDEX IF NOT EXISTS idx_lib_results_area ON lib_results (corner, area);
+CREATE INDEX IF NOT EXISTS idx_lib_results_delay ON lib_results (corner, delay);
+
+-- Inverted index of the saved configs' parameters, for searching them (see config_index.py)
+CREATE TABLE IF NOT EXISTS config_files (
+    location TEXT NOT NULL,
+    name TEXT NOT NULL,
+    mtime REAL,
+    size INTEGER,
+    PRIMARY KEY (location, name)
+);
+CREATE TABLE IF NOT EXISTS config_params (
+    location TEXT NOT NULL,
+    name TEXT NOT NULL,
+    key TEXT NOT NULL,
+    text_value TEXT,
+    num_value REAL
+);
+CREATE INDEX IF NOT EXISTS idx_config_params_file ON config_params (location, name);
+CREATE INDEX IF NOT EXISTS idx_config_params_text ON config_params (key, text_value);
+CREATE INDEX IF NOT EXISTS idx_config_params_num ON config_params (key, num_value);
+"""
+
+# Columns added to the runs table after it was first released, with their types.
+# Existing databases get them through ALTER TABLE when opened.
+RUN_EXTRA_COLUMNS = {
+    "tech_name": "TEXT",
+    "word_size": "INTEGER",
+    "num_words": "INTEGER",
+    "words_per_row": "INTEGER",
+    "num_corners": "INTEGER",
+    "check_lvsdrc": "INTEGER",
+    "use_pex": "INTEGER",
+    "peak_memory": "INTEGER",
+    "endpoint": "TEXT",
+    # 'quick' for quick-look runs, 'full' otherwise (see run_service.QUICK_LOOK_OPTIONS)
+    "profile": "TEXT",
+    # The quick look a full run was queued by, and on the quick look the full run once it started
+    "linked_run_id": "INTEGER",
+}
+
+
+def hash_config_text(text):
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def location_for(user, host, remote_path):
+    """Key used to tell local configs apart from the ones on each OpenRAM server."""
+    if user and host:
+        return f"{user}@{host}:{remote_path}"
+    return LOCAL_LOCATION
+
+
+class RunHistory:
+    def __init__(self, db_path=HISTORY_DB_FILE):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.executescript(SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        existing = {row["name"] for row in self.conn.execute("PRAGMA table_info(runs)")}
+        for column, column_type in RUN_EXTRA_COLUMNS.items():
+            if column not in existing:
+                self.conn.execute(f"ALTER TABLE runs ADD COLUMN {column} {column_type}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_tech ON runs (tech_name, exit_code)")
+
+    def _execute(self, query, params=()):
+        with self.lock, self.conn:
+            return self.conn.execute(query, params)
+
+    def _query(self, query, params=()):
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(query, params).fetchall()]
+
+    # --- configs ---
+
+    def _upsert_config(self, name, location, content, column):
+        now = time.time()
+        config_hash = hash_config_text(content) if content is not None else None
+        self._execute(
+            f"""INSERT INTO configs (name, location, config_hash, content, {column}, last_activity)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (location, name) DO UPDATE SET
+                    config_hash = COALESCE(excluded.config_hash, config_hash),
+                    content = COALESCE(excluded.content, content),
+                    {column} = excluded.{column},
+                    last_activity = excluded.last_activity""",
+            (name, location, config_hash, content, now, now),
+        )
+        return self.get_config_id(name, location)
+
+    def record_config_opened(self, name, location, content=None):
+        return self._upsert_config(name, location, content, "last_opened")
+
+    def record_config_saved(self, name, location, content=None):
+        return self._upsert_config(name, location, content, "last_modified")
+
+    def get_config_id(self, name, location):
+        rows = self._query("SELECT id FROM configs WHERE location = ? AND name = ?", (location, name))
+        return rows[0]["id"] if rows else None
+
+    def get_config(self, config_id):
+        rows = self._query("SELECT * FROM configs WHERE id = ?", (config_id,))
+        return rows[0] if rows else None
+
+    def import_local_configs(self, folder_path=USERS_CONFIG_DIR):
+        """Seeds the store with the local configs once, so an empty history still shows something."""
+        path = Path(folder_path)
+        if not path.is_dir():
+            return
+        for file in path.glob("*.py"):
+            content = file.read_text(errors="replace")
+            mtime = file.stat().st_mtime
+            self._execute(
+                """INSERT OR IGNORE INTO configs (name, location, config_hash, content, last_modified, last_activity)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                (file.stem, LOCAL_LOCATION, hash_config_text(content), content, mtime, mtime),
+            )
+
+    def has_configs(self):
+        return bool(self._query("SELECT 1 FROM configs LIMIT 1"))
+
+    def recent_configs(self, limit=10):
+        return self._query(
+            """SELECT id, name, location, last_opened, last_modified, last_activity
+               FROM configs ORDER BY last_activity DESC LIMIT ?""",
+            (limit,),
+        )
+
+    # --- config search index ---
+
+    def indexed_config_files(self, location):
+        """{name: (mtime, size)} of the config files indexed for a location."""
+        rows = self._query("SELECT name, mtime, size FROM config_files WHERE location = ?", (location,))
+        return {row["name"]: (row["mtime"], row["size"]) for row in rows}
+
+    def update_config_index(self, location, changed, removed):
+        """
+        Replaces the indexed parameters of the `changed` configs ({name: (mtime,
+        size, [(key, text_value, num_value)])}) and drops the `removed` ones.
+        """
+        with self.lock, self.conn:
+            for name in list(changed) + list(removed):
+                self.conn.execute("DELETE FROM config_params WHERE location = ? AND name = ?", (location, name))
+                self.conn.execute("DELETE FROM config_files WHERE location = ? AND name = ?", (location, name))
+            for name, (mtime, size, params) in changed.items():
+                self.conn.execute("INSERT INTO config_files (location, name, mtime, size) VALUES (?, ?, ?, ?)",
+                                  (location, name, mtime, size))
+                self.conn.executemany(
+                    "INSERT INTO config_params (location, name, key, text_value, num_value) VALUES (?, ?, ?, ?, ?)",
+                    [(location, name, key, text_value, num_value) for key, text_value, num_value in params])
+
+    def search_config_index(self, location, terms):
+        """
+        Names of the indexed configs of a location matching every (key,
+        operator, value) term, see config_index.parse_query. A term without a
+        key matches config names containing the value.
+        """
+        query = ["SELECT name FROM config_files WHERE location = ?"]
+        params = [location]
+        for key, operator, value in terms:
+            if key is None:
+                query.append("INTERSECT SELECT name FROM config_files WHERE location = ? AND name LIKE ?")
+                params += [location, f"%{value}%"]
+                continue
+            column = "num_value" if isinstance(value, (int, float)) else "text_value"
+            if operator == "~":
+                condition, value = f"{column} LIKE ?", f"%{value}%"
+            else:
+                condition = f"{column} {'=' if operator == '!=' else operator} ?"
+            # A list-valued parameter has one row per element, so != is "no element equals"
+            compound = "EXCEPT" if operator == "!=" else "INTERSECT"
+            query.append(f"{compound} SELECT name FROM config_params WHERE location = ? AND key = ? AND {condition}")
+            params += [location, key, value]
+        return sorted(row["name"] for row in self._query(" ".join(query), params))
+
+    # --- runs ---
+
+    def start_run(self, config_id, config_hash, host, output_path, features=None):
+        """
+        Records a run start. `features` holds values for RUN_EXTRA_COLUMNS
+        (see run_predictor.run_features); a linked_run_id among them links
+        the other run back to this one.
+        """
+        features = {k: v for k, v in (features or {}).items() if k in RUN_EXTRA_COLUMNS}
+        columns = ["config_id", "config_hash", "host", "output_path", "start_time"] + list(features)
+        values = [config_id, config_hash, host, output_path, time.time()] + list(features.values())
+        with self.lock, self.conn:
+            cursor = self.conn.execute(
+                f"INSERT INTO runs ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+            if features.get("linked_run_id"):
+                self.conn.execute("UPDATE runs SET linked_run_id = ? WHERE id = ?",
+                                  (cursor.lastrowid, features["linked_run_id"]))
+        return cursor.lastrowid
+
+    def finish_run(self, run_id, exit_code, output_size=None, peak_memory=None):
+        self._execute(
+            """UPDATE runs SET end_time = ?, exit_code = ?, output_size = ?,
+                   peak_memory = COALESCE(?, peak_memory)
+               WHERE id = ?""",
+            (time.time(), exit_code, output_size, peak_memory, run_id),
+        )
+
+    def save_run_resources(self, run_id, interval, series):
+        self._execute("INSERT OR REPLACE INTO run_resources (run_id, interval, series) VALUES (?, ?, ?)",
+                      (run_id, interval, json.dumps(series)))
+
+    def run_resources(self, run_id):
+        """The sampled time series of a run as {field: [values]}, or None."""
+        rows = self._query("SELECT series FROM run_resources WHERE run_id = ?", (run_id,))
+        return json.loads(rows[0]["series"]) if rows else None
+
+    def resource_peaks(self, limit=500):
+        """Peak memory, peak CPU and size parameters of sampled runs, newest first, for capacity planning."""
+        rows = self._query(
+            """SELECT runs.id, runs.host, runs.tech_name, runs.word_size, runs.num_words, runs.num_corners,
+                      runs.peak_memory, runs.end_time - runs.start_time AS duration, run_resources.series
+               FROM runs JOIN run_resources ON run_resources.run_id = runs.id
+               ORDER BY runs.start_time DESC LIMIT ?""",
+            (limit,),
+        )
+        for row in rows:
+            series = json.loads(row.pop("series"))
+            row["peak_cpu"] = max(series["cpu"], default=None)
+            row["peak_processes"] = max(series["processes"], default=None)
+        return rows
+
+    def save_lib_results(self, run_id, results):
+        """Stores the library summaries of a run (see liberty_results.library_results) under its config hash."""
+        with self.lock, self.conn:
+            for result in results:
+                self.conn.execute(
+                    """INSERT OR REPLACE INTO lib_results
+                           (config_hash, corner, run_id, lib_file, area, delay, slew, setup, hold, min_period,
+                            leakage_power, dynamic_power, units, tables)
+                       SELECT config_hash, ?, id, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ? FROM runs WHERE id = ?""",
+                    (result["corner"], result["lib_file"], result["area"], result["delay"], result["slew"],
+                     result["setup"], result["hold"], result["min_period"], result["leakage_power"],
+                     result["dynamic_power"], json.dumps(result["units"]), json.dumps(result["tables"]), run_id),
+                )
+
+    def lib_results(self, limit=5000):
+        """Stored library summaries with their run's size parameters and config name, newest first."""
+        rows = self._query(
+            """SELECT lib_results.config_hash, lib_results.corner, lib_results.run_id, lib_results.lib_file,
+                      lib_results.area, lib_results.delay, lib_results.slew, lib_results.setup, lib_results.hold,
+                      lib_results.min_period, lib_results.leakage_power, lib_results.dynamic_power,
+                      lib_results.units, runs.start_time, runs.tech_name, runs.word_size, runs.num_words,
+                      runs.words_per_row, runs.profile, configs.name AS config_name
+               FROM lib_results JOIN runs ON runs.id = lib_results.run_id
+               LEFT JOIN configs ON configs.id = runs.config_id
+               ORDER BY runs.start_time DESC LIMIT ?""",
+            (limit,),
+        )
+        for row in rows:
+            row["units"] = json.loads(row["units"] or "{}")
+        return rows
+
+    def lib_tables(self, config_hash, corner):
+        rows = self._query("SELECT tables FROM lib_results WHERE config_hash = ? AND corner = ?",
+                           (config_hash, corner))
+        return json.loads(rows[0]["tables"]) if rows else None
+
+    def record_run_stages(self, run_id, job_label, steps):
+        """Stores the (step, seconds) profile OpenRAM reported for one job of a run."""
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO run_stages (run_id, job_label, position, stage, seconds) VALUES (?, ?, ?, ?, ?)",
+                [(run_id, job_label, i, stage, seconds) for i, (stage, seconds) in enumerate(steps)],
+            )
+
+    def stage_weights(self):
+        """Average seconds per OpenRAM step over all recorded runs."""
+        rows = self._query("SELECT stage, AVG(seconds) AS seconds FROM run_stages GROUP BY stage")
+        return {row["stage"]: row["seconds"] for row in rows if row["seconds"]}
+
+    def slowest_stage(self, run_id):
+        rows = self._query(
+            """SELECT stage, SUM(seconds) AS seconds FROM run_stages WHERE run_id = ?
+               GROUP BY stage ORDER BY seconds DESC LIMIT 1""",
+            (run_id,),
+        )
+        return rows[0] if rows else None
+
+    def stage_breakdown_by_size(self):
+        """Average seconds per step for each memory size (word_size * num_words bits)."""
+        return self._query(
+            """SELECT runs.word_size * runs.num_words AS bits, run_stages.stage AS stage,
+                      AVG(run_stages.seconds) AS seconds, COUNT(DISTINCT runs.id) AS runs
+               FROM run_stages JOIN runs ON runs.id = run_stages.run_id
+               WHERE runs.word_size IS NOT NULL AND COALESCE(runs.profile, 'full') = 'full'
+               GROUP BY bits, stage ORDER BY bits"""
+        )
+
+    # --- detached remote job journal ---
+
+    def add_remote_job(self, run_id, position, user, host, label, run_command, job_config, run_info):
+        """Journals a remote job before it starts. `job_config` and `run_info` are JSON strings."""
+        cursor = self._execute(
+            """INSERT INTO remote_jobs (run_id, position, user, host, label, run_command, job_config, run_info, state)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'pending')""",
+            (run_id, position, user, host, label, run_command, job_config, run_info),
+        )
+        return cursor.lastrowid
+
+    def mark_remote_job_started(self, job_id, job_dir):
+        self._execute("UPDATE remote_jobs SET state = 'running', job_dir = ? WHERE id = ?", (job_dir, job_id))
+
+    def update_remote_job_progress(self, job_id, log_offset, steps=None):
+        self._execute(
+            "UPDATE remote_jobs SET log_offset = ?, steps = COALESCE(?, steps) WHERE id = ?",
+            (log_offset, steps, job_id),
+        )
+
+    def finish_remote_job(self, job_id, exit_code):
+        self._execute("UPDATE remote_jobs SET state = 'done', exit_code = ? WHERE id = ?", (exit_code, job_id))
+
+    def active_remote_jobs(self):
+        """All journaled jobs of the most recent run that still has unfinished jobs."""
+        return self._query(
+            """SELECT * FROM remote_jobs WHERE run_id = (
+                   SELECT run_id FROM remote_jobs WHERE state != 'done' ORDER BY id DESC LIMIT 1)
+               ORDER BY position"""
+        )
+
+    def active_jobs_by_endpoint(self, max_age=2 * 24 * 3600):
+        """
+        Unfinished jobs per endpoint (openram_path): journaled remote jobs,
+        and for runs without a journal (local ones) the run itself, if it
+        started within `max_age` seconds; older unfinished local runs are
+        taken to be left over from a crash.
+        """
+        rows = self._query(
+            """SELECT runs.endpoint AS endpoint, runs.start_time AS start_time,
+                      (SELECT COUNT(*) FROM remote_jobs WHERE remote_jobs.run_id = runs.id) AS journaled,
+                      (SELECT COUNT(*) FROM remote_jobs
+                       WHERE remote_jobs.run_id = runs.id AND remote_jobs.state != 'done') AS unfinished
+               FROM runs WHERE runs.end_time IS NULL AND runs.endpoint IS NOT NULL"""
+        )
+        jobs = {}
+        for row in rows:
+            if row["journaled"]:
+                count = row["unfinished"]
+            else:
+                count = 1 if row["start_time"] > time.time() - max_age else 0
+            jobs[row["endpoint"]] = jobs.get(row["endpoint"], 0) + count
+        return jobs
+
+    def clear_remote_jobs(self, run_id):
+        self._execute("DELETE FROM remote_jobs WHERE run_id = ?", (run_id,))
+
+    def successful_runs(self):
+        """Finished, successful runs with their recorded features, for the runtime predictor."""
+        return self._query(
+            """SELECT id, tech_name, word_size, num_words, words_per_row, num_corners,
+                      check_lvsdrc, use_pex, peak_memory, end_time - start_time AS duration
+               FROM runs
+               WHERE exit_code = 0 AND end_time IS NOT NULL AND word_size IS NOT NULL
+                     AND COALESCE(profile, 'full') = 'full'"""
+        )
+
+    def run_stats(self):
+        """Cheap fingerprint of the runs table, used to know when cached models are stale."""
+        rows = self._query("SELECT COUNT(*) AS count, MAX(end_time) AS last_end FROM runs WHERE exit_code = 0")
+        return rows[0]["count"], rows[0]["last_end"]
+
+    def run_endpoints(self, limit=200):
+        """(endpoint, output_path) of the latest runs placed through the host pool, newest first."""
+        return self._query(
+            "SELECT endpoint, output_path FROM runs WHERE endpoint IS NOT NULL ORDER BY start_time DESC LIMIT ?",
+            (limit,),
+        )
+
+    def recent_runs(self, limit=10):
+        return self._query(
+            """SELECT runs.*, configs.name AS config_name, configs.location
+               FROM runs LEFT JOIN configs ON configs.id = runs.config_id
+               ORDER BY runs.start_time DESC LIMIT ?""",
+            (limit,),
+        )
+
+    def latest_quick_look(self, config_id):
+        """The newest quick-look run of a config with the full run it queued (full_* keys), or None."""
+        rows = self._query(
+            """SELECT quick.*, full_run.id AS full_id, full_run.start_time AS full_start_time,
+                      full_run.end_time AS full_end_time, full_run.exit_code AS full_exit_code
+               FROM runs quick LEFT JOIN runs full_run ON full_run.id = quick.linked_run_id
+               WHERE quick.config_id = ? AND quick.profile = 'quick'
+               ORDER BY quick.start_time DESC LIMIT 1""",
+            (config_id,),
+        )
+        return rows[0] if rows else None
+
+    def config_history(self, config_id, limit=100):
+        return self._query(
+            "SELECT * FROM runs WHERE config_id = ? ORDER BY start_time DESC LIMIT ?",
+            (config_id, limit),
+        )
+
+    # --- downloads ---
+
+    def start_download(self, config_id, host, source, destination):
+        cursor = self._execute(
+            """INSERT INTO downloads (config_id, host, source, destination, start_time)
+               VALUES (?, ?, ?, ?, ?)""",
+            (config_id, host, source, destination, time.time()),
+        )
+        return cursor.lastrowid
+
+    def finish_download(self, download_id, success, size=None):
+        self._execute(
+            "UPDATE downloads SET end_time = ?, success = ?, size = ? WHERE id = ?",
+            (time.time(), int(bool(success)), size, download_id),
+        )
+
+    def recent_downloads(self, limit=10):
+        return self._query("SELECT * FROM downloads ORDER BY start_time DESC LIMIT ?", (limit,))
+
+
+@lru_cache(maxsize=None)
+def get_history(db_path=HISTORY_DB_FILE):
+    """Returns the shared history store, opening the database on first use."""
+    return RunHistory(db_path)
+
+
+def local_folder_size(path):
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(dirpath, filename))
+            except OSError:
+                pass
+    return total
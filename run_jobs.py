@@ -0,0 +1,212 @@
+# run_jobs.py
+import glob
+import itertools
+import os
+import shlex
+import shutil
+
+from config_loader import config_to_text
+from warm_worker import worker_run_command
+
+CORNER_OUTPUT_DIR = "corners"
+# Sub-directory of users_configs holding the generated per-job configs
+JOB_CONFIG_DIR = "jobs"
+# Sub-directory of a remote output folder holding detached jobs' pid, log and exit code
+REMOTE_JOB_DIR = ".openram_ui"
+# Written to stderr by tail_command once the detached job has ended
+EXIT_MARKER = "__openram_ui_exit="
+# Drops the shell's CPU and I/O priority before OpenRAM starts, for full runs queued
+# behind a quick look; the simulators and DRC/LVS tools it starts inherit it
+BACKGROUND_PREFIX = "renice -n 10 -p $$ > /dev/null 2>&1; ionice -c 2 -n 7 -p $$ > /dev/null 2>&1; "
+
+
+def activation_scripts(openram_path):
+    """The scripts that have to be sourced before sram_compiler.py can run."""
+    return [
+        os.path.join(openram_path, "openram_env", "bin", "activate"),
+        os.path.join(openram_path, "miniconda", "bin", "activate"),
+        os.path.join(openram_path, "setpaths.sh"),
+    ]
+
+
+def local_run_script(openram_path, config_path, warm=False, background=False):
+    """
+    Contents of the bash script that runs OpenRAM on a local config. With
+    `warm`, the config goes to the install's warm worker (see warm_worker.py),
+    which sources the activation scripts only when it starts. With
+    `background` it runs at lowered priority.
+    """
+    sources = [f"source {script}" for script in activation_scripts(openram_path)]
+    if warm:
+        # exec, so that stopping the script reaches the worker client and with it the job
+        command = worker_run_command(openram_path, config_path, "; ".join(sources + ["true"]), background)
+        return "#!/bin/bash\nexec " + command + "\n"
+    lines = ["#!/bin/bash" + ("\n" + BACKGROUND_PREFIX.strip() if background else "")] + sources
+    lines.append(f"python3 -u {os.path.join(openram_path, 'sram_compiler.py')} {config_path}")
+    return "\n".join(lines) + "\n"
+
+
+def remote_run_command(remote_openram_path, remote_config_path, warm=False, background=False):
+    """
+    Shell command that runs OpenRAM on a config that already sits on the
+    remote server, at lowered priority with `background`.
+    """
+    steps = [f"cd {remote_openram_path}"]
+    steps += [f"source {script}" for script in activation_scripts(remote_openram_path)]
+    if warm:
+        return worker_run_command(remote_openram_path, remote_config_path, " && ".join(steps), background)
+    steps.append(f"python3 -u {os.path.join(remote_openram_path, 'sram_compiler.py')} {remote_config_path}")
+    command = " && ".join(steps)
+    return background_command(command) if background else command
+
+
+def background_command(command):
+    """Shell command that runs `command` at lowered CPU and I/O priority."""
+    return BACKGROUND_PREFIX + command
+
+
+def background_argv(argv):
+    """Argument list that runs `argv` at lowered CPU and I/O priority."""
+    return ["bash", "-c", BACKGROUND_PREFIX + 'exec "$@"', "bash"] + list(argv)
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if value in (None, ""):
+        return []
+    return [value]
+
+
+def corner_cross_product(config):
+    """
+    Returns the (process, voltage, temperature) corners a merged config will
+    characterise, or an empty list when they come from the technology defaults
+    and can't be known up front.
+    """
+    if config.get("nominal_corner_only"):
+        return []
+    if config.get("use_specified_corners"):
+        return [tuple(corner) for corner in config["use_specified_corners"]]
+    process_corners = _as_list(config.get("process_corners"))
+    supply_voltages = _as_list(config.get("supply_voltages"))
+    temperatures = _as_list(config.get("temperatures"))
+    if not (process_corners and supply_voltages and temperatures):
+        return []
+    return list(itertools.product(process_corners, supply_voltages, temperatures))
+
+
+def corner_label(corner):
+    process, voltage, temperature = corner
+    return f"{process} {voltage}V {temperature}C"
+
+
+def corner_dir_name(corner):
+    """File-system (and Python module) safe name of a corner, e.g. TT_1p8V_25C."""
+    process, voltage, temperature = corner
+    return f"{process}_{voltage}V_{temperature}C".replace(".", "p").replace("-", "m")
+
+
+def split_corner_configs(personal_config, config_name, output_path, corners):
+    """
+    Builds one config per corner. The first corner keeps the full flow and
+    writes to the normal output path; the others only build the netlist and
+    characterise their corner into <output_path>/corners/<corner>/, so the
+    layout (and DRC/LVS) is done once.
+
+    Returns a list of (corner, config dict) pairs.
+    """
+    jobs = []
+    for i, corner in enumerate(corners):
+        corner_config = dict(personal_config)
+        corner_config["use_specified_corners"] = [corner]
+        corner_config["nominal_corner_only"] = False
+        # Keep every job's files named after the original config
+        corner_config["output_name"] = personal_config.get("output_name") or config_name
+        if i == 0:
+            corner_config["output_path"] = output_path
+        else:
+            corner_config["output_path"] = os.path.join(output_path, CORNER_OUTPUT_DIR, corner_dir_name(corner))
+            corner_config["netlist_only"] = True
+            corner_config["check_lvsdrc"] = False
+        jobs.append((corner, corner_config))
+    return jobs
+
+
+def corner_output_dirs(output_path, corners):
+    return [os.path.join(output_path, CORNER_OUTPUT_DIR, corner_dir_name(corner)) for corner in corners[1:]]
+
+
+def merge_corner_libs(output_path, corners):
+    """Copies the per-corner .lib files next to the main outputs. Returns the copied file names."""
+    merged = []
+    for corner_dir in corner_output_dirs(output_path, corners):
+        for lib_file in glob.glob(os.path.join(corner_dir, "*.lib")):
+            shutil.copy2(lib_file, output_path)
+            merged.append(os.path.basename(lib_file))
+    return merged
+
+
+def remote_merge_command(output_path, corners):
+    """Shell command doing merge_corner_libs on the remote server."""
+    copies = [f"cp {corner_dir}/*.lib {output_path}/ 2>/dev/null"
+              for corner_dir in corner_output_dirs(output_path, corners)]
+    return "; ".join(copies + [f"ls {output_path}/*.lib"])
+
+
+def write_job_configs(directory, config_name, job_configs):
+    """
+    Writes each job's config into `directory` and returns the file paths.
+    A single job keeps the config's own file name, so OpenRAM's default
+    output name doesn't change; corner jobs get the corner appended.
+    """
+    paths = []
+    for corner, job_config in job_configs:
+        file_name = f"{config_name}_{corner_dir_name(corner)}.py" if corner else f"{config_name}.py"
+        path = os.path.join(directory, file_name)
+        with open(path, "w") as f:
+            f.write(config_to_text(job_config))
+        paths.append(path)
+    return paths
+
+
+def remote_job_dir(remote_output_path, run_id, index):
+    return os.path.join(remote_output_path, REMOTE_JOB_DIR, f"run_{run_id}_{index}")
+
+
+def detached_launch_command(run_command, job_dir):
+    """
+    Shell command that starts `run_command` in its own session on the server,
+    so it survives the ssh connection, and prints its pid. Output goes to
+    <job_dir>/run.log and the exit code to <job_dir>/exit_code.
+    """
+    log_file = os.path.join(job_dir, "run.log")
+    exit_file = os.path.join(job_dir, "exit_code")
+    pid_file = os.path.join(job_dir, "pid")
+    inner = f"{{ {run_command}; }} > {log_file} 2>&1; echo $? > {exit_file}"
+    return (f"mkdir -p {job_dir}; rm -f {exit_file}; "
+            f"nohup setsid bash -c {shlex.quote(inner)} > /dev/null 2>&1 < /dev/null & "
+            f"echo $! > {pid_file}; cat {pid_file}")
+
+
+def tail_command(job_dir, offset):
+    """
+    Shell command that streams a detached job's log from byte `offset` until
+    the job ends, then reports its exit code on stderr after EXIT_MARKER.
+    """
+    log_file = os.path.join(job_dir, "run.log")
+    exit_file = os.path.join(job_dir, "exit_code")
+    pid_file = os.path.join(job_dir, "pid")
+    return (f"tail -c +{offset + 1} --pid=$(cat {pid_file}) -F {log_file} 2>/dev/null; "
+            f"echo {EXIT_MARKER}$(cat {exit_file} 2>/dev/null) >&2")
+
+
+def parse_exit_marker(text):
+    """Returns the exit code reported by tail_command, -1 if the job died without one, or None if absent."""
+    if EXIT_MARKER not in text:
+        return None
+    value = text.split(EXIT_MARKER, 1)[1].split()[0:1]
+    try:
+        return int(value[0]) if value else -1
+    except ValueError:
+        return -1
@@ -0,0 +1,189 @@
+# run_predictor.py
+import math
+from functools import lru_cache
+
+from run_history import get_history
+
+# Config options the estimate depends on; the editor only re-estimates when one of these changes
+PREDICTOR_KEYS = {"tech_name", "word_size", "num_words", "words_per_row", "process_corners",
+                  "supply_voltages", "temperatures", "nominal_corner_only", "use_specified_corners",
+                  "check_lvsdrc", "use_pex"}
+
+# Below this many comparable runs we don't trust a fit
+MIN_SAMPLES = 3
+# Use a per-technology model once a tech has this many runs, otherwise pool all techs
+MIN_TECH_SAMPLES = 8
+RIDGE = 1e-3
+
+
+def _count(value):
+    if isinstance(value, (list, tuple)):
+        return max(len(value), 1)
+    return 1
+
+
+def _int(value, default=0):
+    try:
+        return int(value or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def run_features(config):
+    """
+    Extracts the values the predictor is keyed on from a merged (default + personal) config.
+    The keys match the extra columns of the runs table in run_history.
+    """
+    if config.get("nominal_corner_only"):
+        num_corners = 1
+    elif isinstance(config.get("use_specified_corners"), (list, tuple)):
+        num_corners = _count(config["use_specified_corners"])
+    else:
+        num_corners = (_count(config.get("process_corners"))
+                       * _count(config.get("supply_voltages"))
+                       * _count(config.get("temperatures")))
+    return {
+        "tech_name": config.get("tech_name") or "",
+        "word_size": _int(config.get("word_size")),
+        "num_words": _int(config.get("num_words")),
+        "words_per_row": _int(config.get("words_per_row"), 1),
+        "num_corners": num_corners,
+        "check_lvsdrc": int(bool(config.get("check_lvsdrc"))),
+        "use_pex": int(bool(config.get("use_pex"))),
+    }
+
+
+def _vector(features):
+    bits = max(features["word_size"] * features["num_words"], 1)
+    return [
+        1.0,
+        math.log2(bits),
+        math.log2(max(features["words_per_row"] or 1, 1)),
+        math.log2(max(features["num_corners"] or 1, 1)),
+        float(features["check_lvsdrc"] or 0),
+        float(features["use_pex"] or 0),
+    ]
+
+
+def _solve(a, b):
+    """Solves a*x = b with Gaussian elimination (a is small and symmetric positive definite)."""
+    n = len(b)
+    m = [row[:] + [b[i]] for i, row in enumerate(a)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(m[r][col]))
+        m[col], m[pivot] = m[pivot], m[col]
+        if abs(m[col][col]) < 1e-12:
+            return None
+        for r in range(n):
+            if r != col:
+                factor = m[r][col] / m[col][col]
+                for c in range(col, n + 1):
+                    m[r][c] -= factor * m[col][c]
+    return [m[i][n] / m[i][i] for i in range(n)]
+
+
+class LogLinearModel:
+    """Least-squares fit of log2(target) against log-scaled size features."""
+
+    def __init__(self, samples):
+        # samples: list of (feature vector, target value)
+        self.samples = len(samples)
+        n = len(samples[0][0])
+        xtx = [[RIDGE if i == j and i else 0.0 for j in range(n)] for i in range(n)]
+        xty = [0.0] * n
+        for x, y in samples:
+            ly = math.log2(y)
+            for i in range(n):
+                xty[i] += x[i] * ly
+                for j in range(n):
+                    xtx[i][j] += x[i] * x[j]
+        self.coefficients = _solve(xtx, xty)
+        residuals = [math.log2(y) - self._log_predict(x) for x, y in samples] if self.coefficients else []
+        # Spread of the residuals, as a multiplicative error factor
+        self.error_factor = 2 ** math.sqrt(sum(r * r for r in residuals) / len(residuals)) if residuals else None
+
+    def _log_predict(self, x):
+        return sum(c * v for c, v in zip(self.coefficients, x))
+
+    def predict(self, x):
+        if not self.coefficients:
+            return None
+        return 2 ** self._log_predict(x)
+
+
+class RunPredictor:
+    def __init__(self, history=None):
+        self.history = history or get_history()
+        self._fingerprint = None
+        self._models = {}
+
+    def _refresh(self):
+        fingerprint = self.history.run_stats()
+        if fingerprint == self._fingerprint:
+            return
+        self._fingerprint = fingerprint
+        self._models = {}
+        runs = self.history.successful_runs()
+        for target in ("duration", "peak_memory"):
+            by_tech = {}
+            pooled = []
+            for run in runs:
+                value = run[target]
+                if not value or value <= 0:
+                    continue
+                sample = (_vector(run), value)
+                by_tech.setdefault(run["tech_name"], []).append(sample)
+                pooled.append(sample)
+            if len(pooled) >= MIN_SAMPLES:
+                self._models[(target, None)] = LogLinearModel(pooled)
+            for tech, samples in by_tech.items():
+                if len(samples) >= MIN_TECH_SAMPLES:
+                    self._models[(target, tech)] = LogLinearModel(samples)
+
+    def _model(self, target, tech_name):
+        return self._models.get((target, tech_name)) or self._models.get((target, None))
+
+    def estimate(self, config):
+        """
+        Predicts runtime and peak memory for a merged config.
+        Returns a dict with 'duration' (seconds), 'peak_memory' (bytes), their
+        error factors and the sample counts; values are None when there is not
+        enough history.
+        """
+        self._refresh()
+        features = run_features(config)
+        x = _vector(features)
+        result = {}
+        for target in ("duration", "peak_memory"):
+            model = self._model(target, features["tech_name"])
+            result[target] = model.predict(x) if model else None
+            result[f"{target}_error"] = model.error_factor if model else None
+            result[f"{target}_samples"] = model.samples if model else 0
+        return result
+
+
+@lru_cache(maxsize=None)
+def get_predictor():
+    """Returns the shared predictor; its models are refitted lazily when new runs finish."""
+    return RunPredictor()
+
+
+def format_estimate(estimate):
+    if estimate["duration"] is None:
+        return "Estimate: not enough run history yet."
+    text = f"Estimated runtime: ~{format_seconds(estimate['duration'])}"
+    if estimate["peak_memory"] is not None:
+        text += f", peak memory ~{estimate['peak_memory'] / 1024 ** 3:.1f} GB"
+    text += f" (from {estimate['duration_samples']} past runs"
+    if estimate["duration_error"] and estimate["duration_error"] > 1.05:
+        text += f", ±{estimate['duration_error']:.1f}x"
+    return text + ")"
+
+
+def format_seconds(seconds):
+    seconds = int(seconds)
+    if seconds < 120:
+        return f"{seconds} s"
+    if seconds < 2 * 3600:
+        return f"{seconds // 60} min"
+    return f"{seconds / 3600:.1f} h"
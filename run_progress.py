@@ -0,0 +1,114 @@
+# run_progress.py
+import re
+import time
+
+# OpenRAM reports each finished step as "** <Stage>: <seconds> seconds"
+STAGE_PATTERN = re.compile(r"^\*\*\s*(?P<stage>[A-Za-z][A-Za-z ]*?):\s*(?P<seconds>\d+(?:\.\d+)?)\s*seconds")
+
+# OpenRAM step name -> the stage shown to the user
+STAGE_GROUPS = {
+    "Submodules": "netlist",
+    "Spice writing": "netlist",
+    "Placement": "layout",
+    "SRAM creation": "layout",
+    "GDS": "layout",
+    "LEF": "layout",
+    "Routing": "routing",
+    "Verification": "drc/lvs",
+    "DRC": "drc/lvs",
+    "LVS": "drc/lvs",
+    "Extraction": "drc/lvs",
+    "Characterization": "characterisation",
+    "Datasheet": "characterisation",
+    "Verilog": "output",
+    "Config": "output",
+    "Extended Config": "output",
+}
+
+# Rough share of a run each step takes, used until the history has real profiles
+DEFAULT_STAGE_WEIGHTS = {
+    "Submodules": 2, "Placement": 5, "Routing": 20, "SRAM creation": 5, "Verification": 1,
+    "Spice writing": 1, "DRC": 10, "LVS": 10, "Extraction": 10, "Characterization": 30,
+    "LEF": 1, "Verilog": 1, "GDS": 2, "Config": 1, "Datasheet": 1,
+}
+
+
+def expected_steps(config):
+    """The OpenRAM steps a merged config is expected to print, in order."""
+    steps = ["Submodules"]
+    if not config.get("netlist_only"):
+        steps += ["Placement", "Routing", "SRAM creation", "Verification"]
+    steps.append("Spice writing")
+    if config.get("check_lvsdrc") and not config.get("netlist_only"):
+        steps += ["DRC", "LVS"]
+    if config.get("use_pex"):
+        steps.append("Extraction")
+    steps.append("Characterization")
+    if not config.get("netlist_only"):
+        steps += ["LEF", "GDS"]
+    steps += ["Verilog", "Config"]
+    if config.get("output_datasheet_info"):
+        steps.append("Datasheet")
+    return steps
+
+
+class LogProgressParser:
+    """
+    Incrementally parses OpenRAM output as it arrives, in arbitrary chunks,
+    and keeps the steps seen so far with their reported durations.
+    """
+
+    def __init__(self, config, stage_weights=None):
+        self.expected = expected_steps(config)
+        self.weights = {**DEFAULT_STAGE_WEIGHTS, **(stage_weights or {})}
+        self.steps = []
+        self.start_time = time.time()
+        self.finished = False
+        self._partial = ""
+
+    def feed(self, text):
+        """Consumes a chunk of output. Returns the (step, seconds) pairs completed in it."""
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        found = []
+        for line in lines:
+            match = STAGE_PATTERN.match(line.strip())
+            if not match:
+                continue
+            step, seconds = match.group("stage"), float(match.group("seconds"))
+            if step == "End":
+                self.finished = True
+                continue
+            self.steps.append((step, seconds))
+            found.append((step, seconds))
+        return found
+
+    def current_stage(self):
+        done = {step for step, _ in self.steps}
+        for step in self.expected:
+            if step not in done:
+                return STAGE_GROUPS.get(step, step)
+        return "finishing"
+
+    def progress(self):
+        """Fraction of the expected work done, weighted by how long each step usually takes."""
+        if self.finished:
+            return 1.0
+        total = sum(self.weights.get(step, 1) for step in self.expected)
+        done = {step for step, _ in self.steps}
+        completed = sum(self.weights.get(step, 1) for step in self.expected if step in done)
+        return min(completed / total, 0.99) if total else 0.0
+
+    def eta(self, predicted_duration=None):
+        """Seconds left, from the predicted runtime when known, else extrapolated from progress."""
+        elapsed = time.time() - self.start_time
+        if predicted_duration and predicted_duration > elapsed:
+            return predicted_duration - elapsed
+        fraction = self.progress()
+        if fraction <= 0:
+            return None
+        return elapsed * (1 - fraction) / fraction
+
+    def stage_profile(self):
+        """Seconds spent per step, for storing with the run."""
+        return list(self.steps)
@@ -0,0 +1,858 @@
+# run_service.py
+"""
+Run, validate, list, download and render logic shared by the Qt controller
+and the headless command line (openram_ui.py). Nothing in here may import Qt.
+"""
+import glob
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import tempfile
+import time
+
+from config_loader import _load_config_file, config_to_text
+from config_schema import validate_config, format_errors, get_schema
+from constants import ADVANCED_CONFIG_FILE, USERS_CONFIG_DIR, OUTPUT_PATH, OPENRAM_PATH, QUICK_LOOK_DIR
+from host_pool import place_run, output_endpoint, pool_endpoints
+from host_resources import get_host_resources, thread_settings, free_cores
+from remote import openram_target, run_ssh, remote_batch, scp_to, ssh_args, RemoteError
+from run_history import get_history, location_for, hash_config_text, local_folder_size
+from run_jobs import (local_run_script, remote_run_command, corner_cross_product, corner_label,
+                      split_corner_configs, merge_corner_libs, remote_merge_command, write_job_configs, JOB_CONFIG_DIR,
+                      remote_job_dir, detached_launch_command, tail_command, background_command, background_argv)
+from run_predictor import run_features, get_predictor
+from run_progress import LogProgressParser
+from scheduler import select_jobs
+from sftp_transfer import download_file, download_files, format_size, TransferCancelled
+from archiver import create_archive, archive_format_for
+from artifact_cache import cached_download
+from batch_queue import submit_array, poll_array, SUBMIT_COMMAND, STATUS_COMMAND
+from config_index import search_index
+from config_mirror import sync_mirror, mirror_config_names, mirror_config_path, mirror_dir, is_pending
+from resource_sampler import RunSampler, SAMPLE_INTERVAL
+from liberty_results import (LIB_SCRIPT, RESULT_FIELDS, lib_script_input, parse_output_libs, read_lib_script_output,
+                             library_results, rank_results)
+from env_snapshot import get_snapshot, snapshot_environment, local_run_command, snapshot_run_command
+
+
+class RunError(Exception):
+    """A run could not be prepared, started or finished."""
+
+
+class InvalidConfigError(RunError):
+    def __init__(self, errors):
+        super().__init__(format_errors(errors))
+        self.errors = errors
+
+
+def _ignore(message):
+    pass
+
+
+def _cache_limit(advanced_config=None):
+    if advanced_config is None:
+        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
+    return advanced_config.get("artifact_cache_mb")
+
+
+# --- configs ---
+
+def list_configs(advanced_config=None, sync=True):
+    """
+    Names of the saved configs. When OpenRAM is remote they come from the
+    local mirror of the server's users_configs, synced first unless `sync`
+    is False.
+    """
+    user, host, openram_path = openram_target(advanced_config)
+    if user:
+        if sync:
+            return sync_mirror(user, host, openram_path)["names"]
+        return mirror_config_names(user, host, openram_path)
+    files = os.listdir(USERS_CONFIG_DIR)
+    return sorted(os.path.splitext(f)[0] for f in files if f.endswith(".py"))
+
+
+def search_configs(query, advanced_config=None):
+    """
+    Names of the saved configs matching a parameter query such as
+    `tech_name=sky130 word_size>=32` (see config_index.py). Remote configs
+    are searched in the local mirror, as last synced. Raises ValueError.
+    """
+    user, host, openram_path = openram_target(advanced_config)
+    if user:
+        return search_index(mirror_dir(user, host, openram_path), location_for(user, host, openram_path), query)
+    return search_index(USERS_CONFIG_DIR, location_for(None, None, None), query)
+
+
+def sync_configs(advanced_config=None, force=(), log=_ignore):
+    """Syncs the mirror of the server's users_configs, see config_mirror.sync_mirror. Nothing to do when local."""
+    user, host, openram_path = openram_target(advanced_config)
+    if not user:
+        return {"names": list_configs(advanced_config), "conflicts": []}
+    return sync_mirror(user, host, openram_path, force, log)
+
+
+def fetch_config(config_name, advanced_config=None, sync=True):
+    """
+    Returns (local path, history config id) of a saved config, read from
+    the mirror of the server's users_configs when OpenRAM is remote.
+    """
+    user, host, openram_path = openram_target(advanced_config)
+    if user:
+        config_path = mirror_config_path(user, host, openram_path, config_name)
+        if sync or not os.path.exists(config_path):
+            sync_mirror(user, host, openram_path)
+        if not os.path.exists(config_path):
+            raise RunError(f"Config '{config_name}' not found in {USERS_CONFIG_DIR} on {host}")
+    else:
+        config_path = os.path.join(USERS_CONFIG_DIR, f"{config_name}.py")
+        if not os.path.exists(config_path):
+            raise RunError(f"Config '{config_name}' not found in {USERS_CONFIG_DIR}")
+
+    with open(config_path, "r") as f:
+        content = f.read()
+    config_id = get_history().record_config_opened(config_name, location_for(user, host, openram_path), content)
+    return config_path, config_id
+
+
+def check_config(config):
+    """Raises InvalidConfigError if the config fails schema validation."""
+    errors, _ = validate_config(config)
+    if errors:
+        raise InvalidConfigError(errors)
+
+
+# --- runs ---
+
+class RunPlan:
+    """Everything needed to drive (and later finish or reattach to) one OpenRAM run."""
+
+    def __init__(self):
+        self.run_id = None
+        self.config_name = None
+        self.jobs = []
+        self.corners = []
+        # output_path as given in the config, relative to where OpenRAM runs
+        self.output_path = "."
+        # (user, host, openram_path) when the run is on a remote server
+        self.remote = None
+        self.remote_output_path = None
+        self.max_parallel_jobs = 1
+        self.memory_budget = None
+        self.stage_weights = {}
+        self.job_config_dir = None
+        self.exit_code = 0
+        # Target and commands of the batch queue when jobs are submitted rather than started
+        self.batch = None
+        # Resource time series of the running jobs, see resource_sampler.py
+        self.sampler = None
+        # openram_path of the install the run was placed on
+        self.endpoint = None
+        # 'quick' for a quick look, see QUICK_LOOK_OPTIONS; background runs yield CPU and I/O to others
+        self.profile = "full"
+        self.background = False
+        # Outputs older than this are not the run's own, see _run_libraries()
+        self.start_time = time.time()
+
+
+def _new_job(plan, corner, job_config):
+    merged_job_config = {**get_schema().defaults, **job_config}
+    estimate = get_predictor().estimate(merged_job_config)
+    return {
+        "label": corner_label(corner) if corner else "",
+        "position": len(plan.jobs),
+        "state": "pending",
+        "process": None,
+        "parser": LogProgressParser(merged_job_config, plan.stage_weights),
+        "duration": estimate["duration"],
+        "peak_memory": estimate["peak_memory"],
+    }
+
+
+def _write_run_script(openram_path, config_path, warm=False, background=False):
+    """Creates a temporary shell script that runs OpenRAM on a config in the OpenRAM environment."""
+    with tempfile.NamedTemporaryFile(mode='w', delete=False, suffix='.sh', encoding='utf-8') as f:
+        f.write(local_run_script(openram_path, config_path, warm, background))
+        script_path = f.name
+    os.chmod(script_path, 0o755)
+    return script_path
+
+
+def _apply_thread_settings(plan, user, host, current_config, job_configs, log):
+    """
+    Probes the execution host (cached) and gives each job its share of the
+    free cores, unless the config sets num_threads / num_sim_threads itself.
+    The host's available memory becomes the scheduler's memory budget.
+    """
+    resources = get_host_resources(user, host)
+    if resources is None:
+        log("Could not probe the host's resources; using the thread settings from the config.")
+        return
+
+    concurrent_jobs = min(len(job_configs), plan.max_parallel_jobs)
+    threads = thread_settings(resources, concurrent_jobs)
+    plan.memory_budget = resources["memory_available"]
+    memory = f", {resources['memory_available'] / 1024 ** 3:.1f} GB free" if resources["memory_available"] else ""
+    log(f"Host has {resources['cores']} cores ({free_cores(resources)} idle){memory}; "
+        f"using num_threads={threads['num_threads']}, num_sim_threads={threads['num_sim_threads']} per job.")
+    for _, job_config in job_configs:
+        for key, value in threads.items():
+            if key not in current_config:
+                job_config[key] = value
+
+
+def _upload_job_configs(user, host, remote_users_config_dir, config_name, job_configs):
+    """Copies the per-job configs to the server in one scp. Returns their remote paths."""
+    remote_dir = os.path.join(remote_users_config_dir, JOB_CONFIG_DIR, config_name)
+    local_dir = tempfile.mkdtemp(prefix="openram_jobs_")
+    try:
+        local_paths = write_job_configs(local_dir, config_name, job_configs)
+        run_ssh(user, host, f"mkdir -p {remote_dir}")
+        scp_to(user, host, local_paths, f"{remote_dir}/")
+        return [os.path.join(remote_dir, os.path.basename(path)) for path in local_paths]
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
+
+
+def _plan_batch_jobs(plan, user, host, openram_path, job_configs, advanced_config):
+    """Jobs that will be submitted to the batch queue as one array; their configs are written at submission."""
+    plan.batch = {
+        "user": user, "host": host, "openram_path": openram_path,
+        "options": list(advanced_config.get("batch_options") or []),
+        "submit_command": advanced_config.get("batch_submit_command") or SUBMIT_COMMAND,
+        "status_command": advanced_config.get("batch_status_command") or STATUS_COMMAND,
+    }
+    if user:
+        plan.remote = (user, host, openram_path)
+        plan.remote_output_path = os.path.join(openram_path, plan.output_path)
+    for corner, job_config in job_configs:
+        if not user:
+            # Tasks run from the OpenRAM folder, so local outputs need an absolute path
+            job_config[OUTPUT_PATH] = os.path.abspath(job_config.get(OUTPUT_PATH, "."))
+        job = _new_job(plan, corner, job_config)
+        job["batch"] = {"config": (corner, job_config)}
+        plan.jobs.append(job)
+
+
+def plan_run(config_path, config_name, config_id=None, overrides=None, log=_ignore, advanced_config=None,
+             materialize=False, profile="full", background=False, endpoint_path=None, linked_run_id=None):
+    """
+    Validates a config and prepares its run: splits corners, tunes threads,
+    writes (and uploads) job configs, records the run in the history and
+    journals remote jobs. Nothing is started yet; see next_jobs().
+    `overrides` are extra config options layered over the saved config,
+    e.g. for sweeps. `materialize` forces the job configs to be written out,
+    for configs that are not saved in users_configs.
+
+    A 'quick' `profile` runs the config's quick look (see
+    QUICK_LOOK_OPTIONS). `background` lowers the jobs' priority,
+    `endpoint_path` places the run on that install instead of the least
+    loaded one and `linked_run_id` links it to an earlier run, which is how
+    the full run queued by a quick look follows it.
+    """
+    saved_config = _load_config_file(config_path)
+    if profile == "quick":
+        overrides = quick_look_overrides({**saved_config, **(overrides or {})}, overrides)
+    current_config = {**saved_config, **(overrides or {})}
+    check_config(current_config)
+
+    if advanced_config is None:
+        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
+    if not advanced_config.get(OPENRAM_PATH):
+        raise RunError("OpenRAM path not set in advanced settings.")
+    merged_config = {**get_schema().defaults, **current_config}
+
+    if endpoint_path:
+        endpoint = next((e for e in pool_endpoints(advanced_config) if e["openram_path"] == endpoint_path), None)
+    else:
+        endpoint = place_run(merged_config.get("tech_name"), advanced_config, log)
+    if endpoint_path and endpoint is None:
+        raise RunError(f"{endpoint_path} is no longer in the host pool.")
+    if endpoint is None:
+        raise RunError(f"No reachable OpenRAM install in the host pool has the '{merged_config.get('tech_name')}' technology.")
+    try:
+        user, host, openram_path = openram_target({**advanced_config, OPENRAM_PATH: endpoint["openram_path"]})
+    except ValueError as e:
+        raise RunError(str(e))
+
+    history = get_history()
+    plan = RunPlan()
+    plan.config_name = config_name
+    plan.output_path = current_config.get(OUTPUT_PATH, ".")
+    plan.stage_weights = history.stage_weights()
+    plan.max_parallel_jobs = endpoint["capacity"]
+    plan.endpoint = endpoint["openram_path"]
+    plan.profile = profile
+    plan.background = background
+    if profile == "quick":
+        log(f"Quick look: netlist only, analytical delays, nominal corner; outputs in {plan.output_path}.")
+
+    # A quick look runs the nominal corner only, so there is nothing to split
+    if advanced_config.get("split_corners") and profile != "quick":
+        plan.corners = corner_cross_product(merged_config)
+        if len(plan.corners) < 2:
+            log("Corner splitting is enabled, but the config does not list several corners. Running as a single job.")
+            plan.corners = []
+    if plan.corners:
+        log(f"Splitting the run into {len(plan.corners)} parallel corner jobs.")
+        job_configs = split_corner_configs(current_config, config_name, plan.output_path, plan.corners)
+    else:
+        job_configs = [(None, dict(current_config))]
+
+    if user:
+        log("Remote OpenRAM path detected.")
+    # A batch queue's login host says nothing about the nodes the tasks will get
+    if advanced_config.get("auto_threads", True) and advanced_config.get("run_backend") != "batch":
+        _apply_thread_settings(plan, user, host, current_config, job_configs, log)
+
+    # Configs only need to be written out when the jobs run something other than the saved file
+    materialize = materialize or any(job_config != saved_config for _, job_config in job_configs) or \
+        endpoint["openram_path"] != advanced_config[OPENRAM_PATH] or \
+        (user and is_pending(user, host, openram_path, config_name))
+    features = {**run_features(merged_config), "endpoint": endpoint["openram_path"], "profile": profile,
+                "linked_run_id": linked_run_id}
+
+    with open(config_path, "r") as f:
+        config_text = f.read() + config_to_text(overrides or {})
+
+    interval = advanced_config.get("sample_interval", SAMPLE_INTERVAL)
+    if interval and advanced_config.get("run_backend") != "batch":
+        plan.sampler = RunSampler(interval)
+
+    if advanced_config.get("run_backend") == "batch":
+        _plan_batch_jobs(plan, user, host, openram_path, job_configs, advanced_config)
+        if background:
+            plan.batch["options"].append("--nice=100")
+        plan.run_id = history.start_run(config_id, hash_config_text(config_text), host or "localhost",
+                                        plan.remote_output_path or plan.output_path, features)
+        return plan
+
+    # Jobs go through a long-lived worker that keeps the OpenRAM environment loaded
+    warm = bool(advanced_config.get("warm_worker"))
+    # Otherwise they start the environment's python directly with a captured copy of its variables
+    snapshot = None
+    if not warm and advanced_config.get("env_snapshot", True):
+        snapshot = get_snapshot(user, host, openram_path, log)
+    if user:
+        plan.remote = (user, host, openram_path)
+        remote_users_config_dir = os.path.join(openram_path, USERS_CONFIG_DIR)
+        if materialize:
+            try:
+                remote_config_paths = _upload_job_configs(user, host, remote_users_config_dir, config_name, job_configs)
+            except RemoteError as e:
+                raise RunError(f"Failed to upload job configs: {e}")
+        else:
+            remote_config_paths = [os.path.join(remote_users_config_dir, f"{config_name}.py")]
+
+        plan.remote_output_path = os.path.join(openram_path, plan.output_path)
+        plan.run_id = history.start_run(config_id, hash_config_text(config_text), host, plan.remote_output_path,
+                                        features)
+
+        # Remote jobs run detached from the ssh session and are journaled,
+        # so a dropped connection or a restart of the app can reattach to them.
+        run_info = json.dumps({
+            "config_name": config_name,
+            "openram_path": openram_path,
+            "corners": plan.corners,
+            "remote_output_path": plan.remote_output_path,
+            "output_path": plan.output_path,
+            "max_parallel_jobs": plan.max_parallel_jobs,
+            "memory_budget": plan.memory_budget,
+            "sample_interval": plan.sampler.interval if plan.sampler else 0,
+            "profile": profile,
+            "background": background,
+            "start_time": plan.start_time,
+        })
+        for (corner, job_config), remote_config_path in zip(job_configs, remote_config_paths):
+            job = _new_job(plan, corner, job_config)
+            if snapshot:
+                run_command = snapshot_run_command(openram_path, remote_config_path, snapshot)
+                if background:
+                    run_command = background_command(run_command)
+            else:
+                run_command = remote_run_command(openram_path, remote_config_path, warm, background)
+            job["remote"] = {"user": user, "host": host, "run_command": run_command}
+            job["journal_id"] = history.add_remote_job(
+                plan.run_id, job["position"], user, host, job["label"], job["remote"]["run_command"],
+                json.dumps(job_config), run_info)
+            plan.jobs.append(job)
+
+    else:  # Local execution
+        if materialize:
+            plan.job_config_dir = tempfile.mkdtemp(prefix="openram_jobs_")
+            config_paths = write_job_configs(plan.job_config_dir, config_name, job_configs)
+        else:
+            config_paths = [config_path]
+
+        for (corner, job_config), job_config_path in zip(job_configs, config_paths):
+            job = _new_job(plan, corner, job_config)
+            if snapshot:
+                job["command"] = local_run_command(openram_path, job_config_path, snapshot)
+                if background:
+                    job["command"] = background_argv(job["command"])
+                job["env"] = snapshot_environment(snapshot)
+            else:
+                job["script"] = _write_run_script(openram_path, job_config_path, warm, background)
+            plan.jobs.append(job)
+
+        plan.run_id = history.start_run(config_id, hash_config_text(config_text), "localhost", plan.output_path,
+                                        features)
+
+    return plan
+
+
+# Options a quick look forces over the config, for results in seconds rather than
+# after layout, DRC/LVS and full characterisation (see config/default.py)
+QUICK_LOOK_OPTIONS = {
+    "netlist_only": True,
+    "analytical_delay": True,
+    "check_lvsdrc": False,
+    "inline_lvsdrc": False,
+    "route_supplies": False,
+    "use_pex": False,
+    "nominal_corner_only": True,
+    "use_specified_corners": None,
+}
+
+
+def quick_look_overrides(config, overrides=None):
+    """`overrides` plus the quick-look options and an output_path in the QUICK_LOOK_DIR subfolder of the config's."""
+    output_path = os.path.join(config.get(OUTPUT_PATH, "."), QUICK_LOOK_DIR)
+    return {**(overrides or {}), **QUICK_LOOK_OPTIONS, OUTPUT_PATH: output_path}
+
+
+def resume_run():
+    """Rebuilds the plan of the journaled remote run that was in flight when the app last closed, or None."""
+    history = get_history()
+    rows = history.active_remote_jobs()
+    if not rows:
+        return None
+
+    run_info = json.loads(rows[0]["run_info"])
+    plan = RunPlan()
+    plan.run_id = rows[0]["run_id"]
+    plan.config_name = run_info.get("config_name")
+    plan.corners = [tuple(corner) for corner in run_info["corners"]]
+    plan.remote = (rows[0]["user"], rows[0]["host"], run_info.get("openram_path"))
+    plan.remote_output_path = run_info["remote_output_path"]
+    plan.output_path = run_info["output_path"]
+    plan.max_parallel_jobs = run_info["max_parallel_jobs"]
+    if run_info.get("sample_interval"):
+        # Sampling picks up again from the reattachment; the earlier part of the series is lost
+        plan.sampler = RunSampler(run_info["sample_interval"])
+    plan.memory_budget = run_info["memory_budget"]
+    plan.profile = run_info.get("profile", "full")
+    plan.start_time = run_info.get("start_time", 0)
+    plan.background = run_info.get("background", False)
+    plan.stage_weights = history.stage_weights()
+    plan.exit_code = next((row["exit_code"] for row in rows if row["state"] == "done" and row["exit_code"]), 0)
+
+    for row in rows:
+        job = _new_job(plan, None, json.loads(row["job_config"]))
+        job["label"] = row["label"]
+        job["position"] = row["position"]
+        job["journal_id"] = row["id"]
+        job["remote"] = {"user": row["user"], "host": row["host"], "run_command": row["run_command"]}
+        job["parser"].steps = [tuple(step) for step in json.loads(row["steps"] or "[]")]
+        if row["state"] in ("running", "done"):
+            job["state"] = row["state"]
+            job["job_dir"] = row["job_dir"]
+            job["offset"] = row["log_offset"]
+        plan.jobs.append(job)
+    return plan
+
+
+def next_jobs(plan):
+    """The pending jobs that may start now, given the parallelism and memory limits."""
+    pending = [job for job in plan.jobs if job["state"] == "pending"]
+    if plan.batch:
+        # The batch queue does its own placement
+        return pending
+    running = [job for job in plan.jobs if job["state"] == "running"]
+    memory_in_use = sum(job["peak_memory"] or 0 for job in running)
+    free_slots = plan.max_parallel_jobs - len(running)
+    return select_jobs(pending, memory_in_use, plan.memory_budget, free_slots)
+
+
+def launch_detached(plan, job):
+    """Starts a remote job in its own session on the server. Returns its pid; raises RunError."""
+    remote = job["remote"]
+    job_dir = remote_job_dir(plan.remote_output_path, plan.run_id, job["position"])
+    try:
+        process = run_ssh(remote["user"], remote["host"], detached_launch_command(remote["run_command"], job_dir), timeout=30)
+    except RemoteError as e:
+        raise RunError(f"Failed to start remote job {job['label']}: {e}")
+    job["state"] = "running"
+    job["job_dir"] = job_dir
+    job["offset"] = 0
+    get_history().mark_remote_job_started(job["journal_id"], job_dir)
+    return process.stdout.strip()
+
+
+def submit_batch(plans, log=_ignore):
+    """
+    Submits the pending jobs of one or more batch plans (with the same batch
+    target) as a single job array. Returns the array id; raises RunError.
+    """
+    jobs = [job for plan in plans for job in plan.jobs if job["state"] == "pending"]
+    if not jobs:
+        return None
+    batch = plans[0].batch
+    try:
+        array_id, task_dir = submit_array(batch["user"], batch["host"], batch["openram_path"],
+                                          plans[0].config_name or "openram", jobs,
+                                          [job["batch"]["config"] for job in jobs], batch["options"],
+                                          batch["submit_command"])
+    except (RemoteError, OSError) as e:
+        raise RunError(f"Batch submission failed: {e}")
+    for task, job in enumerate(jobs):
+        job["state"] = "running"
+        job["batch"].update({"array_id": array_id, "task": task, "task_dir": task_dir, "offset": 0,
+                             "queue_state": "PENDING", "user": batch["user"], "host": batch["host"],
+                             "status_command": batch["status_command"]})
+    log(f"Submitted {len(jobs)} task(s) as job array {array_id}; task logs in {task_dir}/<task>/run.log")
+    return array_id
+
+
+def poll_batch(plans):
+    """
+    Queries each submitted array once. Returns (job, new output, exit code or
+    None while running) for every running batch job. Raises RemoteError.
+    """
+    arrays = {}
+    for plan in plans:
+        for job in plan.jobs:
+            if job["state"] == "running" and "array_id" in job.get("batch", {}):
+                arrays.setdefault(job["batch"]["array_id"], []).append(job)
+    updates = []
+    for array_id, jobs in arrays.items():
+        batch = jobs[0]["batch"]
+        tasks = poll_array(batch["user"], batch["host"], batch["task_dir"], array_id,
+                           {job["batch"]["task"]: job["batch"]["offset"] for job in jobs}, batch["status_command"])
+        for job in jobs:
+            status = tasks.get(str(job["batch"]["task"]))
+            if not status:
+                continue
+            if status["state"] == "RUNNING" and job["batch"]["queue_state"] != "RUNNING":
+                job["parser"].start_time = time.time()
+            job["batch"]["queue_state"] = status["state"]
+            job["batch"]["offset"] += status["size"]
+            updates.append((job, status["log"].encode(), status["exit_code"]))
+    return updates
+
+
+def tail_ssh_args(job):
+    """ssh arguments that stream a detached job's log from the last byte received."""
+    remote = job["remote"]
+    options = ("-o", "ServerAliveInterval=15", "-o", "ServerAliveCountMax=3")
+    return ssh_args(remote["user"], remote["host"], tail_command(job["job_dir"], job["offset"]), options)
+
+
+def record_job_output(job, data):
+    """
+    Feeds a chunk of raw job output to the job's progress parser and, for
+    journaled remote jobs, advances the stored log offset.
+    Returns (decoded text, steps completed in this chunk).
+    """
+    text = data.decode(errors='replace')
+    new_steps = job["parser"].feed(text)
+    if "journal_id" in job and data:
+        job["offset"] += len(data)
+        steps = json.dumps(job["parser"].stage_profile()) if new_steps else None
+        get_history().update_remote_job_progress(job["journal_id"], job["offset"], steps)
+    return text, new_steps
+
+
+def record_job_finished(plan, job, exit_code, crashed=False):
+    job["state"] = "done"
+    history = get_history()
+    if plan.run_id and job["parser"].steps:
+        history.record_run_stages(plan.run_id, job["label"], job["parser"].stage_profile())
+    if "journal_id" in job:
+        history.finish_remote_job(job["journal_id"], exit_code)
+    if exit_code != 0 or crashed:
+        plan.exit_code = exit_code or 1
+
+
+def is_complete(plan):
+    return all(job["state"] == "done" for job in plan.jobs)
+
+
+def run_progress(plan):
+    """(fraction done, status text, seconds left or None) over all jobs of a run."""
+    started = [job for job in plan.jobs if job["state"] != "pending"]
+    fraction = sum(job["parser"].progress() if job["state"] != "done" else 1.0 for job in started) / len(plan.jobs)
+    running = [job for job in plan.jobs if job["state"] == "running"]
+    etas = [job["parser"].eta(job["duration"]) for job in running]
+    etas = [eta for eta in etas if eta is not None]
+    if len(plan.jobs) == 1:
+        status = f"Stage: {plan.jobs[0]['parser'].current_stage()}"
+    else:
+        done = sum(1 for job in plan.jobs if job["state"] == "done")
+        status = f"{done}/{len(plan.jobs)} jobs done, {len(running)} running"
+    return fraction, status, max(etas) if etas else None
+
+
+def output_size(plan):
+    """Size in bytes of a local run's output folder, or None if unknown."""
+    if not os.path.isdir(plan.output_path):
+        return None
+    return local_folder_size(plan.output_path)
+
+
+# Seconds the server's clock may be behind ours when telling a run's .lib files from older ones
+CLOCK_SKEW = 300
+
+
+def _finish_remote_outputs(plan):
+    """
+    Gathers the per-corner .lib files (if any), measures the output folder
+    and, after a successful run, parses its .lib files on the server, in one
+    round trip. Returns (library names, size or None, parsed libraries).
+    """
+    user, host, openram_path = plan.remote
+    ops = [{"op": "exec", "command": f"du -sb {plan.remote_output_path}", "timeout": 30}]
+    if plan.corners:
+        ops.insert(0, {"op": "exec", "command": remote_merge_command(plan.remote_output_path, plan.corners),
+                       "cwd": openram_path or None})
+    if plan.exit_code == 0:
+        ops.append({"op": "exec", "command": f"python3 -c {shlex.quote(LIB_SCRIPT)}", "timeout": 60,
+                    "input": lib_script_input(plan.remote_output_path, plan.start_time - CLOCK_SKEW)})
+    try:
+        results = remote_batch(user, host, ops, timeout=90)
+    except RemoteError:
+        return [], None, []
+    merged = [os.path.basename(f) for f in results[0]["stdout"].split()] if plan.corners else []
+    libs = read_lib_script_output(results.pop()["stdout"]) if plan.exit_code == 0 else []
+    try:
+        return merged, int(results[-1]["stdout"].split()[0]), libs
+    except (ValueError, IndexError):
+        return merged, None, libs
+
+
+def finish_run(plan, log=_ignore):
+    """Merges corner results, records the outcome in the history and removes temporary files."""
+    history = get_history()
+    if plan.corners:
+        log("Gathering per-corner .lib files into the output folder...")
+    if plan.remote:
+        merged, size, libs = _finish_remote_outputs(plan)
+    else:
+        merged = merge_corner_libs(plan.output_path, plan.corners) if plan.corners else []
+        size = output_size(plan)
+        libs = parse_output_libs(plan.output_path, plan.start_time) if plan.exit_code == 0 else []
+    if plan.corners:
+        log(f"Merged libraries: {', '.join(merged) if merged else 'none found'}")
+    if libs and plan.run_id:
+        results = library_results(libs)
+        history.save_lib_results(plan.run_id, results)
+        for result in results:
+            log(f"{result['corner']}: " + ", ".join(f"{field.replace('_', ' ')} {result[field]:g}" for field in
+                                                    ("area", "delay", "min_period", "leakage_power")
+                                                    if result[field] is not None))
+    if any("journal_id" in job for job in plan.jobs):
+        history.clear_remote_jobs(plan.run_id)
+    peak_memory = None
+    if plan.sampler and plan.sampler.series["t"]:
+        peak_memory = plan.sampler.peak_memory()
+        log(f"Peak memory: {format_size(peak_memory)}")
+        if plan.run_id:
+            history.save_run_resources(plan.run_id, plan.sampler.interval, plan.sampler.series)
+    if plan.run_id:
+        history.finish_run(plan.run_id, plan.exit_code, size, peak_memory)
+    cleanup_run_files(plan)
+
+
+def sample_resources(plan, local_pids=()):
+    """Adds a sample of the running jobs' resource use to the plan's series. Returns it, or None."""
+    if not plan.sampler:
+        return None
+    return plan.sampler.sample(plan, local_pids)
+
+
+def compare_results(config_name=None, corner=None, keys=("area", "delay")):
+    """
+    Stored .lib results, optionally of one config and corner, ranked best
+    first by Pareto front over two RESULT_FIELDS (see liberty_results.rank_results).
+    """
+    if len(keys) != 2:
+        raise ValueError("Rank on exactly two results, e.g. area,delay")
+    for key in keys:
+        if key not in RESULT_FIELDS:
+            raise ValueError(f"Unknown result '{key}'; choose from {', '.join(RESULT_FIELDS)}")
+    rows = [row for row in get_history().lib_results()
+            if (config_name is None or row["config_name"] == config_name) and (corner is None or row["corner"] == corner)]
+    return rank_results(rows, keys)
+
+
+def cleanup_run_files(plan):
+    for job in plan.jobs:
+        script_path = job.get("script")
+        if script_path and os.path.exists(script_path):
+            os.unlink(script_path)
+    if plan.job_config_dir:
+        shutil.rmtree(plan.job_config_dir, ignore_errors=True)
+        plan.job_config_dir = None
+
+
+# --- outputs ---
+
+def output_location(config, advanced_config=None):
+    """
+    (user, host, output folder) of a config's outputs on the install that
+    last ran it; user and host are None when local.
+    """
+    if advanced_config is None:
+        advanced_config = _load_config_file(ADVANCED_CONFIG_FILE)
+    output_path = config.get(OUTPUT_PATH, ".")
+    user, host, openram_path = openram_target(
+        {**advanced_config, OPENRAM_PATH: output_endpoint(output_path, advanced_config)})
+    if user:
+        return user, host, os.path.join(openram_path, output_path)
+    return None, None, output_path
+
+
+# File extension -> artifact type shown in the output view
+ARTIFACT_TYPES = {
+    ".lib": "Liberty", ".lef": "LEF", ".v": "Verilog", ".gds": "GDS", ".sp": "SPICE", ".spice": "SPICE",
+    ".html": "Datasheet", ".log": "Log", ".py": "Config",
+}
+
+# One remote call: relative path, size and mtime of every file in the output folder
+MANIFEST_COMMAND = "cd {path} && find . -type f -printf '%P\\t%s\\t%T@\\n'"
+
+
+def artifact_type(name):
+    for extension, label in ARTIFACT_TYPES.items():
+        if name.endswith(extension):
+            return label
+    return "Other"
+
+
+def output_manifest(config, advanced_config=None):
+    """
+    Every file of a config's output folder as {'name', 'size', 'mtime', 'type',
+    'profile'} dicts, name being the path relative to the folder and profile
+    'quick' for the files of the quick look.
+    """
+    user, host, output_path = output_location(config, advanced_config)
+    manifest = []
+    if user:
+        process = run_ssh(user, host, MANIFEST_COMMAND.format(path=output_path))
+        for line in process.stdout.splitlines():
+            parts = line.split("\t")
+            if len(parts) == 3:
+                manifest.append({"name": parts[0], "size": int(parts[1]), "mtime": float(parts[2])})
+    else:
+        for dirpath, _, filenames in os.walk(output_path):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                stat = os.stat(path)
+                manifest.append({"name": os.path.relpath(path, output_path), "size": stat.st_size, "mtime": stat.st_mtime})
+    for entry in manifest:
+        entry["type"] = artifact_type(entry["name"])
+        entry["profile"] = "quick" if entry["name"].startswith(QUICK_LOOK_DIR + "/") else "full"
+    return sorted(manifest, key=lambda entry: entry["name"])
+
+
+def fetch_selected_outputs(config, manifest_entries, destination_dir, advanced_config=None, log=_ignore,
+                           cancelled=None, workers=4):
+    """
+    Downloads (or, locally, copies) some files of a config's output folder
+    into destination_dir, keeping their relative paths. Returns the local paths.
+    """
+    user, host, output_path = output_location(config, advanced_config)
+    targets = [(os.path.join(output_path, entry["name"]), os.path.join(destination_dir, entry["name"]), entry["size"])
+               for entry in manifest_entries]
+    log(f"Fetching {len(targets)} files ({sum(size for _, _, size in targets) / 1024 ** 2:.1f} MB)...")
+    if user:
+        return download_files(user, host, targets, log=log, cancelled=cancelled, workers=workers)
+    for source, destination, _ in targets:
+        if cancelled and cancelled():
+            raise TransferCancelled("Copy cancelled")
+        os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+        shutil.copy2(source, destination)
+    return [destination for _, destination, _ in targets]
+
+
+def list_gds_files(config, advanced_config=None):
+    """Full paths of the GDS files in a config's output folder (remote paths when OpenRAM is remote)."""
+    user, host, output_path = output_location(config, advanced_config)
+    if user:
+        process = run_ssh(user, host, f"ls -1 {output_path}/*.gds 2>/dev/null", check=False)
+        return [f for f in process.stdout.strip().split('\n') if f]
+    return glob.glob(os.path.join(output_path, "*.gds"))
+
+
+def fetch_gds(config, gds_path, advanced_config=None, log=_ignore, cancelled=None):
+    """Local path of one of list_gds_files(), fetched through the artifact cache when remote."""
+    user, host, _ = output_location(config, advanced_config)
+    if not user:
+        return gds_path
+    return cached_download(user, host, gds_path, log=log, cancelled=cancelled, max_mb=_cache_limit(advanced_config))
+
+
+# Zipped output folders wait for their download here, in the server user's own directory
+REMOTE_ZIP_DIR = "~/.openram_ui/zips"
+
+
+def remote_zip_path(source_path):
+    """
+    Where zip_remote_output puts a folder's zip: named after the folder and a
+    hash of its path, so folders of the same name never share a zip, yet the
+    same folder always gets the same one.
+    """
+    source_path = source_path.rstrip('/')
+    key = hashlib.sha1(source_path.encode()).hexdigest()[:12]
+    return f"{REMOTE_ZIP_DIR}/{os.path.basename(source_path)}_{key}.zip"
+
+
+def zip_remote_output(user, host, source_path):
+    """
+    Zips an output folder on the server and returns the remote zip path. An
+    existing zip is reused while nothing in the folder is newer, so that an
+    interrupted download of it can resume. Raises RemoteError.
+    """
+    zip_path = remote_zip_path(source_path)
+    source_path = source_path.rstrip('/')
+    # Built under a temporary name, so a download running at the same time never sees a partial zip
+    part_path = f"{zip_path}.$$.part.zip"
+    run_ssh(user, host,
+            f"[ -f {zip_path} ] && [ -z \"$(find {source_path} -newer {zip_path} -print -quit)\" ] || "
+            f"(mkdir -p {REMOTE_ZIP_DIR} && cd {os.path.dirname(source_path)} && "
+            f"zip -qr {part_path} {os.path.basename(source_path)} && mv -f {part_path} {zip_path})")
+    return zip_path
+
+
+def download_remote_output(user, host, source_path, destination, log=_ignore, cancelled=None):
+    """
+    Zips an output folder on the server and downloads the zip to
+    `destination`, resuming an interrupted download of it. Returns the remote
+    zip path, which the caller removes once done. Raises RemoteError or
+    TransferCancelled.
+    """
+    log(f"Zipping remote folder: {source_path}")
+    zip_path = zip_remote_output(user, host, source_path)
+    log("Zipping complete. Starting download...")
+    download_file(user, host, zip_path, destination, log=log, cancelled=cancelled)
+    return zip_path
+
+
+def fetch_outputs(config, destination, advanced_config=None, log=_ignore, cancelled=None, archive_format=None):
+    """
+    Downloads a config's output folder, zipped on the server, to `destination`;
+    locally the folder is archived there in `archive_format` (by default the
+    one implied by the file name).
+    """
+    user, host, output_path = output_location(config, advanced_config)
+    if user:
+        zip_path = download_remote_output(user, host, output_path, destination, log=log, cancelled=cancelled)
+        run_ssh(user, host, f"rm {zip_path}", check=False)
+    else:
+        if not os.path.isdir(output_path):
+            raise RunError(f"Output directory not found: {output_path}")
+        create_archive(output_path, destination, archive_format or archive_format_for(destination), log=log,
+                       cancelled=cancelled)
+    return destination
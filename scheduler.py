@@ -0,0 +1,26 @@
+# scheduler.py
+
+
+def select_jobs(queued, memory_in_use=0, memory_budget=None, free_slots=None):
+    """
+    Picks the queued jobs that can start now.
+
+    Jobs are dicts carrying the predictor's 'duration' and 'peak_memory'
+    (either may be None) and an optional 'priority' (higher starts first).
+    Within a priority, the longest predicted jobs start first so short jobs
+    fill in around them. A job is skipped while starting it would push the
+    predicted memory use above `memory_budget`, unless nothing else is
+    running, so a single oversized job can never block the queue.
+    """
+    ordered = sorted(queued, key=lambda job: (-job.get("priority", 0), -(job.get("duration") or 0)))
+    selected = []
+    for job in ordered:
+        if free_slots is not None and len(selected) >= free_slots:
+            break
+        memory = job.get("peak_memory") or 0
+        idle = not selected and not memory_in_use
+        if memory_budget is not None and memory_in_use + memory > memory_budget and not idle:
+            continue
+        selected.append(job)
+        memory_in_use += memory
+    return selected
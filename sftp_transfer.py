@@ -0,0 +1,271 @@
+# sftp_transfer.py
+"""
+Resumable, pipelined SFTP downloads. A file is fetched in fixed-size chunks
+with several read requests in flight; finished chunks are recorded in a
+sidecar state file next to the partial download, so an interrupted transfer
+picks up where it stopped. The result is checked against a SHA-256 computed
+on the server while the download runs.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import paramiko
+
+from remote import SSH_KEY_FILE, RemoteError
+from run_predictor import format_seconds
+
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_IN_FLIGHT = 8
+RETRIES = 3
+PART_SUFFIX = ".part"
+STATE_SUFFIX = ".part.json"
+
+# Seconds between progress reports
+PROGRESS_INTERVAL = 2
+
+
+class TransferCancelled(Exception):
+    """The transfer was cancelled; its partial file is kept for resuming."""
+
+
+def connect(user, host, timeout=10):
+    """Opens a paramiko SSH connection with the app's key. Raises RemoteError."""
+    try:
+        key = paramiko.RSAKey.from_private_key_file(SSH_KEY_FILE)
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(host, username=user, pkey=key, timeout=timeout)
+        return client
+    except (paramiko.SSHException, OSError) as e:
+        raise RemoteError(f"Failed to connect to {user}@{host}: {e}")
+
+
+def sftp_path(path):
+    """SFTP paths are relative to the login directory, so '~/' has to go."""
+    return path[2:] if path.startswith("~/") else path
+
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class TransferProgress:
+    """Bytes moved, rate (over the last few reports) and ETA of one transfer."""
+
+    def __init__(self, total, done=0):
+        self.total = total
+        self.done = done
+        self.resumed_from = done
+        self.start_time = time.time()
+        self._samples = [(self.start_time, done)]
+        self._lock = threading.Lock()
+
+    def add(self, size):
+        with self._lock:
+            self.done += size
+            self._samples.append((time.time(), self.done))
+            self._samples = self._samples[-32:]
+
+    def rate(self):
+        (t0, b0), (t1, b1) = self._samples[0], self._samples[-1]
+        return (b1 - b0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def eta(self):
+        rate = self.rate()
+        return (self.total - self.done) / rate if rate > 0 else None
+
+    def describe(self):
+        percent = 100 * self.done / self.total if self.total else 100
+        text = f"{format_size(self.done)} / {format_size(self.total)} ({percent:.0f}%) at {format_size(self.rate())}/s"
+        eta = self.eta()
+        if eta is not None and self.done < self.total:
+            text += f", ETA {format_seconds(eta)}"
+        return text
+
+
+def _load_state(state_path):
+    try:
+        with open(state_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(state_path, state):
+    temp_path = state_path + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f)
+    os.replace(temp_path, state_path)
+
+
+def _local_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _download(client, remote_path, local_path, log, cancelled, chunk_size, max_in_flight, progress=None):
+    """
+    Downloads one file over an open connection. With a shared `progress`
+    (several files at once) bytes are added to it and the caller reports;
+    otherwise this file's progress is logged.
+    """
+    sftp = client.open_sftp()
+    try:
+        try:
+            attributes = sftp.stat(sftp_path(remote_path))
+        except FileNotFoundError:
+            raise RemoteError(f"Remote file not found: {remote_path}")
+        size, mtime = attributes.st_size, attributes.st_mtime
+
+        # The server hashes the file while we download it
+        _, hash_stdout, _ = client.exec_command(f"sha256sum {remote_path}")
+
+        part_path = local_path + PART_SUFFIX
+        state_path = local_path + STATE_SUFFIX
+        identity = {"remote_path": remote_path, "size": size, "mtime": mtime, "chunk_size": chunk_size}
+        state = _load_state(state_path)
+        if state and all(state.get(k) == v for k, v in identity.items()) and os.path.exists(part_path):
+            done = set(state["done"])
+        else:
+            done = set()
+            with open(part_path, "wb") as f:
+                f.truncate(size)
+        state = {**identity, "done": sorted(done)}
+
+        chunks = [(offset, min(chunk_size, size - offset)) for offset in range(0, size, chunk_size)]
+        missing = [i for i in range(len(chunks)) if i not in done]
+        resumed = sum(chunks[i][1] for i in done)
+        if done:
+            log(f"Resuming {os.path.basename(remote_path)} at {format_size(resumed)} of {format_size(size)}.")
+        shared_progress = progress is not None
+        if shared_progress:
+            progress.add(resumed)
+        else:
+            progress = TransferProgress(size, resumed)
+        last_report = 0
+
+        with open(part_path, "r+b") as out, sftp.open(sftp_path(remote_path), "rb") as remote_file:
+            for start in range(0, len(missing), max_in_flight):
+                if cancelled and cancelled():
+                    raise TransferCancelled(f"Download of {remote_path} cancelled")
+                batch = missing[start:start + max_in_flight]
+                # readv keeps all of the batch's read requests in flight at once
+                for i, data in zip(batch, remote_file.readv([chunks[i] for i in batch])):
+                    out.seek(chunks[i][0])
+                    out.write(data)
+                    done.add(i)
+                    progress.add(len(data))
+                out.flush()
+                state["done"] = sorted(done)
+                _save_state(state_path, state)
+                if not shared_progress and time.time() - last_report >= PROGRESS_INTERVAL:
+                    log(f"Downloading {os.path.basename(remote_path)}: {progress.describe()}")
+                    last_report = time.time()
+
+        if not shared_progress:
+            log(f"Downloaded {os.path.basename(remote_path)}: {progress.describe()}")
+
+        remote_hash = hash_stdout.read().decode().split()[:1]
+        if hash_stdout.channel.recv_exit_status() != 0 or not remote_hash:
+            log(f"Could not compute the checksum of {os.path.basename(remote_path)} on the server; it is not verified.")
+        elif _local_sha256(part_path) != remote_hash[0]:
+            os.unlink(part_path)
+            os.unlink(state_path)
+            raise RemoteError(f"Checksum mismatch for {remote_path}; the partial download was discarded.")
+        elif not shared_progress:
+            log("Checksum verified.")
+
+        os.replace(part_path, local_path)
+        if os.path.exists(state_path):
+            os.unlink(state_path)
+        return local_path
+    finally:
+        sftp.close()
+
+
+def download_file(user, host, remote_path, local_path, log=None, cancelled=None,
+                  chunk_size=CHUNK_SIZE, max_in_flight=MAX_IN_FLIGHT, retries=RETRIES):
+    """
+    Downloads one remote file to local_path, resuming a previous partial
+    download of the same file. `log` receives progress messages; `cancelled`
+    is polled between batches of chunks. Raises RemoteError or TransferCancelled.
+    """
+    log = log or (lambda message: None)
+    for attempt in range(retries + 1):
+        client = connect(user, host)
+        try:
+            return _download(client, remote_path, local_path, log, cancelled, chunk_size, max_in_flight)
+        except (paramiko.SSHException, ConnectionError, TimeoutError, EOFError) as e:
+            if attempt == retries:
+                raise RemoteError(f"Download of {remote_path} failed: {e}")
+            delay = 2 ** (attempt + 1)
+            log(f"Connection lost ({e}); resuming in {delay} s...")
+            time.sleep(delay)
+        finally:
+            client.close()
+
+
+def download_files(user, host, files, log=None, cancelled=None, workers=4, retries=RETRIES):
+    """
+    Downloads several remote files in parallel. `files` is a list of
+    (remote_path, local_path, size); each of `workers` threads keeps one
+    connection open and takes files largest-first. Returns the local paths;
+    raises RemoteError or TransferCancelled for the first failure.
+    """
+    log = log or (lambda message: None)
+    queue = sorted(files, key=lambda item: -item[2])
+    progress = TransferProgress(sum(size for _, _, size in files))
+    lock = threading.Lock()
+    errors = []
+
+    def worker():
+        client = None
+        try:
+            while True:
+                with lock:
+                    if not queue or errors:
+                        return
+                    remote_path, local_path, _ = queue.pop(0)
+                os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+                for attempt in range(retries + 1):
+                    try:
+                        client = client or connect(user, host)
+                        _download(client, remote_path, local_path, log, cancelled, CHUNK_SIZE, MAX_IN_FLIGHT, progress)
+                        break
+                    except (paramiko.SSHException, ConnectionError, TimeoutError, EOFError) as e:
+                        if client:
+                            client.close()
+                        client = None
+                        if attempt == retries:
+                            raise RemoteError(f"Download of {remote_path} failed: {e}")
+                        time.sleep(2 ** (attempt + 1))
+        except (RemoteError, TransferCancelled, OSError) as e:
+            with lock:
+                errors.append(e)
+        finally:
+            if client:
+                client.close()
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(min(workers, len(files)), 1))]
+    for thread in threads:
+        thread.start()
+    last_report = time.time()
+    while any(thread.is_alive() for thread in threads):
+        next(thread for thread in threads if thread.is_alive()).join(PROGRESS_INTERVAL)
+        if not errors and time.time() - last_report >= PROGRESS_INTERVAL:
+            log(f"Downloading {len(files)} files: {progress.describe()}")
+            last_report = time.time()
+    if errors:
+        raise errors[0]
+    log(f"Downloaded {len(files)} files: {progress.describe()}")
+    return [local_path for _, local_path, _ in files]
@@ -0,0 +1,61 @@
+# tech_list.py
+import threading
+import time
+
+from pdk_index import scan_pdks
+from remote import parse_openram_path
+
+# Fetched lists are reused for this long per (host, OpenRAM path)
+TECH_LIST_TTL = 120
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def _cache_key(openram_path):
+    user, host, remote_path = parse_openram_path(openram_path)
+    if user:
+        return f"{user}@{host}", remote_path
+    return "localhost", openram_path
+
+
+def cached_tech_list(openram_path):
+    """The cached list for an OpenRAM path if it is still fresh, else None."""
+    try:
+        key = _cache_key(openram_path)
+    except ValueError:
+        return None
+    with _lock:
+        cached = _cache.get(key)
+    if cached and time.time() - cached[0] < TECH_LIST_TTL:
+        return cached[1]
+    return None
+
+
+def get_tech_list(openram_path, refresh=False, cancelled=None):
+    """
+    The PDKs found under an OpenRAM install's technology folder (see
+    pdk_index.py), as summaries with a 'name' each. Cached per host and path
+    for TECH_LIST_TTL seconds. Returns None without scanning once
+    `cancelled()` is true. Raises RemoteError, or ValueError for a
+    malformed path.
+    """
+    if not refresh:
+        cached = cached_tech_list(openram_path)
+        if cached is not None:
+            return cached
+    if cancelled and cancelled():
+        return None
+    techs = scan_pdks(openram_path)
+    with _lock:
+        _cache[_cache_key(openram_path)] = (time.time(), techs)
+    return techs
+
+
+def invalidate_tech_list(openram_path):
+    try:
+        key = _cache_key(openram_path)
+    except ValueError:
+        return
+    with _lock:
+        _cache.pop(key, None)
@@ -1,7 +1,7 @@
 import sys
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QPushButton, QWidget,
-    QVBoxLayout, QHBoxLayout, QTextEdit, QScrollArea, QSplitter
+    QVBoxLayout, QHBoxLayout, QTextEdit, QScrollArea, QSplitter, QLabel, QProgressBar
 )
 from PySide6.QtCore import Qt
 from controller import Controller
@@ -30,6 +30,10 @@ class Ui_MainWindow(object):
         self.load_button.setStyleSheet(button_style)
         self.run_button = QPushButton("▶ Run OpenRAM")
         self.run_button.setStyleSheet(button_style)
+        self.quick_look_button = QPushButton("⚡ Quick Look")
+        self.quick_look_button.setStyleSheet(button_style)
+        self.quick_look_button.setToolTip("Netlist-only run with analytical delays at the nominal corner, "
+                                          "followed by the full run in the background")
         self.view_button = QPushButton("📄 View Output")
         self.view_button.setStyleSheet(button_style)
         self.advanced_settings_button = QPushButton("⚙️ Advanced Settings")
@@ -39,6 +43,7 @@ class Ui_MainWindow(object):
         self.sidebar.addWidget(self.create_button)
         self.sidebar.addWidget(self.load_button)
         self.sidebar.addWidget(self.run_button)
+        self.sidebar.addWidget(self.quick_look_button)
         self.sidebar.addWidget(self.view_button)
         self.sidebar.addWidget(self.advanced_settings_button)
         self.sidebar.addStretch()
@@ -61,6 +66,19 @@ class Ui_MainWindow(object):
 
         self.right_panel.addWidget(self.right_splitter)
 
+        # --- Run progress (hidden while nothing runs) ---
+        self.run_status_label = QLabel()
+        self.run_progress = QProgressBar()
+        self.run_progress.setRange(0, 100)
+        self.run_status_label.hide()
+        self.run_progress.hide()
+        self.right_panel.addWidget(self.run_status_label)
+        self.right_panel.addWidget(self.run_progress)
+        # CPU and memory of the running jobs; left showing the last run's peak afterwards
+        self.resource_label = QLabel()
+        self.resource_label.hide()
+        self.right_panel.addWidget(self.resource_label)
+
         # --- Add to main layout ---
         sidebar_widget = QWidget()
         sidebar_widget.setLayout(self.sidebar)
@@ -89,7 +107,12 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.create_button.clicked.connect(self.controller.create_new_config)
         self.load_button.clicked.connect(self.controller.load_config)
         self.run_button.clicked.connect(self.controller.run_openram)
+        self.quick_look_button.clicked.connect(self.controller.quick_look)
         self.view_button.clicked.connect(self.controller.view_output)
         self.advanced_settings_button.clicked.connect(self.controller.show_advanced_settings)
 
         self.controller.show_home_screen() # Show home screen on startup
+
+    def closeEvent(self, event):
+        self.controller.shutdown()
+        super().closeEvent(event)
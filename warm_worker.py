@@ -0,0 +1,285 @@
+# warm_worker.py
+"""
+Optional long-lived OpenRAM worker on the execution host. The worker is
+started once per OpenRAM install inside its activated environment, imports
+the OpenRAM modules, and then forks a child per job, so a run no longer pays
+for sourcing the activation scripts and a cold interpreter start.
+
+Jobs are handed over by a small client that stands in for
+`python3 -u sram_compiler.py <config>`: it starts the worker if none is
+listening on its Unix socket, sends the job, relays the child's output and
+exits with the child's exit code. The client also records the child's pid in
+JOB_PID_FILE, so resource sampling can follow the job from the client's
+process tree into the worker's. Local scripts and detached remote jobs can
+therefore use it without any other change. When the client goes away, e.g.
+because the run was stopped, the worker kills the job's process group. The
+worker exits after WORKER_IDLE_SECONDS without jobs; a changed worker,
+OpenRAM path or activation command gets a different socket, so a stale
+worker is never reused.
+"""
+import hashlib
+import inspect
+import json
+import os
+import shlex
+
+# Modules the worker imports before forking its first job
+PRELOAD_MODULES = ["openram"]
+WORKER_IDLE_SECONDS = 1800
+# Seconds a client gets to send its request once connected
+REQUEST_TIMEOUT = 10
+# Times a client starts the worker before giving up, e.g. when it keeps crashing
+WORKER_STARTS = 3
+# Written by the child after its output, followed by the exit code
+EXIT_MARKER = "\n__openram_worker_exit="
+# Priority of background jobs, as run_jobs.BACKGROUND_PREFIX sets it for jobs run without the worker
+BACKGROUND_NICENESS = 10
+BACKGROUND_IONICE = ["ionice", "-c", "2", "-n", "7"]
+# Where a client keeps the pid of the job the worker forked for it, by user id and client pid
+JOB_PID_FILE = "/tmp/openram_ui_worker_{uid}_job_{pid}.pid"
+
+
+def _worker_main(socket_path, preload, idle_seconds, exit_marker, request_timeout):
+    """The worker process. Runs on the execution host, so standard library only."""
+    import importlib
+    import json
+    import os
+    import runpy
+    import select
+    import signal
+    import socket
+    import subprocess
+    import sys
+    import time
+    import traceback
+
+    probe = socket.socket(socket.AF_UNIX)
+    try:
+        probe.connect(socket_path)
+        return  # Another worker got there first
+    except OSError:
+        pass
+    finally:
+        probe.close()
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    for name in preload:
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            print(f"Could not preload {name}: {e}", file=sys.stderr, flush=True)
+
+    server = socket.socket(socket.AF_UNIX)
+    server.bind(socket_path)
+    os.chmod(socket_path, 0o600)
+    server.listen(16)
+    # Running jobs by pid, with the client connection the worker watches for a hangup
+    children = {}
+    last_active = time.time()
+    try:
+        while children or time.time() - last_active < idle_seconds:
+            for pid, connection in list(children.items()):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    # Closing the worker's copy lets the client see the end of the output
+                    del children[pid]
+                    if connection:
+                        connection.close()
+                    last_active = time.time()
+            watched = [connection for connection in children.values() if connection]
+            ready = select.select([server] + watched, [], [], 1 if children else 5)[0]
+            for pid, connection in list(children.items()):
+                if connection not in ready:
+                    continue
+                try:
+                    hung_up = not connection.recv(1)
+                except OSError:
+                    hung_up = True
+                if hung_up:
+                    # The client is gone, so nobody waits for the job any more
+                    try:
+                        os.killpg(pid, signal.SIGKILL)
+                    except OSError:
+                        pass
+                    connection.close()
+                    children[pid] = None
+            if server not in ready:
+                continue
+            # Connections without a readable request, like another worker checking for
+            # this one, are dropped rather than ending the worker
+            try:
+                connection, _ = server.accept()
+            except OSError:
+                continue
+            try:
+                connection.settimeout(request_timeout)
+                with connection.makefile("r") as reader:
+                    request = json.loads(reader.readline())
+                if not isinstance(request, dict) or not {"cwd", "script", "config"} <= set(request):
+                    raise ValueError("incomplete request")
+                connection.settimeout(None)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring a connection without a job: {e}", file=sys.stderr, flush=True)
+                connection.close()
+                continue
+            pid = os.fork()
+            if pid:
+                children[pid] = connection
+                continue
+
+            # Child: becomes the OpenRAM run, in its own process group, with the client
+            # connection as its stdout and stderr. Its pid is the first line the client gets.
+            code = 1
+            try:
+                os.setsid()
+                connection.sendall(f"{os.getpid()}\n".encode())
+                server.close()
+                for other in children.values():
+                    if other:
+                        other.close()
+                # The worker itself keeps its priority, so only this job yields to others
+                if request.get("nice"):
+                    os.nice(request["nice"])
+                if request.get("ionice"):
+                    subprocess.run(request["ionice"] + ["-p", str(os.getpid())], stdout=subprocess.DEVNULL,
+                                   stderr=subprocess.DEVNULL)
+                os.dup2(connection.fileno(), 1)
+                os.dup2(connection.fileno(), 2)
+                os.chdir(request["cwd"])
+                sys.argv = [request["script"], request["config"]]
+                sys.path.insert(0, os.path.dirname(request["script"]))
+                try:
+                    runpy.run_path(request["script"], run_name="__main__")
+                    code = 0
+                except SystemExit as e:
+                    code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+                except BaseException:
+                    traceback.print_exc()
+            finally:
+                try:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os.write(1, f"{exit_marker}{code}\n".encode())
+                finally:
+                    os._exit(code)
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def _client_main(socket_path, request, start_command, exit_marker, job_pid_file, worker_starts):
+    """
+    Sends one job to the worker, starting the worker first if needed, and
+    relays its output. A worker it started that exits without listening is
+    started again, up to `worker_starts` times. Returns the job's exit code.
+    Runs on the execution host, so standard library only.
+    """
+    import json
+    import os
+    import socket
+    import subprocess
+    import sys
+    import time
+
+    connection = None
+    worker = None
+    starts = 0
+    deadline = time.time() + 300
+    while connection is None:
+        connection = socket.socket(socket.AF_UNIX)
+        try:
+            connection.connect(socket_path)
+        except OSError:
+            connection.close()
+            connection = None
+            # Start a worker when none is starting on our behalf: at first, or once the
+            # one we started has exited (it lost a race, or crashed) and the socket is gone
+            if worker is None or (worker.poll() is not None and not os.path.exists(socket_path)):
+                if starts == worker_starts or time.time() > deadline:
+                    print(f"The OpenRAM worker did not start; see {socket_path}.log", file=sys.stderr)
+                    return 1
+                starts += 1
+                with open(socket_path + ".log", "ab") as log:
+                    worker = subprocess.Popen(["bash", "-c", start_command], stdin=subprocess.DEVNULL, stdout=log,
+                                              stderr=log, start_new_session=True)
+            elif time.time() > deadline:
+                print(f"The OpenRAM worker did not start; see {socket_path}.log", file=sys.stderr)
+                return 1
+            time.sleep(0.5)
+
+    request["cwd"] = os.getcwd()
+    request["script"] = os.path.expanduser(request["script"])
+    request["config"] = os.path.abspath(os.path.expanduser(request["config"]))
+    connection.sendall((json.dumps(request) + "\n").encode())
+    marker = exit_marker.encode()
+    pending = b""
+    pid_file = job_pid_file.format(uid=os.getuid(), pid=os.getpid())
+    job_pid = None
+    try:
+        while True:
+            data = connection.recv(65536)
+            if not data:
+                break
+            pending += data
+            if job_pid is None:
+                if b"\n" not in pending:
+                    continue
+                job_pid, _, pending = pending.partition(b"\n")
+                with open(pid_file, "w") as f:
+                    f.write(job_pid.decode())
+            # Hold back what could be the start of the exit marker
+            keep = len(marker) + 16
+            if len(pending) > keep:
+                sys.stdout.buffer.write(pending[:-keep])
+                sys.stdout.buffer.flush()
+                pending = pending[-keep:]
+    finally:
+        if job_pid is not None and os.path.exists(pid_file):
+            os.unlink(pid_file)
+    output, found, code = pending.partition(marker)
+    sys.stdout.buffer.write(output)
+    sys.stdout.buffer.flush()
+    try:
+        return int(code.decode().strip()) if found else 1
+    except ValueError:
+        return 1
+
+
+WORKER_SCRIPT = inspect.getsource(_worker_main) + \
+    "\nimport json, sys\n" \
+    "_worker_main(sys.argv[1], json.loads(sys.argv[2]), float(sys.argv[3]), sys.argv[4], float(sys.argv[5]))\n"
+CLIENT_SCRIPT = inspect.getsource(_client_main) + \
+    "\nimport json, sys\n" \
+    "sys.exit(_client_main(sys.argv[1], json.loads(sys.argv[2]), sys.argv[3], sys.argv[4], sys.argv[5], int(sys.argv[6])))\n"
+
+
+def socket_path(openram_path, activation_command):
+    """
+    Worker socket for an OpenRAM install and the environment its activation
+    command sets up, under /tmp to stay within the length limit of socket
+    paths. `$(id -u)` is expanded by the shell.
+    """
+    key = hashlib.sha1(f"{openram_path}\0{activation_command}\0{WORKER_SCRIPT}\0{PRELOAD_MODULES}".encode())
+    key = key.hexdigest()[:16]
+    return f"/tmp/openram_ui_worker_$(id -u)_{key}.sock"
+
+
+def worker_run_command(openram_path, config_path, activation_command, background=False):
+    """
+    Shell command used instead of `python3 -u sram_compiler.py <config>`:
+    runs the config on the install's warm worker, starting it with
+    `activation_command` (the shell steps that set up the environment) if
+    it is not running. Stopping the command stops the job. With `background`
+    the job runs at lowered CPU and I/O priority; the command itself must
+    not be reniced, or a worker it starts would run every later job that way.
+    """
+    sock = socket_path(openram_path, activation_command)
+    start_command = (f"{activation_command} && exec python3 -u -c {shlex.quote(WORKER_SCRIPT)} {sock} "
+                     f"{shlex.quote(json.dumps(PRELOAD_MODULES))} {WORKER_IDLE_SECONDS} {shlex.quote(EXIT_MARKER)} "
+                     f"{REQUEST_TIMEOUT}")
+    request = {"script": os.path.join(openram_path, "sram_compiler.py"), "config": config_path}
+    if background:
+        request.update(nice=BACKGROUND_NICENESS, ionice=BACKGROUND_IONICE)
+    return (f"python3 -u -c {shlex.quote(CLIENT_SCRIPT)} {sock} {shlex.quote(json.dumps(request))} "
+            f"{shlex.quote(start_command)} {shlex.quote(EXIT_MARKER)} {shlex.quote(JOB_PID_FILE)} {WORKER_STARTS}")